@@ -0,0 +1,254 @@
+import os
+import sys
+import json
+import time
+import zipfile
+import argparse
+from concurrent.futures import ThreadPoolExecutor, FIRST_COMPLETED, wait
+
+from .features.store import open_feature_store
+from .features.metrics import stage
+from .features.preprocess import decode_image
+from .features.fragments import image_features
+from .features.engine import family_columns, resolve_families, DEFAULT_FAMILIES
+from .models.identify import load_identifier, rank_batch, AGGREGATIONS
+from .models.persistence import ModelArtifacts, store_fingerprint
+
+# Extensões das imagens lidas de diretórios e de arquivos zip
+IMAGE_EXTENSIONS = (".bmp", ".png", ".jpg", ".jpeg", ".tif", ".tiff")
+
+# Número máximo padrão de imagens em andamento em um lote. Deve ser bem maior
+# que o número de threads, para que várias imagens fiquem prontas enquanto as
+# anteriores são avaliadas e sejam avaliadas juntas.
+MAX_PENDING = 32
+
+
+def iter_file_images(name, fileobj):
+    """
+    Lê as imagens de um arquivo: a própria imagem ou, se for um zip, as imagens
+    contidas nele, uma de cada vez.
+
+    Args:
+        name (str): Nome do arquivo.
+        fileobj (file): Arquivo aberto em modo binário, posicionável (`seek`).
+
+    Yields:
+        tuple: Nome e conteúdo (bytes) de cada imagem.
+    """
+    if zipfile.is_zipfile(fileobj):
+        fileobj.seek(0)
+        with zipfile.ZipFile(fileobj) as archive:
+            for info in archive.infolist():
+                if not info.is_dir() and info.filename.lower().endswith(IMAGE_EXTENSIONS):
+                    yield info.filename, archive.read(info)
+    else:
+        fileobj.seek(0)
+        yield name, fileobj.read()
+
+
+def iter_path_images(paths):
+    """
+    Lê as imagens de uma lista de caminhos: imagens, arquivos zip e diretórios
+    (as imagens e os zips do diretório, em ordem alfabética).
+
+    Args:
+        paths (list): Caminhos das imagens, zips ou diretórios.
+
+    Yields:
+        tuple: Nome e conteúdo (bytes) de cada imagem.
+    """
+    for path in paths:
+        if os.path.isdir(path):
+            files = [
+                os.path.join(path, name) for name in sorted(os.listdir(path))
+                if name.lower().endswith(IMAGE_EXTENSIONS + (".zip",))
+            ]
+        else:
+            files = [path]
+        for file_path in files:
+            with open(file_path, "rb") as fileobj:
+                yield from iter_file_images(os.path.basename(file_path), fileobj)
+
+
+def _extract(vectorize, data):
+    start = time.perf_counter()
+    try:
+        return vectorize(data), None, (time.perf_counter() - start) * 1000
+    except ValueError as e:
+        return None, str(e), (time.perf_counter() - start) * 1000
+    except Exception as e:
+        # Qualquer outra falha (imagem corrompida, falta de memória) também é
+        # o erro apenas desta imagem: o lote continua
+        return None, f"{type(e).__name__}: {e}", (time.perf_counter() - start) * 1000
+
+
+def identify_batch(images, vectorize, score, workers=None, max_pending=None):
+    """
+    Identifica os autores de um lote de imagens, gerando o resultado de cada
+    imagem assim que ele fica pronto.
+
+    As imagens são lidas sob demanda e processadas (decodificação,
+    pré-processamento e extração das características) em um pool de threads,
+    com no máximo `max_pending` imagens em andamento: a leitura das próximas
+    imagens só avança quando há espaço, o que limita a memória usada em lotes
+    grandes. Enquanto o pool processa as próximas imagens, as imagens já
+    processadas são avaliadas juntas, com uma única chamada de `score` para
+    todas as que ficaram prontas desde a chamada anterior.
+
+    Args:
+        images (iterable): Nome e conteúdo (bytes) de cada imagem.
+        vectorize (callable): Função que recebe o conteúdo de uma imagem e
+            retorna a matriz de vetores de características, ou lança ValueError
+            com a mensagem de erro.
+        score (callable): Função que recebe uma lista de matrizes de vetores
+            (uma por imagem) e retorna a lista dos autores mais prováveis de
+            cada imagem (ver `rank_batch`).
+        workers (int): Número de threads do pool (padrão: número de CPUs).
+        max_pending (int): Número máximo de imagens em andamento (padrão:
+            `MAX_PENDING`).
+
+    Yields:
+        dict: Resultado de cada imagem, na ordem em que ficam prontos, com
+        "index" (posição no lote), "name", "authors", "fragments" e
+        "extract_ms", ou "error" se a imagem não pôde ser processada (ou, com
+        "name" None, se a leitura das imagens falhou e o lote terminou). O último
+        item é o resumo do lote: "images", "errors", "batches" (chamadas de
+        `score`) e "total_ms".
+    """
+    workers = workers or os.cpu_count()
+    max_pending = max_pending or MAX_PENDING
+    start = time.perf_counter()
+    images = enumerate(images)
+    pending = {}
+    exhausted = False
+    count = errors = batches = read = 0
+
+    executor = ThreadPoolExecutor(max_workers=workers)
+    try:
+        while True:
+            failed = []
+            while not exhausted and len(pending) < max_pending:
+                try:
+                    item = next(images, None)
+                except Exception as e:
+                    # Falha na leitura (por exemplo, um zip corrompido): as
+                    # imagens seguintes não podem ser lidas, mas as já lidas
+                    # são concluídas e o resumo é gerado
+                    failed.append({"index": read, "name": None, "error": f"{type(e).__name__}: {e}"})
+                    item = None
+                if item is None:
+                    exhausted = True
+                    break
+                index, (name, data) = item
+                read = index + 1
+                pending[executor.submit(_extract, vectorize, data)] = (index, name)
+            if not pending and not failed:
+                break
+
+            done = set()
+            if pending:
+                done, _ = wait(pending, return_when=FIRST_COMPLETED)
+            ready = []
+            for future in sorted(done, key=lambda f: pending[f][0]):
+                index, name = pending.pop(future)
+                vectors, error, extract_ms = future.result()
+                record = {"index": index, "name": name, "extract_ms": extract_ms}
+                if error is None:
+                    ready.append((record, vectors))
+                else:
+                    failed.append({**record, "error": error})
+
+            rankings = []
+            if ready:
+                with stage("batch.score"):
+                    rankings = score([vectors for _, vectors in ready])
+                batches += 1
+            for (record, vectors), authors in zip(ready, rankings):
+                count += 1
+                yield {**record, "authors": authors, "fragments": len(vectors)}
+            for record in failed:
+                count += 1
+                errors += 1
+                yield record
+    finally:
+        executor.shutdown(wait=True, cancel_futures=True)
+
+    yield {
+        "images": count,
+        "errors": errors,
+        "batches": batches,
+        "total_ms": (time.perf_counter() - start) * 1000,
+    }
+
+
+def parse_args(argv=None):
+    """
+    Lê os parâmetros da linha de comando.
+
+    Returns:
+        argparse.Namespace: Parâmetros da identificação em lote.
+    """
+    parser = argparse.ArgumentParser(
+        description="Identifica os autores de um lote de manuscritos, com um resultado JSON por linha."
+    )
+    parser.add_argument("paths", nargs="+", help="Imagens, arquivos zip ou diretórios")
+    parser.add_argument("--output", help="Arquivo NDJSON de saída (padrão: saída padrão)")
+    parser.add_argument("--top-k", type=int, default=5, help="Autores retornados por imagem")
+    parser.add_argument("--aggregate", choices=AGGREGATIONS, default="mean",
+                        help="Combinação das predições dos fragmentos de cada imagem")
+    parser.add_argument("--workers", type=int, default=os.cpu_count(),
+                        help="Threads que processam as imagens")
+    parser.add_argument("--max-pending", type=int, default=MAX_PENDING,
+                        help=f"Máximo de imagens em andamento (padrão: {MAX_PENDING})")
+    parser.add_argument("--features", type=resolve_families, default=DEFAULT_FAMILIES,
+                        help="Famílias de características usadas na extração do treino")
+    parser.add_argument("--fragments", type=int, default=0,
+                        help="Fragmentos sorteados por imagem, como na extração do treino")
+    parser.add_argument("--train-csv", default="treino.csv", help="CSV de treino")
+    parser.add_argument("--test-csv", default="teste.csv", help="CSV de teste")
+    parser.add_argument("--model-dir", default="trained_models",
+                        help="Diretório dos modelos treinados (vazio para sempre treinar)")
+    return parser.parse_args(argv)
+
+
+def run(args):
+    train_store = open_feature_store(args.train_csv)
+    if train_store.columns != family_columns(args.features):
+        raise ValueError(
+            f"As colunas de {args.train_csv} não correspondem às famílias de --features "
+            f"({', '.join(args.features)})."
+        )
+    artifacts = None
+    if args.model_dir:
+        test_store = open_feature_store(args.test_csv)
+        artifacts = ModelArtifacts(args.model_dir, store_fingerprint(train_store, test_store))
+    identifier, _ = load_identifier(train_store, artifacts)
+
+    def vectorize(data):
+        img = decode_image(data)
+        if img is None:
+            raise ValueError("Não foi possível decodificar a imagem.")
+        vectors = image_features(img, args.fragments, None, args.features)
+        if vectors is None:
+            raise ValueError("A imagem não tem escrita suficiente.")
+        return vectors
+
+    def score(groups):
+        return rank_batch(identifier, groups, args.top_k, args.aggregate)
+
+    output = open(args.output, "w") if args.output else sys.stdout
+    try:
+        results = identify_batch(
+            iter_path_images(args.paths), vectorize, score, args.workers, args.max_pending
+        )
+        for result in results:
+            output.write(json.dumps(result) + "\n")
+            output.flush()
+    finally:
+        if output is not sys.stdout:
+            output.close()
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(run(parse_args()))
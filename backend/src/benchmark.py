@@ -0,0 +1,420 @@
+import io
+import os
+import sys
+import json
+import time
+import shutil
+import argparse
+import itertools
+import platform
+import tempfile
+import statistics
+import subprocess
+from contextlib import redirect_stdout
+
+import cv2
+import numpy as np
+import sklearn
+from sklearn.svm import SVC
+from sklearn.pipeline import make_pipeline
+from sklearn.preprocessing import StandardScaler
+
+from .features.preprocess import decode_image, binarize, edges_from_binary, iter_edge_strips
+from .features.slant import axial_slant_histogram, axial_slant_histogram_strips, normalize_histogram
+from .features.engine import extract_families, family_columns, FEATURE_FAMILIES
+from .models.svm import make_cv, make_search
+from .models.random_forest import train_and_test_random_forest
+from .models.author_index import train_and_test_author_index
+
+# Resoluções padrão das páginas sintéticas (largura x altura): A4 a 100, 200 e 300 dpi
+DEFAULT_RESOLUTIONS = ((827, 1169), (1654, 2339), (2480, 3508))
+
+# Números padrão de autores das tabelas sintéticas
+DEFAULT_AUTHORS = (10, 50, 200)
+
+# Amostras por autor das tabelas sintéticas, como nos dados reais
+TRAIN_PER_AUTHOR = 2
+TEST_PER_AUTHOR = 1
+
+SUITES = ("extraction", "training", "serving")
+
+
+def synthetic_page(width, height, seed=0):
+    """
+    Gera uma página sintética parecida com um manuscrito: linhas de "palavras"
+    formadas por traços curvos e inclinados, em tinta escura sobre papel claro
+    com ruído.
+
+    Args:
+        width (int): Largura da página, em pixels.
+        height (int): Altura da página, em pixels.
+        seed (int): Semente do gerador aleatório (a inclinação da escrita depende dela).
+
+    Returns:
+        numpy.ndarray: Página em escala de cinza.
+    """
+    rng = np.random.default_rng(seed)
+    page = rng.normal(235, 6, (height, width)).clip(0, 255).astype(np.uint8)
+
+    # Tamanho da escrita proporcional à resolução
+    scale = width / 827
+    line_height = int(45 * scale)
+    thickness = max(1, int(round(2 * scale)))
+    slant = rng.uniform(-0.5, 0.5)
+
+    for baseline in range(2 * line_height, height - line_height, line_height):
+        x = int(rng.integers(30, 80) * scale)
+        while x < width - 60 * scale:
+            word_width = int(rng.integers(40, 160) * scale)
+            for _ in range(max(2, word_width // int(12 * scale))):
+                # Traço: curva com subida e descida, cisalhada pela inclinação
+                t = np.linspace(0, 1, 12)
+                stroke_height = rng.uniform(0.3, 0.9) * line_height
+                dy = -stroke_height * np.sin(np.pi * t) * rng.choice([1, -0.4])
+                dx = rng.uniform(6, 14) * scale * t
+                points = np.stack([x + dx - slant * dy, baseline + dy], axis=1)
+                cv2.polylines(page, [points.astype(np.int32)], False,
+                              int(rng.integers(10, 80)), thickness, cv2.LINE_AA)
+                x += int(rng.uniform(6, 12) * scale)
+            x += int(rng.integers(15, 35) * scale)
+
+    return page
+
+
+def synthetic_features(n_authors, n_features=17, seed=0):
+    """
+    Gera tabelas sintéticas de características de treino e de teste, com
+    `TRAIN_PER_AUTHOR` e `TEST_PER_AUTHOR` amostras ruidosas por autor.
+
+    Args:
+        n_authors (int): Número de autores.
+        n_features (int): Número de características.
+        seed (int): Semente do gerador aleatório.
+
+    Returns:
+        tuple: X_train, y_train, X_test, y_test.
+    """
+    rng = np.random.default_rng(seed)
+    centroids = rng.uniform(0, 1, (n_authors, n_features))
+    authors = np.array([f"a{i:03d}" for i in range(n_authors)])
+
+    def samples(per_author):
+        labels = np.repeat(np.arange(n_authors), per_author)
+        X = centroids[labels] + rng.normal(0, 0.08, (len(labels), n_features))
+        return X.clip(0, 1), authors[labels]
+
+    X_train, y_train = samples(TRAIN_PER_AUTHOR)
+    X_test, y_test = samples(TEST_PER_AUTHOR)
+    return X_train, y_train, X_test, y_test
+
+
+def time_stage(function, repeat=5, warmup=1):
+    """
+    Mede o tempo de execução de uma função, descartando a saída impressa.
+
+    Args:
+        function (callable): Função sem argumentos.
+        repeat (int): Número de medições.
+        warmup (int): Número de execuções antes das medições.
+
+    Returns:
+        dict: Mediana, mínimo, média e desvio padrão dos tempos (em segundos).
+    """
+    times = []
+    with redirect_stdout(io.StringIO()):
+        for _ in range(warmup):
+            function()
+        for _ in range(repeat):
+            start = time.perf_counter()
+            function()
+            times.append(time.perf_counter() - start)
+
+    return {
+        "median_s": statistics.median(times),
+        "min_s": min(times),
+        "mean_s": statistics.mean(times),
+        "stdev_s": statistics.stdev(times) if len(times) > 1 else 0.0,
+        "repeat": repeat,
+    }
+
+
+def _record(results, key, stats):
+    results[key] = stats
+    print(f"{key}: {stats['median_s'] * 1000:.2f} ms")
+
+
+def bench_extraction(resolutions, repeat, results):
+    """
+    Mede as etapas da extração de características em páginas sintéticas.
+    """
+    all_families = tuple(FEATURE_FAMILIES)
+
+    for width, height in resolutions:
+        size = f"{width}x{height}"
+        page = synthetic_page(width, height)
+        data = cv2.imencode(".bmp", page)[1].tobytes()
+        img = decode_image(data)
+        thresh = binarize(img)
+        edges = edges_from_binary(thresh)
+
+        stages = {
+            "decode": lambda: decode_image(data),
+            "binarize": lambda: binarize(img),
+            "morphology": lambda: edges_from_binary(thresh),
+            "slant": lambda: normalize_histogram(axial_slant_histogram(edges)),
+            "families": lambda: extract_families(edges, all_families),
+            "tiled_slant": lambda: axial_slant_histogram_strips(iter_edge_strips(img, 512), height),
+            "end_to_end": lambda: normalize_histogram(
+                axial_slant_histogram(edges_from_binary(binarize(decode_image(data))))
+            ),
+        }
+        # Executa todas as etapas antes das medições: o alocador de memória
+        # ajusta os seus limites às maiores alocações, e sem isso as primeiras
+        # etapas medidas pagariam um custo que as seguintes não pagam
+        for function in stages.values():
+            function()
+
+        for name, function in stages.items():
+            _record(results, f"extraction/{name}/{size}", time_stage(function, repeat))
+
+
+def bench_training(author_counts, repeat, results):
+    """
+    Mede o treino e a avaliação dos modelos em tabelas sintéticas.
+    """
+    for n_authors in author_counts:
+        X_train, y_train, X_test, y_test = synthetic_features(n_authors)
+        cv = make_cv("stratified", 5, y_train)
+
+        stages = {
+            "scaler": lambda: StandardScaler().fit_transform(X_train),
+            "svm": lambda: make_pipeline(StandardScaler(), SVC()).fit(X_train, y_train).predict(X_test),
+            "grid_search": lambda: make_pipeline(StandardScaler(), make_search("grid", cv))
+            .fit(X_train, y_train).predict(X_test),
+            "random_forest": lambda: train_and_test_random_forest(X_train, y_train, X_test, y_test),
+            "author_index": lambda: train_and_test_author_index(X_train, y_train, X_test, y_test),
+        }
+        for name, function in stages.items():
+            _record(results, f"training/{name}/{n_authors}_authors", time_stage(function, repeat))
+
+
+def write_feature_csv(path, X, y):
+    with open(path, "w") as csvfile:
+        csvfile.write(",".join(["autor"] + family_columns()) + "\n")
+        for label, row in zip(y, X):
+            csvfile.write(",".join([label] + [repr(float(v)) for v in row]) + "\n")
+
+
+def bench_serving(author_counts, resolutions, repeat, results):
+    """
+    Mede as requisições da API, de ponta a ponta, com um cliente HTTP local
+    (os processos do pool e o modelo de identificação são criados antes das medições).
+
+    Cada requisição de /results sorteia, com uma semente diferente, metade dos
+    autores, e o registro de modelos fica desativado: a medição inclui o treino
+    dos modelos, e não uma consulta ao cache. Nenhum modelo é gravado em disco.
+    """
+    from fastapi.testclient import TestClient
+
+    n_authors = max(author_counts)
+    workdir = tempfile.mkdtemp(prefix="manuscritus-bench-")
+    previous_dir = os.getcwd()
+
+    try:
+        X_train, y_train, X_test, y_test = synthetic_features(n_authors)
+        write_feature_csv(os.path.join(workdir, "treino.csv"), X_train, y_train)
+        write_feature_csv(os.path.join(workdir, "teste.csv"), X_test, y_test)
+
+        os.chdir(workdir)
+        os.environ.update({
+            "MANUSCRITUS_ARTIFACTS": "off",
+            "MANUSCRITUS_WORKERS": "1",
+            "MANUSCRITUS_FRAGMENTS": "0",
+            "MANUSCRITUS_FEATURES": "slant",
+            "MANUSCRITUS_MODEL_DIR": "",
+            "MANUSCRITUS_REGISTRY_ENTRIES": "0",
+        })
+        os.environ.pop("MANUSCRITUS_FEATURE_CACHE", None)
+        from .server import app
+
+        width, height = resolutions[0]
+        image = cv2.imencode(".bmp", synthetic_page(width, height))[1].tobytes()
+
+        seeds = itertools.count()
+
+        with TestClient(app) as client:
+            def post_results():
+                body = {
+                    "num_authors": max(2, n_authors // 2),
+                    "models": ["svm", "random_forest"],
+                    "seed": next(seeds),
+                }
+                client.post("/results", json=body).raise_for_status()
+
+            def post_identify():
+                files = {"file": ("pagina.bmp", image, "image/bmp")}
+                client.post("/identify", files=files).raise_for_status()
+
+            _record(results, f"serving/results/{n_authors}_authors", time_stage(post_results, repeat))
+            _record(results, f"serving/identify/{width}x{height}", time_stage(post_identify, repeat))
+    finally:
+        os.chdir(previous_dir)
+        shutil.rmtree(workdir, ignore_errors=True)
+
+
+def environment():
+    """
+    Descreve o ambiente em que os benchmarks foram executados.
+
+    Returns:
+        dict: Versões, plataforma, número de CPUs e commit atual.
+    """
+    try:
+        commit = subprocess.run(
+            ["git", "rev-parse", "--short", "HEAD"], capture_output=True, text=True, check=True
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        commit = None
+
+    return {
+        "timestamp": time.strftime("%Y-%m-%dT%H:%M:%S"),
+        "commit": commit,
+        "platform": platform.platform(),
+        "python": platform.python_version(),
+        "numpy": np.__version__,
+        "opencv": cv2.__version__,
+        "scikit-learn": sklearn.__version__,
+        "cpu_count": os.cpu_count(),
+    }
+
+
+def run(args):
+    results = {}
+    if "extraction" in args.suites:
+        bench_extraction(args.resolutions, args.repeat, results)
+    if "training" in args.suites:
+        bench_training(args.authors, args.repeat, results)
+    if "serving" in args.suites:
+        bench_serving(args.authors, args.resolutions, args.repeat, results)
+
+    report = {
+        "environment": environment(),
+        "config": {
+            "suites": list(args.suites),
+            "resolutions": [list(r) for r in args.resolutions],
+            "authors": list(args.authors),
+            "repeat": args.repeat,
+        },
+        "results": results,
+    }
+    with open(args.output, "w") as output:
+        json.dump(report, output, indent=2)
+    print(f"Resultados salvos em: {args.output}")
+    return 0
+
+
+def compare_results(baseline, current, threshold=0.1, min_delta=0.001):
+    """
+    Compara as medianas de duas execuções dos benchmarks.
+
+    Uma medição é marcada como regressão quando a mediana atual é mais que
+    `threshold` (fração) maior que a da linha de base e a diferença absoluta
+    passa de `min_delta` segundos (para ignorar o ruído de etapas muito rápidas).
+
+    Args:
+        baseline (dict): Resultados da linha de base.
+        current (dict): Resultados atuais.
+        threshold (float): Aumento relativo tolerado.
+        min_delta (float): Diferença absoluta mínima, em segundos.
+
+    Returns:
+        list: Para cada medição em comum: nome, mediana base, mediana atual,
+        razão atual/base e se é uma regressão.
+    """
+    rows = []
+    for key in sorted(set(baseline) & set(current)):
+        before = baseline[key]["median_s"]
+        after = current[key]["median_s"]
+        ratio = after / before if before else float("inf")
+        regression = ratio > 1 + threshold and after - before > min_delta
+        rows.append((key, before, after, ratio, regression))
+    return rows
+
+
+def compare(args):
+    with open(args.baseline) as baseline_file, open(args.current) as current_file:
+        baseline = json.load(baseline_file)["results"]
+        current = json.load(current_file)["results"]
+
+    rows = compare_results(baseline, current, args.threshold, args.min_delta_ms / 1000)
+    width = max((len(key) for key, *_ in rows), default=10)
+    print(f"{'medição':<{width}}  {'base (ms)':>10}  {'atual (ms)':>10}  {'razão':>6}")
+    for key, before, after, ratio, regression in rows:
+        flag = "  REGRESSÃO" if regression else ""
+        print(f"{key:<{width}}  {before * 1000:>10.2f}  {after * 1000:>10.2f}  {ratio:>6.2f}{flag}")
+
+    for key in sorted(set(baseline) - set(current)):
+        print(f"{key}: ausente na execução atual")
+    for key in sorted(set(current) - set(baseline)):
+        print(f"{key}: nova medição, sem linha de base")
+
+    regressions = sum(regression for *_, regression in rows)
+    print(f"{regressions} regressão(ões) acima de {args.threshold:.0%}")
+    return 1 if regressions else 0
+
+
+def _sizes(value):
+    return tuple(tuple(int(n) for n in size.split("x")) for size in value.split(","))
+
+
+def _ints(value):
+    return tuple(int(n) for n in value.split(","))
+
+
+def _suites(value):
+    suites = tuple(name for name in value.split(",") if name)
+    unknown = set(suites) - set(SUITES)
+    if unknown:
+        raise argparse.ArgumentTypeError(f"Suítes desconhecidas: {', '.join(sorted(unknown))}")
+    return suites
+
+
+def parse_args(argv=None):
+    """
+    Lê os parâmetros da linha de comando.
+
+    Returns:
+        argparse.Namespace: Comando e parâmetros.
+    """
+    parser = argparse.ArgumentParser(description="Benchmarks da extração, do treino e da API.")
+    commands = parser.add_subparsers(dest="command", required=True)
+
+    run_parser = commands.add_parser("run", help="Executa os benchmarks e salva os resultados em JSON")
+    run_parser.add_argument("--output", default="benchmark.json", help="Arquivo JSON de saída")
+    run_parser.add_argument("--suites", type=_suites, default=SUITES,
+                            help="Suítes executadas, separadas por vírgulas (extraction,training,serving)")
+    run_parser.add_argument("--resolutions", type=_sizes, default=DEFAULT_RESOLUTIONS,
+                            help="Resoluções das páginas sintéticas (por exemplo, 827x1169,2480x3508)")
+    run_parser.add_argument("--authors", type=_ints, default=DEFAULT_AUTHORS,
+                            help="Números de autores das tabelas sintéticas (por exemplo, 10,50,200)")
+    run_parser.add_argument("--repeat", type=int, default=5, help="Medições por etapa")
+    run_parser.add_argument("--quick", action="store_true",
+                            help="Execução rápida: uma resolução pequena, 10 autores e 3 medições")
+
+    compare_parser = commands.add_parser("compare", help="Compara uma execução com uma linha de base")
+    compare_parser.add_argument("baseline", help="JSON da linha de base")
+    compare_parser.add_argument("current", help="JSON da execução atual")
+    compare_parser.add_argument("--threshold", type=float, default=0.1,
+                                help="Aumento relativo da mediana considerado regressão (padrão: 0.1)")
+    compare_parser.add_argument("--min-delta-ms", type=float, default=1.0,
+                                help="Diferença absoluta mínima para uma regressão, em ms")
+
+    args = parser.parse_args(argv)
+    if args.command == "run" and args.quick:
+        args.resolutions, args.authors, args.repeat = ((413, 585),), (10,), 3
+    return args
+
+
+if __name__ == "__main__":
+    args = parse_args()
+    sys.exit(run(args) if args.command == "run" else compare(args))
@@ -0,0 +1,154 @@
+import os
+import zlib
+import queue
+import threading
+from multiprocessing import util
+import cv2
+
+# Modos de gravação dos artefatos intermediários (imagens e histogramas)
+ARTIFACT_MODES = ("off", "sync", "async")
+
+
+class ArtifactSink:
+    """
+    Destino das imagens intermediárias e dos gráficos gerados durante a extração.
+
+    Modos:
+        - "off": nenhum artefato é gravado (modo de produção).
+        - "sync": os artefatos são gravados imediatamente, no próprio fluxo da extração.
+        - "async": os artefatos são enfileirados e gravados por uma thread em
+          segundo plano, fora do caminho crítico. A fila é limitada, de forma que
+          a extração espera quando a gravação fica para trás.
+
+    Com `every` maior que 1, apenas os artefatos de aproximadamente uma a cada
+    `every` imagens são gravados. A amostragem é feita pelo nome do arquivo, e
+    portanto é a mesma em todos os processos de um pool.
+
+    Args:
+        mode (str): Modo de gravação ("off", "sync" ou "async").
+        every (int): Intervalo de amostragem das imagens.
+        queue_size (int): Tamanho máximo da fila do modo "async".
+    """
+
+    def __init__(self, mode="sync", every=1, queue_size=64):
+        if mode not in ARTIFACT_MODES:
+            raise ValueError(f"Modo de artefatos desconhecido: {mode}")
+
+        self.mode = mode
+        self.every = max(1, every)
+        self.queue_size = queue_size
+        self._queue = None
+        self._thread = None
+        self._lock = threading.Lock()
+
+    def __getstate__(self):
+        # Apenas a configuração é enviada aos processos do pool; cada processo
+        # inicia a sua própria thread de gravação
+        return {"mode": self.mode, "every": self.every, "queue_size": self.queue_size}
+
+    def __setstate__(self, state):
+        self.__init__(**state)
+
+    def accepts(self, name=None):
+        """
+        Indica se os artefatos de uma imagem devem ser gravados.
+
+        Args:
+            name (str): Nome do arquivo da imagem. Se None, considera apenas o modo.
+
+        Returns:
+            bool: True se os artefatos devem ser gravados.
+        """
+        if self.mode == "off":
+            return False
+        if name is None or self.every == 1:
+            return True
+        return zlib.crc32(name.encode()) % self.every == 0
+
+    def save_image(self, path, image):
+        """
+        Grava uma imagem.
+
+        Args:
+            path (str): Caminho do arquivo de saída.
+            image (numpy.ndarray): Imagem a ser gravada. Não deve ser alterada depois.
+        """
+        self._submit(_write_image, path, image)
+
+    def save_figure(self, path, render, *args):
+        """
+        Gera e grava um gráfico do matplotlib.
+
+        Args:
+            path (str): Caminho do arquivo de saída.
+            render (callable): Função que recebe `args` e retorna uma
+                `matplotlib.figure.Figure`. No modo "async" ela é executada na
+                thread de gravação.
+            *args: Argumentos de `render`.
+        """
+        self._submit(_write_figure, path, render, *args)
+
+    def _submit(self, writer, path, *args):
+        if self.mode == "off":
+            return
+        if self.mode == "sync":
+            writer(path, *args)
+            return
+
+        self._start()
+        self._queue.put((writer, path, args))
+
+    def _start(self):
+        with self._lock:
+            if self._thread is not None:
+                return
+            self._queue = queue.Queue(maxsize=self.queue_size)
+            self._thread = threading.Thread(target=self._run, name="artifact-writer", daemon=True)
+            self._thread.start()
+
+            # Garante que a fila seja esvaziada ao final do processo, inclusive
+            # nos processos de um pool
+            util.Finalize(self, self.close, exitpriority=10)
+
+    def _run(self):
+        while True:
+            task = self._queue.get()
+            try:
+                if task is None:
+                    return
+                writer, path, args = task
+                try:
+                    writer(path, *args)
+                except Exception as e:
+                    print(f"Erro ao gravar {path}: {e}")
+            finally:
+                self._queue.task_done()
+
+    def flush(self):
+        """
+        Espera a gravação de todos os artefatos enfileirados.
+        """
+        if self._queue is not None:
+            self._queue.join()
+
+    def close(self):
+        """
+        Grava os artefatos pendentes e encerra a thread de gravação.
+        """
+        with self._lock:
+            thread, self._thread = self._thread, None
+            if thread is None:
+                return
+            self._queue.put(None)
+        thread.join()
+
+
+def _write_image(path, image):
+    os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+    cv2.imwrite(path, image)
+
+
+def _write_figure(path, render, *args):
+    os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+    figure = render(*args)
+    figure.savefig(path)
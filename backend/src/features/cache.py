@@ -0,0 +1,156 @@
+import os
+import json
+import hashlib
+import shutil
+import tempfile
+import numpy as np
+
+
+class FeatureCache:
+    """
+    Cache em disco de vetores de características, endereçado pelo conteúdo da
+    imagem e pelos parâmetros de extração.
+
+    A chave de cada entrada é o SHA-256 dos bytes do arquivo da imagem combinado
+    com os parâmetros de extração, de modo que um vetor em cache é obtido sem
+    decodificar a imagem. Os parâmetros também são gravados em `params.json`;
+    se mudarem (por exemplo, uma nova versão do `slant`), o cache é esvaziado.
+    Quando o tamanho total passa de `max_bytes`, as entradas usadas há mais
+    tempo são removidas.
+
+    Args:
+        cache_dir (str): Diretório do cache.
+        params (dict): Parâmetros de extração que invalidam o cache ao mudar.
+        max_bytes (int): Tamanho máximo do cache em bytes.
+    """
+
+    def __init__(self, cache_dir, params, max_bytes=512 * 1024 * 1024):
+        self.cache_dir = cache_dir
+        self.params = params
+        self.max_bytes = max_bytes
+        self._params_digest = json.dumps(params, sort_keys=True).encode()
+        self._written_bytes = 0
+
+        os.makedirs(cache_dir, exist_ok=True)
+        self._check_params()
+        self.evict()
+
+    def _check_params(self):
+        # Esvazia o cache se ele foi gerado com outros parâmetros de extração
+        params_path = os.path.join(self.cache_dir, "params.json")
+        if os.path.exists(params_path):
+            with open(params_path) as params_file:
+                if json.load(params_file) == json.loads(json.dumps(self.params)):
+                    return
+            self.clear()
+
+        with open(params_path, "w") as params_file:
+            json.dump(self.params, params_file, sort_keys=True)
+
+    def _entry_path(self, key):
+        return os.path.join(self.cache_dir, key[:2], f"{key}.npy")
+
+    def _entries(self):
+        for root, _, files in os.walk(self.cache_dir):
+            for name in files:
+                if name.endswith(".npy"):
+                    yield os.path.join(root, name)
+
+    def key(self, image_path=None, data=None):
+        """
+        Calcula a chave de uma imagem a partir do arquivo ou dos seus bytes.
+
+        Args:
+            image_path (str): Caminho para a imagem.
+            data (bytes): Conteúdo da imagem, usado quando não há arquivo.
+
+        Returns:
+            str: Chave hexadecimal da entrada.
+        """
+        digest = hashlib.sha256(self._params_digest)
+        if data is not None:
+            digest.update(data)
+        else:
+            with open(image_path, "rb") as image_file:
+                for block in iter(lambda: image_file.read(1024 * 1024), b""):
+                    digest.update(block)
+        return digest.hexdigest()
+
+    def get(self, key):
+        """
+        Busca um vetor no cache.
+
+        Args:
+            key (str): Chave da entrada.
+
+        Returns:
+            numpy.ndarray: Vetor em cache, ou None se não houver entrada.
+        """
+        path = self._entry_path(key)
+        try:
+            vector = np.load(path)
+        except (FileNotFoundError, ValueError, EOFError):
+            return None
+
+        # Atualiza o horário de acesso usado na remoção das entradas antigas
+        try:
+            os.utime(path)
+        except FileNotFoundError:
+            pass
+        return vector
+
+    def put(self, key, vector):
+        """
+        Grava um vetor no cache.
+
+        Args:
+            key (str): Chave da entrada.
+            vector (numpy.ndarray): Vetor de características.
+        """
+        path = self._entry_path(key)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+
+        # Grava em um arquivo temporário e renomeia, para que processos
+        # concorrentes nunca leiam uma entrada incompleta
+        fd, tmp_path = tempfile.mkstemp(dir=os.path.dirname(path), suffix=".tmp")
+        with os.fdopen(fd, "wb") as tmp_file:
+            np.save(tmp_file, np.asarray(vector))
+        os.replace(tmp_path, path)
+
+        self._written_bytes += os.path.getsize(path)
+        if self._written_bytes > self.max_bytes // 10:
+            self.evict()
+
+    def evict(self):
+        """
+        Remove as entradas usadas há mais tempo até o cache caber em `max_bytes`.
+        """
+        self._written_bytes = 0
+        entries = []
+        for path in self._entries():
+            try:
+                stat = os.stat(path)
+            except FileNotFoundError:
+                continue
+            entries.append((stat.st_mtime, stat.st_size, path))
+
+        total = sum(size for _, size, _ in entries)
+        for _, size, path in sorted(entries):
+            if total <= self.max_bytes:
+                break
+            try:
+                os.remove(path)
+            except FileNotFoundError:
+                pass
+            total -= size
+
+    def clear(self):
+        """
+        Remove todas as entradas do cache.
+        """
+        for name in os.listdir(self.cache_dir):
+            path = os.path.join(self.cache_dir, name)
+            if os.path.isdir(path):
+                shutil.rmtree(path, ignore_errors=True)
+            else:
+                os.remove(path)
@@ -0,0 +1,356 @@
+import numpy as np
+
+from .slant import AXIAL_SLANT_CHAINS, CHAIN_REACH, slant, normalize_histogram, save_histogram
+
+# Versão das famílias de características além da inclinação axial. Deve ser
+# incrementada sempre que uma mudança alterar os vetores gerados.
+ENGINE_VERSION = 1
+
+# Famílias extraídas por padrão (apenas a inclinação axial original)
+DEFAULT_FAMILIES = ("slant",)
+
+
+def _round(value):
+    # Arredondamento simétrico (0.5 se afasta de zero), igual nas duas direções
+    return int(np.sign(value) * np.floor(abs(value) + 0.5))
+
+
+def line_chain(di, dj):
+    """
+    Retorna os deslocamentos dos pixels de um segmento de reta que parte do
+    pixel central e termina em (di, dj), um pixel por passo no eixo principal.
+
+    Args:
+        di (int): Deslocamento final na linha.
+        dj (int): Deslocamento final na coluna.
+
+    Returns:
+        tuple: Deslocamentos (linha, coluna) de cada pixel do segmento, sem o central.
+    """
+    steps = max(abs(di), abs(dj))
+    return tuple(
+        (_round(k * di / steps), _round(k * dj / steps)) for k in range(1, steps + 1)
+    )
+
+
+def square_endpoints(length, half=True):
+    """
+    Lista os pontos da borda de um quadrado de raio `length` ao redor do pixel
+    central, em ordem de ângulo a partir da esquerda, passando por cima.
+
+    Args:
+        length (int): Raio do quadrado (comprimento dos segmentos).
+        half (bool): Se True, apenas o semiplano superior, em [0°, 180°) (4 *
+            `length` pontos); senão, o círculo inteiro (8 * `length` pontos).
+
+    Returns:
+        list: Deslocamentos (linha, coluna) de cada ponto.
+    """
+    n = length
+    upper = (
+        [(-k, -n) for k in range(0, n)]
+        + [(-n, k) for k in range(-n, n)]
+        + [(-n + k, n) for k in range(0, n)]
+    )
+    if half:
+        return upper
+    return upper + [(-di, -dj) for di, dj in upper]
+
+
+class NeighbourhoodMasks:
+    """
+    Máscaras de vizinhança de uma imagem de bordas, compartilhadas entre as
+    famílias de características.
+
+    A máscara de pixels pretos é calculada uma única vez, com margem de
+    `reach` pixels brancos, e as máscaras de cada cadeia (AND das máscaras
+    deslocadas de cada pixel) são memorizadas por prefixo: cadeias de famílias
+    diferentes que começam pelos mesmos pixels reaproveitam as mesmas máscaras.
+    Todas as máscaras cobrem a região central de margem `margin`; cada família
+    conta apenas a sua própria região (`region`).
+
+    Args:
+        fragment (numpy.ndarray): Imagem (ou fragmento) com as bordas da escrita.
+        margin (int): Menor margem ignorada entre as famílias.
+        reach (int): Maior alcance das cadeias entre as famílias.
+    """
+
+    def __init__(self, fragment, margin, reach):
+        self.height, self.width = fragment.shape
+        self.margin = margin
+        self.reach = reach
+        self.black = np.pad(fragment == 0, reach)
+        self.shared = {}
+        self._chains = {(): self.shifted(0, 0)}
+
+    @property
+    def empty(self):
+        return self.height <= 2 * self.margin or self.width <= 2 * self.margin
+
+    def shifted(self, di, dj):
+        # Janela da máscara deslocada de (di, dj) em relação aos pixels centrais
+        top = self.reach + self.margin + di
+        left = self.reach + self.margin + dj
+        return self.black[top:top + self.height - 2 * self.margin,
+                          left:left + self.width - 2 * self.margin]
+
+    def chain(self, chain):
+        """
+        Retorna a máscara dos pixels centrais pretos que iniciam uma cadeia de
+        pixels pretos.
+
+        Args:
+            chain (tuple): Deslocamentos (linha, coluna) dos pixels da cadeia.
+
+        Returns:
+            numpy.ndarray: Máscara booleana da região central.
+        """
+        for length in range(1, len(chain) + 1):
+            prefix = chain[:length]
+            if prefix not in self._chains:
+                self._chains[prefix] = self._chains[chain[:length - 1]] & self.shifted(*chain[length - 1])
+        return self._chains[chain]
+
+    def region(self, array, margin):
+        """
+        Recorta um array da região central para uma margem maior.
+
+        Args:
+            array (numpy.ndarray): Array da região central de margem `self.margin`.
+            margin (int): Margem da família.
+
+        Returns:
+            numpy.ndarray: Recorte do array.
+        """
+        k = margin - self.margin
+        return array[k:array.shape[0] - k, k:array.shape[1] - k]
+
+
+def _distribution(counts):
+    # Normaliza as contagens em uma distribuição (zeros se não houver contagens)
+    total = counts.sum()
+    return counts / total if total else np.zeros(len(counts))
+
+
+class ChainFamily:
+    """
+    Família de características que conta, para cada cadeia, os pixels centrais
+    que a iniciam.
+
+    Args:
+        name (str): Nome da família.
+        chains (tuple): Cadeias de deslocamentos, uma por bin.
+        margin (int): Margem ignorada em cada borda.
+        normalize (callable): Normalização das contagens.
+        prefix (str): Prefixo dos nomes das colunas.
+    """
+
+    def __init__(self, name, chains, margin, normalize=_distribution, prefix=None):
+        self.name = name
+        self.chains = chains
+        self.margin = margin
+        self.reach = max(max(abs(di), abs(dj)) for chain in chains for di, dj in chain)
+        self.normalize = normalize
+        self.columns = [f"{prefix or name}_{i}" for i in range(len(chains))]
+
+    def counts(self, masks):
+        return np.array([
+            np.count_nonzero(masks.region(masks.chain(chain), self.margin))
+            for chain in self.chains
+        ])
+
+
+class HingeFamily:
+    """
+    Família de características derivada da co-ocorrência de duas "pernas"
+    (segmentos de borda) partindo do mesmo pixel, no círculo inteiro.
+
+    Cada pixel central recebe um código com um bit por perna presente, e um
+    único `np.bincount` sobre os códigos dá a matriz de co-ocorrência das
+    pernas, compartilhada entre as famílias com o mesmo comprimento de perna:
+    - "hinge": distribuição conjunta das direções das duas pernas (pares i < j).
+    - "curvature": distribuição do ângulo entre as duas pernas.
+
+    Args:
+        name (str): Nome da família.
+        leg_length (int): Comprimento de cada perna, em pixels.
+        kind (str): "hinge" ou "curvature".
+    """
+
+    def __init__(self, name, leg_length, kind):
+        self.name = name
+        self.leg_length = leg_length
+        self.kind = kind
+        self.legs = [line_chain(di, dj) for di, dj in square_endpoints(leg_length, half=False)]
+        if len(self.legs) > 16:
+            # Os códigos são uint16, com um bit por perna
+            raise ValueError("O comprimento máximo das pernas é 2.")
+        self.margin = leg_length
+        self.reach = leg_length
+        self.normalize = _distribution
+
+        n_legs = len(self.legs)
+        self._pairs = np.triu_indices(n_legs, 1)
+        if kind == "hinge":
+            n_bins = len(self._pairs[0])
+        else:
+            # Ângulo entre as pernas, em passos de 360° / n_legs, de 1 a n_legs / 2
+            n_bins = n_legs // 2
+        self.columns = [f"{name}_{i}" for i in range(n_bins)]
+
+    def cooccurrence(self, masks):
+        key = ("legs", self.leg_length)
+        if key not in masks.shared:
+            codes = np.zeros(masks.region(masks.chain(()), self.margin).shape, dtype=np.uint16)
+            for bit, leg in enumerate(self.legs):
+                leg_mask = masks.region(masks.chain(leg), self.margin)
+                # Convertida para uint16 antes do deslocamento: em uint8, os
+                # bits das pernas 8 a 15 seriam descartados
+                codes |= leg_mask.astype(np.uint16) << bit
+
+            # Histograma dos códigos e matriz de co-ocorrência das pernas
+            frequencies = np.bincount(codes.ravel(), minlength=1 << len(self.legs))
+            values = np.flatnonzero(frequencies[1:]) + 1
+            bits = ((values[:, None] >> np.arange(len(self.legs))) & 1).astype(np.int64)
+            masks.shared[key] = bits.T @ (bits * frequencies[values][:, None])
+        return masks.shared[key]
+
+    def counts(self, masks):
+        matrix = self.cooccurrence(masks)
+        pair_counts = matrix[self._pairs]
+        if self.kind == "hinge":
+            return pair_counts
+
+        n_legs = len(self.legs)
+        difference = self._pairs[1] - self._pairs[0]
+        angle = np.minimum(difference, n_legs - difference)
+        return np.bincount(angle - 1, weights=pair_counts, minlength=n_legs // 2).astype(np.int64)
+
+
+# Famílias disponíveis, selecionáveis pelo nome
+FEATURE_FAMILIES = {
+    family.name: family
+    for family in (
+        ChainFamily("slant", AXIAL_SLANT_CHAINS, CHAIN_REACH, normalize_histogram, "inclinacao"),
+        ChainFamily("direction3", tuple(line_chain(*p) for p in square_endpoints(3)), 3),
+        ChainFamily("direction5", tuple(line_chain(*p) for p in square_endpoints(5)), 5),
+        HingeFamily("hinge", 2, "hinge"),
+        HingeFamily("curvature", 2, "curvature"),
+    )
+}
+
+
+def resolve_families(families):
+    """
+    Valida uma lista de nomes de famílias.
+
+    Args:
+        families (iterable): Nomes das famílias, ou uma string separada por vírgulas.
+
+    Returns:
+        tuple: Nomes das famílias, na ordem dada.
+
+    Raises:
+        ValueError: Se uma família não existir.
+    """
+    if isinstance(families, str):
+        families = [name.strip() for name in families.split(",") if name.strip()]
+    families = tuple(families)
+
+    unknown = [name for name in families if name not in FEATURE_FAMILIES]
+    if unknown or not families:
+        raise ValueError(
+            f"Famílias de características desconhecidas: {unknown}. "
+            f"Disponíveis: {', '.join(FEATURE_FAMILIES)}"
+        )
+    return families
+
+
+def family_columns(families=DEFAULT_FAMILIES):
+    """
+    Retorna os nomes das colunas do vetor concatenado das famílias.
+
+    Args:
+        families (tuple): Nomes das famílias.
+
+    Returns:
+        list: Nomes das colunas.
+    """
+    return [column for name in families for column in FEATURE_FAMILIES[name].columns]
+
+
+def engine_params(families=DEFAULT_FAMILIES):
+    """
+    Retorna os parâmetros das famílias que alteram os vetores extraídos, para
+    compor os parâmetros do cache de características.
+
+    Args:
+        families (tuple): Nomes das famílias.
+
+    Returns:
+        dict: Parâmetros das famílias, ou um dicionário vazio para as famílias padrão.
+    """
+    if tuple(families) == DEFAULT_FAMILIES:
+        return {}
+    return {"families": list(families), "engine_version": ENGINE_VERSION}
+
+
+def extract_families(fragment, families=DEFAULT_FAMILIES):
+    """
+    Extrai várias famílias de características de uma imagem de bordas em uma
+    única passagem vetorizada, sobre as mesmas máscaras de vizinhança.
+
+    Args:
+        fragment (numpy.ndarray): Imagem (ou fragmento) com as bordas da escrita.
+        families (tuple): Nomes das famílias, na ordem das colunas.
+
+    Returns:
+        numpy.ndarray: Vetores normalizados das famílias, concatenados.
+    """
+    selected = [FEATURE_FAMILIES[name] for name in families]
+    masks = NeighbourhoodMasks(
+        fragment,
+        margin=min(family.margin for family in selected),
+        reach=max(family.reach for family in selected),
+    )
+
+    vectors = []
+    for family in selected:
+        if masks.empty or masks.region(masks.chain(()), family.margin).size == 0:
+            # Sem pixels centrais válidos, todas as contagens são zero
+            counts = np.zeros(len(family.columns), dtype=int)
+        else:
+            counts = family.counts(masks)
+        vectors.append(family.normalize(counts))
+
+    return np.concatenate(vectors)
+
+
+def describe_fragment(fragment, filename, output_dir, fragment_index=1, artifacts=None,
+                      families=DEFAULT_FAMILIES):
+    """
+    Extrai o vetor de características de um fragmento e salva o histograma da
+    inclinação axial, quando ela faz parte das famílias.
+
+    Com as famílias padrão, equivale a `slant`.
+
+    Args:
+        fragment (numpy.ndarray): Fragmento da imagem com as bordas da escrita.
+        filename (str): Nome do arquivo da imagem.
+        output_dir (str): Diretório para salvar as imagens.
+        fragment_index (int): Índice do fragmento.
+        artifacts (ArtifactSink): Destino do gráfico do histograma.
+        families (tuple): Nomes das famílias.
+
+    Returns:
+        numpy.ndarray: Vetor de características.
+    """
+    if tuple(families) == DEFAULT_FAMILIES:
+        return slant(fragment, filename, output_dir, fragment_index, artifacts)
+
+    vector = extract_families(fragment, families)
+    if "slant" in families:
+        start = len(family_columns(families[:families.index("slant")]))
+        axial_slant = vector[start:start + len(AXIAL_SLANT_CHAINS)]
+        save_histogram(axial_slant, filename, output_dir, fragment_index, artifacts)
+    return vector
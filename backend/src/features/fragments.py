@@ -0,0 +1,204 @@
+import os
+import zlib
+from contextlib import nullcontext
+import cv2
+import numpy as np
+
+from .engine import describe_fragment, extract_families, family_columns, DEFAULT_FAMILIES
+from .preprocess import extract_edges
+from .artifacts import ArtifactSink
+
+# Grade de segmentação da página (linhas, colunas)
+FRAGMENT_GRID = (6, 4)
+
+# Fração mínima de pixels pretos e de pixels brancos de um fragmento útil
+MIN_INK_FRACTION = 0.01
+
+
+def fragment_params(count):
+    """
+    Retorna os parâmetros da segmentação que alteram os vetores extraídos, para
+    compor os parâmetros do cache de características.
+
+    Args:
+        count (int): Número de fragmentos por imagem (0 para a imagem inteira).
+
+    Returns:
+        dict: Parâmetros da segmentação, ou um dicionário vazio para a imagem inteira.
+    """
+    if not count:
+        return {}
+    return {"fragments": count, "grid": list(FRAGMENT_GRID), "min_ink": MIN_INK_FRACTION}
+
+
+def iter_fragments(image, rows=FRAGMENT_GRID[0], cols=FRAGMENT_GRID[1]):
+    """
+    Percorre os fragmentos de uma grade sobre a imagem, sem copiá-los.
+
+    Args:
+        image (numpy.ndarray): Imagem pré-processada (bordas).
+        rows (int): Número de linhas da grade.
+        cols (int): Número de colunas da grade.
+
+    Yields:
+        tuple: Linha e coluna do fragmento na grade e o fragmento (uma view da imagem).
+    """
+    height, width = image.shape
+    fragment_height = height // rows
+    fragment_width = width // cols
+
+    for i in range(rows):
+        for j in range(cols):
+            yield i, j, image[i * fragment_height:(i + 1) * fragment_height,
+                              j * fragment_width:(j + 1) * fragment_width]
+
+
+def is_informative(fragment, min_fraction=MIN_INK_FRACTION):
+    """
+    Verifica se um fragmento binário tem mais de `min_fraction` de pixels pretos
+    e de pixels brancos.
+
+    Como a imagem de bordas só tem pixels 0 e 255, as duas contagens saem de uma
+    única passagem (`cv2.countNonZero`) sobre o fragmento.
+
+    Args:
+        fragment (numpy.ndarray): Fragmento binário da imagem.
+        min_fraction (float): Fração mínima de cada cor.
+
+    Returns:
+        bool: True se o fragmento tem escrita suficiente.
+    """
+    total_pixels = fragment.size
+    white_pixels = cv2.countNonZero(fragment)
+    black_pixels = total_pixels - white_pixels
+    minimum = min_fraction * total_pixels
+    return black_pixels > minimum and white_pixels > minimum
+
+
+def segment_image(image, filename, output_dir, count=5, artifacts=None):
+    """
+    Segmenta a imagem em uma grade de 24 fragmentos, descarta os fragmentos com
+    pouca informação e sorteia `count` dos restantes.
+
+    Os fragmentos são views da imagem, sem cópia. O sorteio usa uma semente
+    derivada do nome do arquivo, de forma que a mesma imagem gera sempre os
+    mesmos fragmentos, em qualquer processo.
+
+    Args:
+        image (numpy.ndarray): Imagem pré-processada (bordas).
+        filename (str): Nome do arquivo da imagem.
+        output_dir (str): Diretório para salvar as imagens.
+        count (int): Número de fragmentos sorteados.
+        artifacts (ArtifactSink): Destino das imagens da segmentação e dos
+            fragmentos. Se None, as imagens são gravadas imediatamente.
+
+    Returns:
+        list: Fragmentos sorteados.
+    """
+    if artifacts is None:
+        artifacts = ArtifactSink()
+    save = artifacts.accepts(filename)
+
+    output_dir = f"{output_dir}/{filename[:-4]}"
+    fragments_output_dir = f"{output_dir}/fragmentos"
+
+    # Descarta fragmentos com pouca informação
+    fragments = []
+    for i, j, fragment in iter_fragments(image):
+        if save:
+            artifacts.save_image(os.path.join(fragments_output_dir, f"7_fragmento_{i}_{j}.png"), fragment)
+        if is_informative(fragment):
+            fragments.append(fragment)
+
+    if save:
+        # Imagem com linhas de segmentação
+        height, width = image.shape
+        rows, cols = FRAGMENT_GRID
+        segmented_image = cv2.cvtColor(image, cv2.COLOR_GRAY2BGR)
+        for i in range(rows):
+            y = i * (height // rows)
+            cv2.line(segmented_image, (0, y), (width, y), (0, 0, 255), 2)  # Linhas horizontais
+        for j in range(cols):
+            x = j * (width // cols)
+            cv2.line(segmented_image, (x, 0), (x, height), (0, 0, 255), 2)  # Linhas verticais
+        artifacts.save_image(os.path.join(output_dir, "6_segmentacao.png"), segmented_image)
+
+    # Seleciona os fragmentos de forma aleatória
+    rng = np.random.default_rng(zlib.crc32(filename.encode()))
+    selected = [fragments[index] for index in rng.permutation(len(fragments))[:count]]
+    if save:
+        for i, fragment in enumerate(selected):
+            artifacts.save_image(os.path.join(fragments_output_dir, f"8_fragmento_{i}_aleatorio.png"), fragment)
+
+    return selected
+
+
+def fragment_features(fragments, filename, output_dir, artifacts=None, executor=None,
+                      families=DEFAULT_FAMILIES):
+    """
+    Extrai o vetor de características (por padrão, a inclinação axial) de cada fragmento.
+
+    Args:
+        fragments (list): Fragmentos da imagem.
+        filename (str): Nome do arquivo da imagem.
+        output_dir (str): Diretório para salvar os histogramas.
+        artifacts (ArtifactSink): Destino dos histogramas.
+        executor (concurrent.futures.ThreadPoolExecutor): Pool de threads usado
+            para processar os fragmentos em paralelo (as operações do numpy
+            liberam o GIL). Se None, eles são processados em sequência.
+        families (tuple): Famílias de características extraídas (ver `features.engine`).
+
+    Returns:
+        numpy.ndarray: Matriz com um vetor de características por fragmento.
+        Fragmentos sem nenhuma cadeia de borda, cujo histograma não pode ser
+        normalizado, são descartados.
+    """
+    def extract(index, fragment):
+        return describe_fragment(fragment, filename, output_dir, index + 1, artifacts, families)
+
+    mapper = executor.map if executor is not None else map
+    vectors = list(mapper(extract, range(len(fragments)), fragments))
+    vectors = np.array(vectors, dtype=float).reshape(len(fragments), len(family_columns(families)))
+    return vectors[~np.isnan(vectors).any(axis=1)]
+
+
+def image_features(img, fragments=0, executor=None, families=DEFAULT_FAMILIES, stage=None):
+    """
+    Extrai em memória, sem gravar arquivos, os vetores de características de uma
+    imagem decodificada: um vetor da imagem inteira ou, com `fragments` maior
+    que zero, um vetor por fragmento sorteado.
+
+    Args:
+        img (numpy.ndarray): Imagem em escala de cinza.
+        fragments (int): Número de fragmentos por imagem (0 para a imagem inteira).
+        executor (concurrent.futures.ThreadPoolExecutor): Pool de threads que
+            processa os fragmentos (ver `fragment_features`).
+        families (tuple): Famílias de características extraídas (ver `features.engine`).
+        stage (callable): Função que recebe o nome de uma etapa ("preprocess",
+            "segment" ou "slant") e retorna o gerenciador de contexto que a mede
+            (opcional).
+
+    Returns:
+        numpy.ndarray: Matriz com um vetor de características por linha, ou None
+        se a imagem não tiver escrita suficiente: sem bordas, as contagens são
+        todas nulas e não podem ser normalizadas (o vetor seria NaN).
+    """
+    stage = stage or (lambda name: nullcontext())
+
+    with stage("preprocess"):
+        edges = extract_edges(img)
+
+    if not fragments:
+        with stage("slant"):
+            vectors = np.atleast_2d(extract_families(edges, families))
+        return None if np.isnan(vectors).any() else vectors
+
+    with stage("segment"):
+        selected = segment_image(edges, "", "", fragments, ArtifactSink("off"))
+    if not selected:
+        return None
+
+    with stage("slant"):
+        vectors = fragment_features(selected, "", "", ArtifactSink("off"), executor, families)
+    # Os fragmentos sem bordas já são descartados por `fragment_features`
+    return vectors if len(vectors) else None
@@ -0,0 +1,244 @@
+import os
+import sys
+import time
+import bisect
+import resource
+import threading
+from functools import wraps
+from contextlib import contextmanager
+
+# Limites superiores (em segundos) dos intervalos dos histogramas de duração
+BUCKETS = (0.001, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30, 60)
+
+
+def max_rss_bytes():
+    """
+    Retorna o pico de memória residente (high-water mark) do processo.
+
+    Returns:
+        int: Pico de memória residente, em bytes.
+    """
+    max_rss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # ru_maxrss é dado em KB no Linux e em bytes no macOS
+    return max_rss if sys.platform == "darwin" else max_rss * 1024
+
+
+def current_rss_bytes():
+    """
+    Retorna a memória residente atual do processo (e não o pico), lida de
+    /proc/self/statm.
+
+    Returns:
+        int: Memória residente, em bytes, ou None se não estiver disponível
+        (fora do Linux).
+    """
+    try:
+        with open("/proc/self/statm") as statm:
+            return int(statm.read().split()[1]) * os.sysconf("SC_PAGE_SIZE")
+    except (OSError, ValueError, IndexError):
+        return None
+
+
+def rss_growth(start_rss):
+    """
+    Calcula o aumento da memória residente desde uma leitura anterior.
+
+    Args:
+        start_rss (int): Memória residente no início da etapa (ver `current_rss_bytes`).
+
+    Returns:
+        int: Aumento, em bytes (zero se a memória diminuiu), ou None se a
+        memória residente não estiver disponível.
+    """
+    end_rss = current_rss_bytes()
+    if start_rss is None or end_rss is None:
+        return None
+    return max(0, end_rss - start_rss)
+
+
+class MetricsRegistry:
+    """
+    Métricas das etapas do processamento, mantidas em memória pelo processo.
+
+    Para cada etapa são mantidos um histograma de durações, o número de erros e
+    o maior aumento da memória residente durante uma execução da etapa (a
+    memória ao fim menos a memória no início). O aumento não inclui a memória
+    alocada e liberada dentro da etapa e, com etapas em threads concorrentes,
+    inclui a memória alocada pelas outras threads. O pico de memória do
+    processo é informado à parte. O custo de cada medição é de alguns
+    microssegundos.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._histograms = {}
+        self._errors = {}
+        self._rss_growth = {}
+
+    def observe(self, name, seconds, error=False, rss_growth=None):
+        """
+        Registra uma execução de uma etapa.
+
+        Args:
+            name (str): Nome da etapa (por exemplo, "svm.search").
+            seconds (float): Duração da execução.
+            error (bool): Se a execução terminou com uma exceção.
+            rss_growth (int): Aumento da memória residente durante a execução,
+                em bytes (ver `rss_growth`), ou None se não foi medido.
+        """
+        with self._lock:
+            histogram = self._histograms.get(name)
+            if histogram is None:
+                histogram = self._histograms[name] = {
+                    "buckets": [0] * (len(BUCKETS) + 1), "sum": 0.0, "count": 0,
+                }
+            histogram["buckets"][bisect.bisect_left(BUCKETS, seconds)] += 1
+            histogram["sum"] += seconds
+            histogram["count"] += 1
+            if error:
+                self._errors[name] = self._errors.get(name, 0) + 1
+            if rss_growth is not None:
+                self._rss_growth[name] = max(self._rss_growth.get(name, 0), rss_growth)
+
+    def snapshot(self):
+        """
+        Retorna uma cópia das métricas, que pode ser enviada entre processos.
+
+        Returns:
+            dict: Histogramas, erros e aumentos de memória por etapa, e o pico
+            de memória do processo.
+        """
+        with self._lock:
+            return {
+                "histograms": {
+                    name: {**histogram, "buckets": list(histogram["buckets"])}
+                    for name, histogram in self._histograms.items()
+                },
+                "errors": dict(self._errors),
+                "rss_growth": dict(self._rss_growth),
+                "process_max_rss": max_rss_bytes(),
+            }
+
+
+# Métricas do processo atual
+metrics = MetricsRegistry()
+
+
+@contextmanager
+def stage(name):
+    """
+    Mede a duração de um bloco de código como uma etapa.
+
+    Args:
+        name (str): Nome da etapa.
+    """
+    start_rss = current_rss_bytes()
+    start = time.perf_counter()
+    try:
+        yield
+    except BaseException:
+        metrics.observe(name, time.perf_counter() - start, True, rss_growth(start_rss))
+        raise
+    metrics.observe(name, time.perf_counter() - start, False, rss_growth(start_rss))
+
+
+def timed(name):
+    """
+    Decorador que mede cada chamada de uma função como uma etapa.
+
+    Args:
+        name (str): Nome da etapa.
+    """
+    def decorator(function):
+        @wraps(function)
+        def wrapper(*args, **kwargs):
+            with stage(name):
+                return function(*args, **kwargs)
+        return wrapper
+    return decorator
+
+
+def merge_snapshots(snapshots):
+    """
+    Soma as métricas de vários processos.
+
+    Args:
+        snapshots (list): Métricas de cada processo (ver `MetricsRegistry.snapshot`).
+
+    Returns:
+        dict: Métricas combinadas. Os aumentos e os picos de memória são os
+        maiores entre os processos.
+    """
+    merged = {"histograms": {}, "errors": {}, "rss_growth": {}, "process_max_rss": 0}
+    for snapshot in snapshots:
+        for name, histogram in snapshot["histograms"].items():
+            total = merged["histograms"].setdefault(
+                name, {"buckets": [0] * (len(BUCKETS) + 1), "sum": 0.0, "count": 0}
+            )
+            total["buckets"] = [a + b for a, b in zip(total["buckets"], histogram["buckets"])]
+            total["sum"] += histogram["sum"]
+            total["count"] += histogram["count"]
+        for name, errors in snapshot["errors"].items():
+            merged["errors"][name] = merged["errors"].get(name, 0) + errors
+        for name, growth in snapshot["rss_growth"].items():
+            merged["rss_growth"][name] = max(merged["rss_growth"].get(name, 0), growth)
+        merged["process_max_rss"] = max(merged["process_max_rss"], snapshot["process_max_rss"])
+    return merged
+
+
+def _labels(**labels):
+    return "{" + ",".join(f'{key}="{value}"' for key, value in labels.items()) + "}"
+
+
+def render_prometheus(snapshot, gauges=None):
+    """
+    Formata as métricas no formato de texto do Prometheus.
+
+    Args:
+        snapshot (dict): Métricas (ver `MetricsRegistry.snapshot` e `merge_snapshots`).
+        gauges (dict): Métricas adicionais do tipo gauge, no formato
+            {nome: (descrição, [(rótulos, valor), ...])}.
+
+    Returns:
+        str: Texto das métricas.
+    """
+    lines = [
+        "# HELP manuscritus_stage_seconds Duração de cada etapa do processamento.",
+        "# TYPE manuscritus_stage_seconds histogram",
+    ]
+    for name, histogram in sorted(snapshot["histograms"].items()):
+        cumulative = 0
+        for bound, count in zip(BUCKETS + ("+Inf",), histogram["buckets"]):
+            cumulative += count
+            lines.append(f"manuscritus_stage_seconds_bucket{_labels(stage=name, le=bound)} {cumulative}")
+        lines.append(f"manuscritus_stage_seconds_sum{_labels(stage=name)} {histogram['sum']}")
+        lines.append(f"manuscritus_stage_seconds_count{_labels(stage=name)} {histogram['count']}")
+
+    lines += [
+        "# HELP manuscritus_stage_errors_total Execuções de cada etapa que terminaram com erro.",
+        "# TYPE manuscritus_stage_errors_total counter",
+    ]
+    for name in sorted(snapshot["histograms"]):
+        errors = snapshot["errors"].get(name, 0)
+        lines.append(f"manuscritus_stage_errors_total{_labels(stage=name)} {errors}")
+
+    lines += [
+        "# HELP manuscritus_stage_rss_growth_bytes "
+        "Maior aumento da memória residente em uma execução de cada etapa.",
+        "# TYPE manuscritus_stage_rss_growth_bytes gauge",
+    ]
+    for name, growth in sorted(snapshot["rss_growth"].items()):
+        lines.append(f"manuscritus_stage_rss_growth_bytes{_labels(stage=name)} {growth}")
+
+    lines += [
+        "# HELP manuscritus_process_max_rss_bytes Maior pico de memória residente entre os processos.",
+        "# TYPE manuscritus_process_max_rss_bytes gauge",
+        f"manuscritus_process_max_rss_bytes {snapshot['process_max_rss']}",
+    ]
+
+    for name, (description, samples) in (gauges or {}).items():
+        lines += [f"# HELP {name} {description}", f"# TYPE {name} gauge"]
+        for labels, value in samples:
+            lines.append(f"{name}{_labels(**labels) if labels else ''} {value}")
+
+    return "\n".join(lines) + "\n"
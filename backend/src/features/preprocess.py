@@ -0,0 +1,218 @@
+import os
+import cv2
+import numpy as np
+
+from .slant import SLANT_VERSION
+from .artifacts import ArtifactSink
+
+# Tamanho do elemento estruturante usado na dilatação e na erosão
+KERNEL_SIZE = 5
+
+# Linhas vizinhas que a dilatação e a erosão leem acima e abaixo de cada linha
+MORPHOLOGY_HALO = KERNEL_SIZE // 2
+
+# Parâmetros que definem o vetor extraído; qualquer mudança invalida o cache
+FEATURE_PARAMS = {
+    "kernel_size": KERNEL_SIZE,
+    "threshold": "otsu",
+    "slant_version": SLANT_VERSION,
+}
+
+
+def decode_image(data):
+    """
+    Decodifica em memória uma imagem enviada como bytes, em escala de cinza.
+
+    Args:
+        data (bytes): Conteúdo do arquivo da imagem.
+
+    Returns:
+        numpy.ndarray: Imagem em escala de cinza, ou None se não puder ser decodificada.
+    """
+    buffer = np.frombuffer(data, dtype=np.uint8)
+    if buffer.size == 0:
+        return None
+    return cv2.imdecode(buffer, cv2.IMREAD_GRAYSCALE)
+
+
+def binarize(img):
+    """
+    Binariza a imagem usando o método de Otsu.
+
+    Args:
+        img (numpy.ndarray): Imagem do manuscrito em escala de cinza.
+
+    Returns:
+        numpy.ndarray: Imagem binarizada (0 e 255).
+    """
+    return cv2.threshold(img, 0, 255, cv2.THRESH_BINARY + cv2.THRESH_OTSU)[1]
+
+
+def edges_from_binary(thresh, output_dir=None, artifacts=None):
+    """
+    Extrai as bordas da escrita de uma imagem binarizada por dilatação e erosão.
+
+    Args:
+        thresh (numpy.ndarray): Imagem binarizada.
+        output_dir (str): Diretório das imagens intermediárias. Se None, elas não são gravadas.
+        artifacts (ArtifactSink): Destino das imagens intermediárias.
+
+    Returns:
+        numpy.ndarray: Imagem pré-processada (bordas pretas sobre fundo branco).
+    """
+    if output_dir is None or artifacts is None:
+        output_dir, artifacts = "", ArtifactSink("off")
+
+    # Aplica dilatação e erosão
+    kernel = np.ones((KERNEL_SIZE, KERNEL_SIZE), np.uint8)
+    dilated = cv2.dilate(thresh, kernel, iterations=1)
+    artifacts.save_image(os.path.join(output_dir, "3_dilatada.png"), dilated)
+
+    eroded = cv2.erode(thresh, kernel, iterations=1)
+    artifacts.save_image(os.path.join(output_dir, "4_erodida.png"), eroded)
+    edges = dilated - eroded
+
+    # Combina as bordas da máscara com a imagem binarizada original
+    edges = cv2.bitwise_and(thresh, edges)
+
+    # Inverte a imagem para que o fundo fique branco e as bordas pretas
+    inverted_edges = cv2.bitwise_not(edges)
+    artifacts.save_image(os.path.join(output_dir, "5_bordas.png"), inverted_edges)
+
+    return inverted_edges
+
+
+def extract_edges(img, output_dir=None, artifacts=None):
+    """
+    Extrai as bordas da escrita de uma imagem em escala de cinza, sem acessar o
+    disco a não ser pelas imagens intermediárias entregues a `artifacts`.
+
+    Args:
+        img (numpy.ndarray): Imagem do manuscrito em escala de cinza.
+        output_dir (str): Diretório das imagens intermediárias. Se None, elas não são gravadas.
+        artifacts (ArtifactSink): Destino das imagens intermediárias.
+
+    Returns:
+        numpy.ndarray: Imagem pré-processada (bordas da escrita).
+    """
+    if output_dir is None or artifacts is None:
+        output_dir, artifacts = "", ArtifactSink("off")
+
+    # Binariza a imagem usando o método de Otsu
+    thresh = binarize(img)
+    artifacts.save_image(os.path.join(output_dir, "2_binarizada.png"), thresh)
+
+    return edges_from_binary(thresh, output_dir, artifacts)
+
+
+def otsu_threshold(img):
+    """
+    Calcula o limiar de Otsu de uma imagem a partir do seu histograma, sem
+    alocar uma imagem binarizada.
+
+    Reproduz o cálculo do `cv2.threshold` com `cv2.THRESH_OTSU`, de forma que a
+    binarização por faixas use exatamente o mesmo limiar da imagem inteira.
+
+    Args:
+        img (numpy.ndarray): Imagem em escala de cinza (uint8).
+
+    Returns:
+        int: Limiar de Otsu.
+    """
+    hist = cv2.calcHist([img], [0], None, [256], [0, 256]).ravel().astype(np.float64)
+    scale = 1.0 / img.size
+    epsilon = np.finfo(np.float32).eps
+
+    mu = float(np.dot(np.arange(256), hist)) * scale
+    q1 = mu1 = max_sigma = 0.0
+    threshold = 0
+
+    for i in range(256):
+        p_i = hist[i] * scale
+        mu1 *= q1
+        q1 += p_i
+        q2 = 1.0 - q1
+        if min(q1, q2) < epsilon or max(q1, q2) > 1.0 - epsilon:
+            continue
+        mu1 = (mu1 + i * p_i) / q1
+        mu2 = (mu - q1 * mu1) / q2
+        sigma = q1 * q2 * (mu1 - mu2) ** 2
+        if sigma > max_sigma:
+            max_sigma = sigma
+            threshold = i
+
+    return threshold
+
+
+def iter_edge_strips(img, strip_rows=512):
+    """
+    Extrai as bordas da escrita em faixas horizontais, com o mesmo resultado de
+    `extract_edges` e memória limitada ao tamanho de uma faixa.
+
+    Cada faixa é processada com `MORPHOLOGY_HALO` linhas extras acima e abaixo,
+    para que a dilatação e a erosão vejam os mesmos vizinhos que veriam na
+    imagem inteira. Os buffers das etapas são alocados uma única vez e reusados
+    em todas as faixas, com as operações do OpenCV gravando neles via `dst=`.
+
+    Args:
+        img (numpy.ndarray): Imagem do manuscrito em escala de cinza.
+        strip_rows (int): Número de linhas de cada faixa.
+
+    Yields:
+        tuple: Primeira linha da faixa na imagem e as bordas da faixa. O array
+        é um buffer reusado: deve ser consumido (ou copiado) antes da próxima faixa.
+    """
+    height, width = img.shape
+    strip_rows = max(1, strip_rows)
+    threshold = otsu_threshold(img)
+    kernel = np.ones((KERNEL_SIZE, KERNEL_SIZE), np.uint8)
+
+    buffer_rows = min(height, strip_rows + 2 * MORPHOLOGY_HALO)
+    thresh = np.empty((buffer_rows, width), np.uint8)
+    dilated = np.empty_like(thresh)
+    eroded = np.empty_like(thresh)
+
+    for start in range(0, height, strip_rows):
+        end = min(start + strip_rows, height)
+        top = max(0, start - MORPHOLOGY_HALO)
+        bottom = min(height, end + MORPHOLOGY_HALO)
+        rows = bottom - top
+
+        # Binariza com o limiar de Otsu da imagem inteira
+        cv2.threshold(img[top:bottom], threshold, 255, cv2.THRESH_BINARY, dst=thresh[:rows])
+
+        # Dilatação e erosão; as bordas da faixa que não são bordas da imagem
+        # são cobertas pelas linhas extras
+        cv2.dilate(thresh[:rows], kernel, dst=dilated[:rows], iterations=1)
+        cv2.erode(thresh[:rows], kernel, dst=eroded[:rows], iterations=1)
+
+        # Bordas combinadas com a imagem binarizada e invertidas, no próprio buffer
+        edges = dilated[:rows]
+        cv2.subtract(edges, eroded[:rows], dst=edges)
+        cv2.bitwise_and(thresh[:rows], edges, dst=edges)
+        cv2.bitwise_not(edges, dst=edges)
+
+        yield start, edges[start - top:end - top]
+
+
+def extract_edges_tiled(img, strip_rows=512, out=None):
+    """
+    Extrai as bordas da escrita por faixas (ver `iter_edge_strips`), gravando
+    o resultado em um único array do tamanho da imagem.
+
+    Args:
+        img (numpy.ndarray): Imagem do manuscrito em escala de cinza.
+        strip_rows (int): Número de linhas de cada faixa.
+        out (numpy.ndarray): Array de saída pré-alocado (uint8, mesmo formato
+            da imagem). Se None, um novo array é alocado.
+
+    Returns:
+        numpy.ndarray: Imagem pré-processada (bordas da escrita), idêntica à de `extract_edges`.
+    """
+    if out is None:
+        out = np.empty_like(img)
+
+    for start, edges in iter_edge_strips(img, strip_rows):
+        out[start:start + edges.shape[0]] = edges
+
+    return out
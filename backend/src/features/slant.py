@@ -1,8 +1,12 @@
 import os
 import numpy as np
-import matplotlib
-matplotlib.use('Agg') 
-import matplotlib.pyplot as plt
+
+from .artifacts import ArtifactSink
+from .metrics import timed
+
+# Versão da definição da inclinação axial. Deve ser incrementada sempre que
+# uma mudança no cálculo alterar os vetores gerados, invalidando o cache.
+SLANT_VERSION = 1
 
 def normalize_histogram(angle_vector):
     """
@@ -24,7 +28,147 @@ def normalize_histogram(angle_vector):
 
     return normalized_angle_vector
 
-def slant(fragment, filename, output_dir, fragment_index=1):
+# Deslocamentos (linha, coluna) dos 4 pixels que formam a cadeia de cada
+# direção, a partir do pixel central. A posição na tupla é o índice do bin.
+AXIAL_SLANT_CHAINS = (
+    ((0, -1), (0, -2), (0, -3), (0, -4)),
+    ((-1, 0), (-2, -1), (-3, -1), (-4, -1)),
+    ((-1, -1), (-2, -1), (-3, -2), (-4, -2)),
+    ((-1, -1), (-2, -2), (-3, -2), (-4, -3)),
+    ((-1, -1), (-2, -2), (-3, -3), (-4, -4)),
+    ((-1, -1), (-2, -2), (-3, -3), (-4, -3)),
+    ((-1, -1), (-2, -1), (-3, -2), (-4, -2)),
+    ((-1, 0), (-2, -1), (-3, -1), (-4, -1)),
+    ((-1, 0), (-2, 0), (-3, 0), (-4, 0)),
+    ((-1, 0), (-2, 1), (-3, 1), (-4, 1)),
+    ((-1, 1), (-2, 1), (-3, 2), (-4, 2)),
+    ((-1, 1), (-2, 2), (-3, 2), (-4, 3)),
+    ((-1, 1), (-2, 2), (-3, 3), (-4, 4)),
+    ((-1, 1), (-2, 2), (-2, 3), (-3, 4)),
+    ((-1, 1), (-1, 2), (-2, 3), (-2, 4)),
+    ((-1, 1), (-2, 2), (-3, 3), (-4, 4)),
+    ((0, 1), (0, 2), (0, 3), (0, 4)),
+)
+
+# Margem ignorada em cada borda, igual ao alcance máximo das cadeias
+CHAIN_REACH = 4
+
+
+def axial_slant_histogram(fragment, center_rows=None):
+    """
+    Conta, para cada uma das 17 direções, os pixels de borda que iniciam uma
+    cadeia de 4 pixels pretos naquela direção.
+
+    A contagem é feita de forma vetorizada: cada deslocamento da cadeia vira
+    uma fatia deslocada da máscara de pixels pretos, e as fatias são combinadas
+    com AND sobre a imagem inteira. Prefixos de cadeia em comum entre direções
+    são calculados uma única vez.
+
+    Args:
+        fragment (numpy.ndarray): Fragmento da imagem com as bordas da escrita.
+        center_rows (tuple): Intervalo [início, fim) das linhas dos pixels
+            centrais. Se None, são todas as linhas a pelo menos `CHAIN_REACH`
+            pixels das bordas. O início deve ser maior ou igual a `CHAIN_REACH`.
+
+    Returns:
+        numpy.ndarray: Contagem (não normalizada) de cada uma das 17 direções.
+    """
+    height, width = fragment.shape
+    axial_slant = np.zeros(len(AXIAL_SLANT_CHAINS), dtype=int)
+    first, last = center_rows or (CHAIN_REACH, height - CHAIN_REACH)
+
+    # Sem pixels centrais válidos, todas as contagens são zero
+    if last <= first or width <= 2 * CHAIN_REACH:
+        return axial_slant
+
+    black = fragment == 0
+
+    def shifted(di, dj):
+        # Janela da máscara deslocada de (di, dj) em relação aos pixels centrais
+        return black[first + di:last + di,
+                     CHAIN_REACH + dj:width - CHAIN_REACH + dj]
+
+    # Máscaras já calculadas para cada prefixo de cadeia
+    prefixes = {(): shifted(0, 0)}
+
+    for index, chain in enumerate(AXIAL_SLANT_CHAINS):
+        for length in range(1, len(chain) + 1):
+            prefix = chain[:length]
+            if prefix not in prefixes:
+                prefixes[prefix] = prefixes[chain[:length - 1]] & shifted(*chain[length - 1])
+        axial_slant[index] = np.count_nonzero(prefixes[chain])
+
+    return axial_slant
+
+
+def axial_slant_histogram_strips(strips, height):
+    """
+    Calcula `axial_slant_histogram` de uma imagem recebida em faixas
+    horizontais consecutivas, sem montar a imagem inteira.
+
+    As cadeias só alcançam linhas acima do pixel central, então basta guardar
+    as últimas `CHAIN_REACH` linhas de cada faixa para processar a seguinte.
+
+    Args:
+        strips (iterable): Pares (primeira linha, faixa) em ordem, cobrindo a
+            imagem inteira. As faixas podem ser buffers reusados.
+        height (int): Número total de linhas da imagem.
+
+    Returns:
+        numpy.ndarray: Contagem (não normalizada) de cada uma das 17 direções.
+    """
+    axial_slant = np.zeros(len(AXIAL_SLANT_CHAINS), dtype=int)
+    window = None
+
+    for start, strip in strips:
+        rows = strip.shape[0]
+        if window is None or window.shape[0] < CHAIN_REACH + rows:
+            # As primeiras CHAIN_REACH linhas guardam o final da faixa anterior
+            previous = window[:CHAIN_REACH] if window is not None else None
+            window = np.empty((CHAIN_REACH + rows, strip.shape[1]), dtype=strip.dtype)
+            if previous is not None:
+                window[:CHAIN_REACH] = previous
+        window[CHAIN_REACH:CHAIN_REACH + rows] = strip
+
+        # Pixels centrais da faixa, em coordenadas da janela
+        first = max(start, CHAIN_REACH) - start + CHAIN_REACH
+        last = min(start + rows, height - CHAIN_REACH) - start + CHAIN_REACH
+        axial_slant += axial_slant_histogram(window[:CHAIN_REACH + rows], (first, last))
+
+        window[:CHAIN_REACH] = window[rows:rows + CHAIN_REACH].copy()
+
+    return axial_slant
+
+
+def render_histogram(axial_slant, fragment_index):
+    """
+    Gera o gráfico de barras do histograma da inclinação axial.
+
+    Args:
+        axial_slant (numpy.ndarray): Vetor normalizado da inclinação axial.
+        fragment_index (int): Índice do fragmento.
+
+    Returns:
+        matplotlib.figure.Figure: Figura com o histograma.
+    """
+    # Importado apenas quando o histograma é gerado
+    from matplotlib.figure import Figure
+
+    figure = Figure()
+    ax = figure.subplots()
+
+    angles = np.linspace(0, 180, 17, endpoint=False)
+    ax.bar(angles, axial_slant)
+    ax.set_xlabel("Ângulo (graus)")
+    ax.set_ylabel("Frequência")
+    ax.set_title(f"Histograma da Inclinação Axial - Fragment {fragment_index}")
+    ax.set_xlim(0, 180)
+
+    return figure
+
+
+@timed("slant")
+def slant(fragment, filename, output_dir, fragment_index=1, artifacts=None):
     """
     Extrai a inclinação axial de um fragmento utilizando a técnica de 
     distribuição de borda direcional.
@@ -33,70 +177,40 @@ def slant(fragment, filename, output_dir, fragment_index=1):
         fragment (numpy.ndarray): Fragmento da imagem com as bordas da escrita.
         output_dir (str): Diretório para salvar as imagens.
         fragment_index (int): Índice do fragmento.
+        artifacts (ArtifactSink): Destino do gráfico do histograma. Se None, o
+            gráfico é gravado imediatamente.
 
     Returns:
         numpy.ndarray: Vetor de características da inclinação axial.
     """
-    output_dir = f"{output_dir}/{filename[:-4]}/histograms"
-    os.makedirs(output_dir, exist_ok=True)
-    
-    height, width = fragment.shape
-    
-    # Inicializa o vetor de características com 17 posições
-    axial_slant = np.zeros(17, dtype=int)
-    
-    # Itera sobre os pixels do fragmento, considerando o elemento estruturante 5x5
-    for i in range(4, height - 4):
-        for j in range(4, width - 4):
-            central_pixel = fragment[i, j]
-            if central_pixel == 0:
-                if (fragment[i, j + 1] == 0) and (fragment[i, j + 2] == 0) and (fragment[i, j + 3] == 0) and (fragment[i, j + 4] == 0):
-                    axial_slant[16] += 1
-                if (fragment[i-1, j + 1] == 0) and (fragment[i-2, j + 2] == 0) and (fragment[i-3, j + 3] == 0) and (fragment[i-4, j + 4] == 0):
-                    axial_slant[15] += 1
-                if (fragment[i-1, j + 1] == 0) and (fragment[i-1, j + 2] == 0) and (fragment[i-2, j + 3] == 0) and (fragment[i-2, j + 4] == 0):
-                    axial_slant[14] += 1
-                if (fragment[i-1, j + 1] == 0) and (fragment[i-2, j + 2] == 0) and (fragment[i-2, j + 3] == 0) and (fragment[i-3, j + 4] == 0):
-                    axial_slant[13] += 1
-                if (fragment[i-1, j + 1] == 0) and (fragment[i-2, j + 2] == 0) and (fragment[i-3, j + 3] == 0) and (fragment[i-4, j + 4] == 0):
-                    axial_slant[12] += 1
-                if (fragment[i-1, j + 1] == 0) and (fragment[i-2, j + 2] == 0) and (fragment[i-3, j + 2] == 0) and (fragment[i-4, j + 3] == 0):
-                    axial_slant[11] += 1
-                if (fragment[i-1, j + 1] == 0) and (fragment[i-2, j + 1] == 0) and (fragment[i-3, j + 2] == 0) and (fragment[i-4, j + 2] == 0):
-                    axial_slant[10] += 1
-                if (fragment[i-1, j] == 0) and (fragment[i-2, j + 1] == 0) and (fragment[i-3, j + 1] == 0) and (fragment[i-4, j + 1] == 0):
-                    axial_slant[9] += 1
-                if (fragment[i-1, j] == 0) and (fragment[i-2, j] == 0) and (fragment[i-3, j] == 0) and (fragment[i-4, j] == 0):
-                    axial_slant[8] += 1
-                if (fragment[i-1, j] == 0) and (fragment[i-2, j - 1] == 0) and (fragment[i-3, j - 1] == 0) and (fragment[i-4, j - 1] == 0):
-                    axial_slant[7] += 1
-                if (fragment[i-1, j - 1] == 0) and (fragment[i-2, j - 1] == 0) and (fragment[i-3, j - 2] == 0) and (fragment[i-4, j - 2] == 0):
-                    axial_slant[6] += 1
-                if (fragment[i-1, j - 1] == 0) and (fragment[i-2, j - 2] == 0) and (fragment[i-3, j - 3] == 0) and (fragment[i-4, j - 3] == 0):
-                    axial_slant[5] += 1
-                if (fragment[i-1, j - 1] == 0) and (fragment[i-2, j - 2] == 0) and (fragment[i-3, j - 3] == 0) and (fragment[i-4, j - 4] == 0):
-                    axial_slant[4] += 1
-                if (fragment[i-1, j - 1] == 0) and (fragment[i-2, j - 2] == 0) and (fragment[i-3, j - 2] == 0) and (fragment[i-4, j - 3] == 0):
-                    axial_slant[3] += 1
-                if (fragment[i-1, j - 1] == 0) and (fragment[i-2, j - 1] == 0) and (fragment[i-3, j - 2] == 0) and (fragment[i-4, j - 2] == 0):
-                    axial_slant[2] += 1
-                if (fragment[i-1, j] == 0) and (fragment[i-2, j - 1] == 0) and (fragment[i-3, j - 1] == 0) and (fragment[i-4, j - 1] == 0):
-                    axial_slant[1] += 1
-                if (fragment[i, j - 1] == 0) and (fragment[i, j - 2] == 0) and (fragment[i, j - 3] == 0) and (fragment[i, j - 4] == 0):
-                    axial_slant[0] += 1
-                
+    # Conta as cadeias de cada direção sobre a imagem inteira de uma só vez
+    axial_slant = axial_slant_histogram(fragment)
 
     # Normaliza o vetor de características
     axial_slant = normalize_histogram(axial_slant)
 
-    # Gera e salva o histograma da inclinação axial
-    angles = np.linspace(0, 180, 17, endpoint=False)
-    plt.bar(angles, axial_slant)
-    plt.xlabel("Ângulo (graus)")
-    plt.ylabel("Frequência")
-    plt.title(f"Histograma da Inclinação Axial - Fragment {fragment_index}")
-    plt.xlim(0, 180)
-    plt.savefig(os.path.join(output_dir, f"8_histograma_fragmento_{fragment_index}.png"))
-    plt.clf()
-
+    save_histogram(axial_slant, filename, output_dir, fragment_index, artifacts)
     return axial_slant
+
+
+def save_histogram(axial_slant, filename, output_dir, fragment_index=1, artifacts=None):
+    """
+    Gera e salva o gráfico do histograma da inclinação axial.
+
+    Args:
+        axial_slant (numpy.ndarray): Vetor normalizado da inclinação axial.
+        filename (str): Nome do arquivo da imagem.
+        output_dir (str): Diretório para salvar as imagens.
+        fragment_index (int): Índice do fragmento.
+        artifacts (ArtifactSink): Destino do gráfico. Se None, o gráfico é
+            gravado imediatamente.
+    """
+    if artifacts is None:
+        artifacts = ArtifactSink()
+
+    if artifacts.accepts(filename):
+        output_dir = f"{output_dir}/{filename[:-4]}/histograms"
+        artifacts.save_figure(
+            os.path.join(output_dir, f"8_histograma_fragmento_{fragment_index}.png"),
+            render_histogram, axial_slant, fragment_index,
+        )
@@ -0,0 +1,201 @@
+import os
+import csv
+import sys
+import json
+import shutil
+import numpy as np
+
+# Arquivos de um repositório de características
+MATRIX_FILE = "features.f32"
+AUTHORS_FILE = "authors.i32"
+META_FILE = "meta.json"
+STORE_VERSION = 1
+
+
+def store_path_for(csv_path):
+    """
+    Retorna o caminho do repositório binário correspondente a um CSV de características.
+
+    Args:
+        csv_path (str): Caminho para o CSV (por exemplo, "treino.csv").
+
+    Returns:
+        str: Caminho do repositório (por exemplo, "treino.features").
+    """
+    return f"{os.path.splitext(csv_path)[0]}.features"
+
+
+def write_feature_store(store_path, labels, matrix, columns):
+    """
+    Grava um repositório binário de características.
+
+    As linhas são agrupadas por autor (em ordem alfabética, preservando a ordem
+    original dentro de cada autor), de forma que as amostras de cada autor
+    ocupem um intervalo contínuo de linhas.
+
+    Args:
+        store_path (str): Diretório do repositório.
+        labels (list): Autor de cada linha.
+        matrix (np.array): Matriz de características (uma linha por amostra).
+        columns (list): Nomes das colunas de características.
+    """
+    authors, codes = np.unique(np.asarray(labels), return_inverse=True)
+    order = np.argsort(codes, kind="stable")
+    codes = codes[order].astype(np.int32)
+    matrix = np.asarray(matrix, dtype=np.float32)[order]
+    offsets = np.searchsorted(codes, np.arange(len(authors) + 1))
+
+    # Grava em um diretório temporário e o renomeia ao final, para que
+    # leitores nunca vejam um repositório incompleto
+    tmp_path = f"{store_path}.tmp"
+    shutil.rmtree(tmp_path, ignore_errors=True)
+    os.makedirs(tmp_path)
+
+    matrix.tofile(os.path.join(tmp_path, MATRIX_FILE))
+    codes.tofile(os.path.join(tmp_path, AUTHORS_FILE))
+    with open(os.path.join(tmp_path, META_FILE), "w") as meta_file:
+        json.dump({
+            "version": STORE_VERSION,
+            "n_rows": int(matrix.shape[0]),
+            "n_features": int(matrix.shape[1]),
+            "columns": list(columns),
+            "authors": authors.tolist(),
+            "offsets": offsets.tolist(),
+        }, meta_file)
+
+    shutil.rmtree(store_path, ignore_errors=True)
+    os.replace(tmp_path, store_path)
+
+
+def convert_csv(csv_path, store_path=None):
+    """
+    Converte um CSV de características (coluna "autor" seguida das
+    características) em um repositório binário.
+
+    Args:
+        csv_path (str): Caminho para o CSV.
+        store_path (str): Diretório do repositório. Se None, usa `store_path_for`.
+
+    Returns:
+        str: Caminho do repositório gravado.
+    """
+    store_path = store_path or store_path_for(csv_path)
+
+    with open(csv_path, newline="") as csvfile:
+        reader = csv.reader(csvfile)
+        header = next(reader)
+        rows = list(reader)
+
+    labels = [row[0] for row in rows]
+    matrix = np.array([row[1:] for row in rows], dtype=np.float32).reshape(len(rows), len(header) - 1)
+    write_feature_store(store_path, labels, matrix, header[1:])
+    return store_path
+
+
+class FeatureStore:
+    """
+    Repositório binário de características, lido sem cópia por memory-map.
+
+    Contém uma matriz float32 (`features.f32`), o código inteiro do autor de
+    cada linha (`authors.i32`) e um arquivo de metadados (`meta.json`) com os
+    nomes das colunas, os nomes dos autores e o intervalo de linhas de cada autor.
+
+    Args:
+        store_path (str): Diretório do repositório.
+    """
+
+    def __init__(self, store_path):
+        self.store_path = store_path
+        with open(os.path.join(store_path, META_FILE)) as meta_file:
+            meta = json.load(meta_file)
+
+        if meta["version"] != STORE_VERSION:
+            raise ValueError(f"Versão do repositório não suportada: {meta['version']}")
+
+        self.columns = meta["columns"]
+        self.authors = np.array(meta["authors"])
+        self.offsets = np.array(meta["offsets"])
+        self._author_codes = {author: code for code, author in enumerate(meta["authors"])}
+
+        shape = (meta["n_rows"], meta["n_features"])
+        self.matrix = self._memmap(MATRIX_FILE, np.float32, shape)
+        self.codes = self._memmap(AUTHORS_FILE, np.int32, (meta["n_rows"],))
+
+    def _memmap(self, name, dtype, shape):
+        if shape[0] == 0:
+            return np.zeros(shape, dtype=dtype)
+        return np.memmap(os.path.join(self.store_path, name), dtype=dtype, mode="r", shape=shape)
+
+    def __len__(self):
+        return self.matrix.shape[0]
+
+    def rows(self, authors):
+        """
+        Retorna os índices das linhas de um conjunto de autores, em ordem de linha.
+
+        Args:
+            authors (list): Nomes dos autores. Autores ausentes são ignorados.
+
+        Returns:
+            np.array: Índices das linhas.
+        """
+        codes = np.array(
+            sorted(self._author_codes[a] for a in authors if a in self._author_codes),
+            dtype=np.int64,
+        )
+        starts = self.offsets[codes]
+        lengths = self.offsets[codes + 1] - starts
+
+        # Concatena os intervalos [início, fim) de cada autor sem laço em Python
+        block_starts = np.cumsum(lengths) - lengths
+        return np.repeat(starts - block_starts, lengths) + np.arange(lengths.sum())
+
+    def subset(self, authors):
+        """
+        Retorna as características e os rótulos de um conjunto de autores.
+
+        Args:
+            authors (list): Nomes dos autores.
+
+        Returns:
+            tuple: Matriz de características (float64) e rótulos (autores).
+        """
+        rows = self.rows(authors)
+        return self.matrix[rows].astype(np.float64), self.authors[self.codes[rows]]
+
+    def labels(self):
+        """
+        Retorna o autor de cada linha.
+
+        Returns:
+            np.array: Rótulos (autores).
+        """
+        return self.authors[self.codes]
+
+
+def open_feature_store(csv_path):
+    """
+    Abre o repositório binário de um CSV de características, convertendo o CSV
+    se o repositório não existir ou for mais antigo que ele.
+
+    Args:
+        csv_path (str): Caminho para o CSV de características.
+
+    Returns:
+        FeatureStore: Repositório aberto.
+    """
+    store_path = store_path_for(csv_path)
+    meta_path = os.path.join(store_path, META_FILE)
+
+    if not os.path.exists(meta_path) or (
+        os.path.exists(csv_path) and os.path.getmtime(csv_path) > os.path.getmtime(meta_path)
+    ):
+        convert_csv(csv_path, store_path)
+
+    return FeatureStore(store_path)
+
+
+if __name__ == "__main__":
+    # Conversão única dos CSVs existentes: python src/features/store.py treino.csv teste.csv
+    for path in sys.argv[1:]:
+        print(f"{path} -> {convert_csv(path)}")
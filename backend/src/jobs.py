@@ -0,0 +1,460 @@
+import os
+import time
+import uuid
+import cProfile
+import threading
+import multiprocessing
+from functools import partial
+from collections import OrderedDict, deque
+from concurrent.futures import Future, ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+
+import numpy as np
+
+from .models.main import init
+from .models import progress
+from .models.registry import ModelRegistry
+from .features.metrics import metrics, merge_snapshots
+
+# Estado de cada processo do pool, criado por `_init_worker`
+_registry = None
+_artifacts = None
+_events = None
+
+
+def _init_worker(registry_kwargs, artifacts, events):
+    """
+    Inicializa um processo do pool: abre os repositórios de características uma
+    única vez e prepara o registro de modelos e o destino dos artefatos.
+
+    Args:
+        registry_kwargs (dict): Parâmetros do `ModelRegistry` do processo.
+        artifacts (ArtifactSink): Destino dos artefatos gerados pelos modelos.
+        events (multiprocessing.Queue): Fila dos eventos de progresso dos jobs.
+    """
+    global _registry, _artifacts, _events
+
+    # Processos criados por fork herdam o mesmo estado do gerador aleatório;
+    # sem uma nova semente, todos sorteariam os mesmos autores
+    np.random.seed()
+
+    _registry = ModelRegistry(**registry_kwargs)
+    _registry.load()
+    _artifacts = artifacts
+    _events = events
+
+
+def _ping(delay):
+    # Ocupa o processo por um instante, para que as tarefas de `warm_up` se
+    # distribuam entre todos os processos do pool
+    time.sleep(delay)
+    return os.getpid()
+
+
+def run_experiment(num_authors, models, search=None, evaluation=None, profile_path=None,
+                   job_id=None):
+    """
+    Executa `init` em um processo do pool. Os eventos de progresso são enviados
+    ao servidor pela fila de eventos, seguidos de um marcador de fim (None).
+
+    Args:
+        num_authors (int): Número de autores aleatórios a serem selecionados.
+        models (list): Lista de modelos a serem testados.
+        search (dict): Configuração da busca de hiperparâmetros do SVM.
+        evaluation (dict): Avaliação em vários subconjuntos de autores
+            ("subsets", "seed" e "n_jobs"; ver `init`).
+        profile_path (str): Se informado, `init` é executado sob o cProfile e as
+            estatísticas são gravadas nesse arquivo (legível com `pstats`).
+        job_id (str): Identificador do job, que acompanha os seus eventos de progresso.
+
+    Returns:
+        tuple: Resultados de `init`, PID do processo, estatísticas do seu registro
+        de modelos e suas métricas (ver `MetricsRegistry.snapshot`).
+    """
+    run = partial(init, num_authors, models, _artifacts, _registry, search, **(evaluation or {}))
+    progress.set_listener(lambda event: _events.put((job_id, event)))
+    try:
+        if profile_path is None:
+            results = run()
+        else:
+            profiler = cProfile.Profile()
+            results = profiler.runcall(run)
+            os.makedirs(os.path.dirname(profile_path) or ".", exist_ok=True)
+            profiler.dump_stats(profile_path)
+            results = {**results, "profile": profile_path}
+    finally:
+        progress.set_listener(None)
+        _events.put((job_id, None))
+    return results, os.getpid(), _registry.stats(), metrics.snapshot()
+
+
+class QueueFullError(Exception):
+    """
+    Lançada quando o número de jobs pendentes atinge o limite da fila.
+    """
+
+
+class Job:
+    """
+    Job de treino/avaliação submetido ao pool.
+
+    Args:
+        job_id (str): Identificador do job.
+        future (concurrent.futures.Future): Execução do job no pool.
+        params (dict): Parâmetros da requisição.
+    """
+
+    def __init__(self, job_id, future, params):
+        self.job_id = job_id
+        self.future = future
+        self.params = params
+        self.submitted_at = time.time()
+
+        # Eventos de progresso já publicados e funções que recebem os próximos
+        self.events = []
+        self.worker_done = False
+        self._subscribers = []
+        self._closed = False
+        self._events_lock = threading.Lock()
+
+    def publish(self, event, final=False):
+        """
+        Publica um evento de progresso para os assinantes do job.
+
+        Args:
+            event (dict): Evento, com o tipo em "event".
+            final (bool): Se True, é o último evento do job: os assinantes são
+                descartados e eventos posteriores são ignorados.
+        """
+        with self._events_lock:
+            if self._closed:
+                return
+            self.events.append(event)
+            for callback in self._subscribers:
+                callback(event)
+            if final:
+                self._closed = True
+                self._subscribers.clear()
+
+    def subscribe(self, callback):
+        """
+        Assina os eventos de progresso do job. Os eventos já publicados são
+        entregues imediatamente, na ordem em que ocorreram.
+
+        Args:
+            callback (callable): Função chamada com cada evento, na thread que o
+                publica; não deve bloquear.
+        """
+        with self._events_lock:
+            for event in self.events:
+                callback(event)
+            if not self._closed:
+                self._subscribers.append(callback)
+
+    def unsubscribe(self, callback):
+        with self._events_lock:
+            if callback in self._subscribers:
+                self._subscribers.remove(callback)
+
+    @property
+    def status(self):
+        if self.future.cancelled():
+            return "cancelled"
+        if self.future.done():
+            return "failed" if self.future.exception() is not None else "finished"
+        if self.future.running():
+            return "running"
+        return "pending"
+
+    def to_dict(self):
+        return {
+            "job_id": self.job_id,
+            "status": self.status,
+            "params": self.params,
+            "submitted_at": self.submitted_at,
+        }
+
+
+class JobManager:
+    """
+    Executa os jobs de treino/avaliação em um pool limitado de processos, fora
+    do laço de eventos do servidor.
+
+    No máximo `max_workers` jobs são enviados ao pool ao mesmo tempo; os demais
+    aguardam em uma fila própria, de onde ainda podem ser cancelados. Quando a
+    fila tem `max_queue` jobs, novos jobs são recusados (controle de admissão).
+    Os jobs concluídos mais antigos são esquecidos quando passam de `max_finished`.
+
+    Os eventos de progresso dos processos chegam por uma fila compartilhada e são
+    publicados em cada job (ver `Job.subscribe`) por uma thread própria. O
+    último evento de cada job é "result" (com o resultado), "error" ou "cancelled".
+
+    Se um processo do pool morrer (por exemplo, encerrado por falta de
+    memória), o `ProcessPoolExecutor` fica inutilizável: os jobs em execução
+    falham com `BrokenProcessPool` e o pool é recriado, com a mesma
+    inicialização, antes de enviar os próximos jobs.
+
+    Args:
+        max_workers (int): Número de processos do pool.
+        max_queue (int): Número máximo de jobs aguardando um processo livre.
+        registry_kwargs (dict): Parâmetros do `ModelRegistry` de cada processo.
+        artifacts (ArtifactSink): Destino dos artefatos gerados pelos modelos.
+        max_finished (int): Número máximo de jobs concluídos mantidos em memória.
+        profile_dir (str): Diretório dos perfis (cProfile) dos jobs submetidos
+            com `profile=True`.
+    """
+
+    def __init__(self, max_workers=None, max_queue=8, registry_kwargs=None,
+                 artifacts=None, max_finished=1000, profile_dir="profiles"):
+        self.max_workers = max_workers or os.cpu_count()
+        self.max_queue = max_queue
+        self.max_finished = max_finished
+        self.profile_dir = profile_dir
+        self._registry_kwargs = registry_kwargs or {}
+        self._artifacts = artifacts
+        self._jobs = OrderedDict()
+        self._pending = deque()
+        self._running = 0
+        self._worker_stats = {}
+        self._worker_metrics = {}
+        # Reentrante: `_finish` pode ser chamado dentro de `_dispatch`
+        self._lock = threading.RLock()
+        self._start_pool()
+
+    def _start_pool(self):
+        # Cria o pool e a fila de eventos. Uma fila nova a cada pool: um
+        # processo morto durante o envio de um evento pode deixá-la travada.
+        self._events = multiprocessing.Queue()
+        self._executor = ProcessPoolExecutor(
+            max_workers=self.max_workers,
+            initializer=_init_worker,
+            initargs=(self._registry_kwargs, self._artifacts, self._events),
+        )
+        self._pump = threading.Thread(target=self._pump_events, args=(self._events,), daemon=True)
+        self._pump.start()
+
+    def _restart_pool(self, executor):
+        # Recria o pool quebrado, se ele ainda não tiver sido recriado (vários
+        # jobs falham ao mesmo tempo quando o pool quebra)
+        if executor is not self._executor:
+            return
+        executor.shutdown(wait=False, cancel_futures=True)
+        self._events.put(None)
+        self._start_pool()
+
+    def _pump_events(self, events):
+        # Publica nos jobs os eventos enviados pelos processos do pool
+        while True:
+            item = events.get()
+            if item is None:
+                return
+            job_id, event = item
+            with self._lock:
+                job = self._jobs.get(job_id)
+            if job is None:
+                continue
+            if event is None:
+                job.worker_done = True
+                self._close_stream(job)
+            else:
+                job.publish(event)
+
+    def _close_stream(self, job):
+        # Publica o último evento do job quando o resultado e todos os eventos
+        # do processo já chegaram (as filas de eventos e de resultados são
+        # independentes, e qualquer uma pode chegar primeiro)
+        if not job.future.done():
+            return
+        if job.future.cancelled():
+            job.publish({"event": "cancelled", "time": time.time()}, final=True)
+        elif job.future.exception() is not None:
+            job.publish(
+                {"event": "error", "time": time.time(), "error": str(job.future.exception())},
+                final=True,
+            )
+        elif job.worker_done:
+            job.publish(
+                {"event": "result", "time": time.time(), "result": job.future.result()[0]},
+                final=True,
+            )
+
+    def _forget_finished(self):
+        finished = [job_id for job_id, job in self._jobs.items() if job.future.done()]
+        for job_id in finished[:max(0, len(finished) - self.max_finished)]:
+            del self._jobs[job_id]
+
+    def _dispatch(self):
+        # Envia jobs da fila ao pool enquanto houver processos livres
+        while self._pending and self._running < self.max_workers:
+            job = self._pending.popleft()
+            if not job.future.set_running_or_notify_cancel():
+                continue
+            try:
+                executor, pool_future = self._submit(job)
+            except Exception as e:
+                job.future.set_exception(e)
+                self._close_stream(job)
+                continue
+            self._running += 1
+            pool_future.add_done_callback(partial(self._finish, job, executor))
+
+    def _submit(self, job):
+        executor = self._executor
+        try:
+            return executor, executor.submit(run_experiment, **job.params, job_id=job.job_id)
+        except BrokenProcessPool:
+            # O pool quebrou antes de `_finish` do job afetado ser chamado
+            self._restart_pool(executor)
+            executor = self._executor
+            return executor, executor.submit(run_experiment, **job.params, job_id=job.job_id)
+
+    def _finish(self, job, executor, pool_future):
+        exception = pool_future.exception()
+        with self._lock:
+            self._running -= 1
+            if isinstance(exception, BrokenProcessPool):
+                self._restart_pool(executor)
+            if exception is None:
+                _, pid, stats, snapshot = pool_future.result()
+                self._worker_stats[pid] = stats
+                self._worker_metrics[pid] = snapshot
+            self._dispatch()
+
+        if exception is not None:
+            job.future.set_exception(exception)
+        else:
+            job.future.set_result(pool_future.result())
+        self._close_stream(job)
+
+    def submit(self, num_authors, models, search=None, profile=False, evaluation=None):
+        """
+        Submete um job de treino/avaliação.
+
+        Args:
+            num_authors (int): Número de autores aleatórios a serem selecionados.
+            models (list): Lista de modelos a serem testados.
+            search (dict): Configuração da busca de hiperparâmetros do SVM.
+            profile (bool): Se True, o job é executado sob o cProfile e o perfil
+                é gravado em `<profile_dir>/<job_id>.prof`.
+            evaluation (dict): Avaliação em vários subconjuntos de autores
+                ("subsets", "seed" e "n_jobs"; ver `init`).
+
+        Returns:
+            Job: Job submetido.
+
+        Raises:
+            QueueFullError: Se a fila de jobs estiver cheia.
+        """
+        with self._lock:
+            if len(self._pending) >= self.max_queue and self._running >= self.max_workers:
+                raise QueueFullError("A fila de jobs está cheia. Tente novamente mais tarde.")
+
+            job_id = uuid.uuid4().hex
+            params = {
+                "num_authors": num_authors, "models": models, "search": search,
+                "evaluation": evaluation,
+            }
+            if profile:
+                params["profile_path"] = os.path.join(self.profile_dir, f"{job_id}.prof")
+            job = Job(job_id, Future(), params)
+            job.publish({"event": "queued", "time": job.submitted_at})
+            self._jobs[job.job_id] = job
+            self._pending.append(job)
+            self._forget_finished()
+            self._dispatch()
+
+        return job
+
+    def get(self, job_id):
+        """
+        Busca um job pelo identificador.
+
+        Args:
+            job_id (str): Identificador do job.
+
+        Returns:
+            Job: Job encontrado, ou None.
+        """
+        with self._lock:
+            return self._jobs.get(job_id)
+
+    def cancel(self, job_id):
+        """
+        Cancela um job que ainda está na fila.
+
+        Args:
+            job_id (str): Identificador do job.
+
+        Returns:
+            bool: True se o job foi cancelado.
+        """
+        with self._lock:
+            job = self._jobs.get(job_id)
+            if job is None or job not in self._pending:
+                return False
+            self._pending.remove(job)
+            cancelled = job.future.cancel()
+        self._close_stream(job)
+        return cancelled
+
+    def stats(self):
+        """
+        Retorna o estado da fila e as estatísticas somadas dos registros de
+        modelos dos processos do pool.
+
+        Returns:
+            dict: Estatísticas da fila e dos registros de modelos.
+        """
+        with self._lock:
+            statuses = [job.status for job in self._jobs.values()]
+            registry = {}
+            for stats in self._worker_stats.values():
+                for key in ("hits", "misses", "entries", "bytes"):
+                    registry[key] = registry.get(key, 0) + stats[key]
+
+        return {
+            "workers": self.max_workers,
+            "max_queue": self.max_queue,
+            "queue_depth": statuses.count("pending"),
+            "jobs": {status: statuses.count(status) for status in set(statuses)},
+            "registry": registry,
+        }
+
+    def warm_up(self):
+        """
+        Inicia todos os processos do pool e aguarda a inicialização de cada um
+        (abertura dos repositórios de características), para que o primeiro job
+        não pague esse custo.
+
+        Returns:
+            int: Número de processos iniciados.
+        """
+        pids = set()
+        while len(pids) < self.max_workers:
+            futures = [self._executor.submit(_ping, 0.05) for _ in range(self.max_workers)]
+            pids.update(future.result() for future in futures)
+        return len(pids)
+
+    def metrics(self):
+        """
+        Retorna as métricas das etapas somadas entre os processos do pool, com
+        os valores da última execução concluída em cada processo.
+
+        Returns:
+            dict: Métricas combinadas (ver `merge_snapshots`).
+        """
+        with self._lock:
+            return merge_snapshots(list(self._worker_metrics.values()))
+
+    def shutdown(self):
+        """
+        Cancela os jobs da fila e encerra o pool.
+        """
+        with self._lock:
+            while self._pending:
+                job = self._pending.popleft()
+                job.future.cancel()
+                self._close_stream(job)
+        self._executor.shutdown(wait=True, cancel_futures=True)
+        self._events.put(None)
+        self._pump.join()
@@ -1,143 +1,405 @@
 import os
 import cv2
 import csv
+import argparse
+import tracemalloc
+from functools import partial
+from contextlib import contextmanager
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
 import numpy as np
-from features.slant import slant
+from features.slant import save_histogram, normalize_histogram, axial_slant_histogram_strips
+from features.fragments import segment_image, fragment_features, fragment_params
+from features.engine import describe_fragment, family_columns, engine_params, resolve_families, DEFAULT_FAMILIES
+from features.preprocess import extract_edges, extract_edges_tiled, iter_edge_strips, FEATURE_PARAMS
+from features.cache import FeatureCache
+from features.artifacts import ArtifactSink, ARTIFACT_MODES
+from features.store import convert_csv
+from features.metrics import timed
 
-def preprocess_image(image_path, filename, output_dir):
+
+def load_image(image_path, filename, output_dir, artifacts=None):
     """
-    Pré-processa a imagem do manuscrito e salva as imagens intermediárias.
+    Carrega a imagem do manuscrito em escala de cinza e a salva como imagem intermediária.
 
     Args:
         image_path (str): Caminho para a imagem do manuscrito.
         filename (str): Nome do arquivo da imagem.
         output_dir (str): Diretório para salvar as imagens processadas.
+        artifacts (ArtifactSink): Destino das imagens intermediárias.
 
     Returns:
-        numpy.ndarray: Imagem pré-processada (bordas da escrita).
+        tuple: Imagem em escala de cinza, diretório das imagens intermediárias e
+        destino dos artefatos (desligado se a imagem não for amostrada).
     """
     output_dir = f"{output_dir}/{filename[:-4]}"
-    os.makedirs(output_dir, exist_ok=True)
+    if artifacts is None:
+        artifacts = ArtifactSink()
+    if not artifacts.accepts(filename):
+        artifacts = ArtifactSink("off")
 
     # Carrega a imagem em escala de cinza
     img = cv2.imread(image_path, cv2.IMREAD_GRAYSCALE)
-    cv2.imwrite(os.path.join(output_dir, "1_grayscale.png"), img)
-
-    # Binariza a imagem usando o método de Otsu
-    thresh = cv2.threshold(img, 0, 255, cv2.THRESH_BINARY + cv2.THRESH_OTSU)[1]
-    cv2.imwrite(os.path.join(output_dir, "2_binarizada.png"), thresh)
-
-    # Aplica dilatação e erosão
-    kernel = np.ones((5, 5), np.uint8)
-    dilated = cv2.dilate(thresh, kernel, iterations=1)
-    cv2.imwrite(os.path.join(output_dir, "3_dilatada.png"), dilated)
-
-    eroded = cv2.erode(thresh, kernel, iterations=1)
-    cv2.imwrite(os.path.join(output_dir, "4_erodida.png"), eroded)
-    edges = dilated - eroded
-
-    # Combina as bordas da máscara com a imagem binarizada original
-    edges = cv2.bitwise_and(thresh, edges)
-    
-    # Inverte a imagem para que o fundo fique branco e as bordas pretas
-    inverted_edges = cv2.bitwise_not(edges)
-    cv2.imwrite(os.path.join(output_dir, "5_bordas.png"), inverted_edges)
-
-    return inverted_edges
-
-# def segment_image(image, filename, output_dir):
-#     """
-#     Segmenta a imagem em 24 fragmentos e salva as imagens dos fragmentos e da imagem
-#     com linhas de segmentação.
-
-#     Args:
-#         image (numpy.ndarray): Imagem pré-processada (bordas).
-#         filename (str): Nome do arquivo da imagem.
-#         output_dir (str): Diretório para salvar as imagens.
-
-#     Returns:
-#         list: Lista de fragmentos da imagem.
-#     """
-#     output_dir = f"{output_dir}/{filename[:-4]}"
-#     fragments_output_dir = f"{output_dir}/fragmentos"
-    
-#     os.makedirs(output_dir, exist_ok=True)
-#     os.makedirs(fragments_output_dir, exist_ok=True)
-    
-#     # Divide a imagem em fragmentos
-#     height, width = image.shape
-#     fragment_height = height // 6
-#     fragment_width = width // 4
-#     fragments = []
-
-#     # Imagem com linhas de segmentação
-#     segmented_image = cv2.cvtColor(image, cv2.COLOR_GRAY2BGR)  # Converte para colorida para as linhas
-#     for i in range(6):
-#         cv2.line(segmented_image, (0, i*fragment_height), (width, i*fragment_height), (0, 0, 255), 2)  # Linhas horizontais
-#         for j in range(4):
-#             fragment = image[i*fragment_height:(i+1)*fragment_height, j*fragment_width:(j+1)*fragment_width]
-#             fragments.append(fragment)
-#             cv2.imwrite(os.path.join(fragments_output_dir, f"7_fragmento_{i}_{j}.png"), fragment)
-#             cv2.line(segmented_image, (j*fragment_width, 0), (j*fragment_width, height), (0, 0, 255), 2)  # Linhas verticais
-
-#     cv2.imwrite(os.path.join(output_dir, "6_segmentacao.png"), segmented_image)
-
-#     # Descarta fragmentos com pouca informação
-#     filtered_fragments = []
-#     for fragment in fragments:
-#         black_pixels = np.sum(fragment == 0)
-#         white_pixels = np.sum(fragment == 255)  # Adiciona contagem de pixels brancos
-#         total_pixels = fragment.size
-#         # Verifica se há mais de 1% de pixels pretos e mais de 1% de pixels brancos
-#         if black_pixels > 0.01 * total_pixels and white_pixels > 0.01 * total_pixels:
-#             filtered_fragments.append(fragment)
-        
-#     # Seleciona 5 fragmentos de forma aleatória
-#     np.random.shuffle(filtered_fragments)
-#     random_fragments = filtered_fragments[:5]
-#     for i, fragment in enumerate(random_fragments):
-#         cv2.imwrite(os.path.join(fragments_output_dir, f"8_fragmento_{i}_aleatorio.png"), fragment)
-
-#     return random_fragments
-
-def process_dataset(dataset_dir, output_csv_path):
+    artifacts.save_image(os.path.join(output_dir, "1_grayscale.png"), img)
+
+    return img, output_dir, artifacts
+
+
+@timed("preprocess")
+def preprocess_image(image_path, filename, output_dir, artifacts=None, tile_rows=0):
     """
-    Processa um conjunto de dados de manuscritos, extraindo a inclinação axial
-    de cada imagem e salvando os resultados em um arquivo CSV.
+    Pré-processa a imagem do manuscrito e salva as imagens intermediárias.
+
+    Args:
+        image_path (str): Caminho para a imagem do manuscrito.
+        filename (str): Nome do arquivo da imagem.
+        output_dir (str): Diretório para salvar as imagens processadas.
+        artifacts (ArtifactSink): Destino das imagens intermediárias. Se None,
+            as imagens são gravadas imediatamente.
+        tile_rows (int): Se maior que zero, pré-processa a imagem em faixas com
+            esse número de linhas, sem as imagens intermediárias de cada etapa.
+
+    Returns:
+        numpy.ndarray: Imagem pré-processada (bordas da escrita).
+    """
+    img, output_dir, artifacts = load_image(image_path, filename, output_dir, artifacts)
+
+    if tile_rows:
+        return extract_edges_tiled(img, tile_rows)
+    return extract_edges(img, output_dir, artifacts)
+
+
+def tiled_slant(image_path, filename, output_dir, artifacts=None, tile_rows=512):
+    """
+    Extrai a inclinação axial da imagem inteira em faixas, sem montar a imagem
+    de bordas: cada faixa é pré-processada e contada antes da seguinte. O vetor
+    é idêntico ao de `preprocess_image` seguido de `slant`.
+
+    Args:
+        image_path (str): Caminho para a imagem do manuscrito.
+        filename (str): Nome do arquivo da imagem.
+        output_dir (str): Diretório para salvar as imagens processadas.
+        artifacts (ArtifactSink): Destino da imagem em escala de cinza e do histograma.
+        tile_rows (int): Número de linhas de cada faixa.
+
+    Returns:
+        numpy.ndarray: Vetor de características da inclinação axial.
+    """
+    img, _, _ = load_image(image_path, filename, output_dir, artifacts)
+
+    axial_slant = axial_slant_histogram_strips(iter_edge_strips(img, tile_rows), img.shape[0])
+    axial_slant = normalize_histogram(axial_slant)
+
+    save_histogram(axial_slant, filename, output_dir, artifacts=artifacts)
+    return axial_slant
+
+
+@contextmanager
+def track_peak_memory(filename, enabled=True):
+    """
+    Mede o pico de memória alocada (arrays do numpy e do OpenCV incluídos)
+    durante o processamento de uma imagem e o exibe ao final.
+
+    Args:
+        filename (str): Nome do arquivo da imagem.
+        enabled (bool): Se False, nada é medido.
+    """
+    if not enabled:
+        yield
+        return
+
+    if not tracemalloc.is_tracing():
+        tracemalloc.start()
+    tracemalloc.reset_peak()
+    baseline = tracemalloc.get_traced_memory()[0]
+
+    yield
+
+    peak = tracemalloc.get_traced_memory()[1] - baseline
+    print(f"---------- Pico de memória de {filename}: {peak / (1024 * 1024):.1f} MB ----------")
+
+
+def extract_features(image_path, filename, output_dir, cache=None, artifacts=None,
+                     fragments=0, fragment_threads=1, tile_rows=0, report_memory=False,
+                     families=DEFAULT_FAMILIES):
+    """
+    Extrai os vetores de características de um único manuscrito: um vetor da
+    imagem inteira ou, com `fragments` maior que zero, um vetor por fragmento
+    sorteado.
+
+    Args:
+        image_path (str): Caminho para a imagem do manuscrito.
+        filename (str): Nome do arquivo da imagem.
+        output_dir (str): Diretório para salvar as imagens processadas.
+        cache (FeatureCache): Cache de características (opcional). Em caso de
+            acerto, a imagem não é decodificada.
+        artifacts (ArtifactSink): Destino das imagens intermediárias e dos histogramas.
+        fragments (int): Número de fragmentos por imagem (0 para a imagem inteira).
+        fragment_threads (int): Número de threads que processam os fragmentos de
+            uma imagem.
+        tile_rows (int): Se maior que zero, pré-processa a imagem em faixas com
+            esse número de linhas, limitando a memória usada (ver `tiled_slant`).
+        report_memory (bool): Se True, exibe o pico de memória de cada imagem.
+        families (tuple): Famílias de características extraídas, concatenadas
+            em cada vetor (por padrão, apenas a inclinação axial).
+
+    Returns:
+        tuple: Nome do arquivo e matriz com um vetor de características por linha.
+    """
+    if cache is not None:
+        key = cache.key(image_path)
+        cached = cache.get(key)
+        if cached is not None:
+            print(f"---------- Imagem em cache: {filename} ----------")
+            return filename, np.atleast_2d(cached)
+
+    print(f"---------- Processando imagem: {filename} ----------")
+    with track_peak_memory(filename, report_memory):
+        if fragments:
+            preprocessed_image = preprocess_image(image_path, filename, output_dir, artifacts, tile_rows)
+            selected = segment_image(preprocessed_image, filename, output_dir, fragments, artifacts)
+            if fragment_threads > 1:
+                with ThreadPoolExecutor(max_workers=fragment_threads) as executor:
+                    slant_result = fragment_features(
+                        selected, filename, output_dir, artifacts, executor, families
+                    )
+            else:
+                slant_result = fragment_features(selected, filename, output_dir, artifacts, None, families)
+        elif tile_rows and families == DEFAULT_FAMILIES:
+            slant_result = np.atleast_2d(tiled_slant(image_path, filename, output_dir, artifacts, tile_rows))
+        else:
+            preprocessed_image = preprocess_image(image_path, filename, output_dir, artifacts, tile_rows)
+            slant_result = np.atleast_2d(describe_fragment(
+                preprocessed_image, filename, output_dir, artifacts=artifacts, families=families
+            ))
+
+    if cache is not None:
+        cache.put(key, slant_result)
+
+    return filename, slant_result
+
+
+def list_manuscripts(dataset_dir, limit=None):
+    """
+    Lista, em ordem alfabética, as imagens BMP de um diretório de manuscritos.
 
     Args:
         dataset_dir (str): Caminho para o diretório do conjunto de dados.
+        limit (int): Número máximo de imagens a serem listadas (todas se None).
+
+    Returns:
+        list: Nomes dos arquivos das imagens.
+    """
+    if not os.path.isdir(dataset_dir):
+        raise ValueError(f"Diretório não encontrado: {dataset_dir}")
+
+    filenames = [f for f in sorted(os.listdir(dataset_dir)) if f.endswith(".bmp")]
+    return filenames[:limit] if limit is not None else filenames
+
+
+def read_manifest(manifest_path):
+    """
+    Lê o manifesto de uma extração interrompida.
+
+    Args:
+        manifest_path (str): Caminho para o arquivo de manifesto.
+
+    Returns:
+        list: Nome de cada arquivo já processado e número de linhas gravadas no
+        CSV para ele, na ordem em que foram gravados.
+    """
+    if not os.path.exists(manifest_path):
+        return []
+
+    entries = []
+    with open(manifest_path) as manifest:
+        for line in manifest:
+            if not line.strip():
+                continue
+            # Manifestos antigos têm apenas o nome do arquivo (uma linha por imagem)
+            filename, _, rows = line.strip().partition("\t")
+            entries.append((filename, int(rows or 1)))
+    return entries
+
+
+def truncate_csv(output_csv_path, num_rows):
+    """
+    Mantém apenas o cabeçalho e as primeiras `num_rows` linhas do CSV, descartando
+    linhas gravadas depois do último registro do manifesto.
+
+    Args:
         output_csv_path (str): Caminho para o arquivo CSV de saída.
+        num_rows (int): Número de linhas de dados a serem mantidas.
     """
+    with open(output_csv_path, newline='') as csvfile:
+        rows = list(csv.reader(csvfile))[:num_rows + 1]
+
     with open(output_csv_path, 'w', newline='') as csvfile:
+        csv.writer(csvfile).writerows(rows)
+
+
+def process_dataset(dataset_dir, output_csv_path, output_dir="output_images",
+                    workers=1, limit=None, resume=True, cache=None, artifacts=None,
+                    fragments=0, fragment_threads=1, tile_rows=0, report_memory=False,
+                    families=DEFAULT_FAMILIES):
+    """
+    Processa um conjunto de dados de manuscritos, extraindo a inclinação axial
+    (e as demais famílias de características selecionadas) de cada imagem, ou
+    de cada fragmento sorteado, e salvando os resultados em um arquivo CSV.
+
+    As imagens são processadas em paralelo por um pool de processos, mas as
+    linhas são gravadas na ordem alfabética dos arquivos. A cada linha gravada,
+    o nome do arquivo e o número de linhas gravadas são registrados em um
+    manifesto (`<csv>.manifest`), que permite retomar uma execução interrompida
+    a partir da última imagem concluída. O manifesto é removido ao final de uma
+    execução completa, e o CSV é então convertido no repositório binário lido
+    pelos modelos (`<csv sem extensão>.features`).
+
+    Args:
+        dataset_dir (str): Caminho para o diretório do conjunto de dados.
+        output_csv_path (str): Caminho para o arquivo CSV de saída.
+        output_dir (str): Diretório para salvar as imagens processadas.
+        workers (int): Número de processos usados na extração.
+        limit (int): Número máximo de imagens a serem processadas (todas se None).
+        resume (bool): Se True, retoma uma execução interrompida a partir do manifesto.
+        cache (FeatureCache): Cache de características (opcional).
+        artifacts (ArtifactSink): Destino das imagens intermediárias e dos
+            histogramas. Se None, os artefatos são gravados imediatamente.
+        fragments (int): Número de fragmentos sorteados por imagem, cada um
+            gravado como uma linha do CSV (0 para uma linha da imagem inteira).
+        fragment_threads (int): Número de threads que processam os fragmentos de
+            cada imagem.
+        tile_rows (int): Se maior que zero, pré-processa cada imagem em faixas
+            com esse número de linhas.
+        report_memory (bool): Se True, exibe o pico de memória de cada imagem.
+        families (tuple): Famílias de características, concatenadas em cada linha.
+    """
+    filenames = list_manuscripts(dataset_dir, limit)
+    manifest_path = f"{output_csv_path}.manifest"
+    header = ['autor'] + family_columns(families)
+
+    done = read_manifest(manifest_path) if resume and os.path.exists(output_csv_path) else []
+    if done:
+        # As linhas são gravadas em ordem, então o manifesto é um prefixo da lista
+        if [filename for filename, _ in done] != filenames[:len(done)]:
+            raise ValueError(
+                f"O manifesto {manifest_path} não corresponde às imagens de {dataset_dir}."
+            )
+        with open(output_csv_path, newline='') as csvfile:
+            if next(csv.reader(csvfile), None) != header:
+                raise ValueError(
+                    f"As colunas de {output_csv_path} não correspondem às famílias {', '.join(families)}."
+                )
+        truncate_csv(output_csv_path, sum(rows for _, rows in done))
+        print(f"Retomando {dataset_dir} a partir da imagem {len(done) + 1} de {len(filenames)}")
+
+    pending = filenames[len(done):]
+    paths = [os.path.join(dataset_dir, filename) for filename in pending]
+    extract = partial(
+        extract_features, output_dir=output_dir, cache=cache, artifacts=artifacts,
+        fragments=fragments, fragment_threads=fragment_threads,
+        tile_rows=tile_rows, report_memory=report_memory, families=families,
+    )
+
+    with open(output_csv_path, 'a' if done else 'w', newline='') as csvfile, \
+            open(manifest_path, 'a' if done else 'w') as manifest:
         csv_writer = csv.writer(csvfile)
-        csv_writer.writerow(['autor'] + [f'inclinacao_{i}' for i in range(17)])  # Cabeçalho do CSV
-
-        if os.path.isdir(dataset_dir):
-            for idx, filename in enumerate(sorted(os.listdir(dataset_dir))):
-              if dataset_dir == train_dir:
-                if idx > 3:
-                  break
-              else:
-                if idx > 1:
-                  break
-                  
-              if filename.endswith(".bmp"):
-                  image_path = os.path.join(dataset_dir, filename)
-                  author_id = filename[-10:-7]
-                  print(f"---------- Processando imagem: {filename} ----------")
-                  preprocessed_image = preprocess_image(image_path, filename, "output_images")
-                  slant_result = slant(preprocessed_image, filename, "output_images")
-                  csv_writer.writerow([f"a{author_id}"] + list(slant_result))
-
-# Exemplo de uso:
-train_dir = "/home/yuri/www/manuscritus/backend/training_manuscripts"  # Diretório das imagens de treino
-test_dir = "/home/yuri/www/manuscritus/backend/test_manuscripts"  # Diretório das imagens de teste
-train_csv_path = "treino.csv"
-test_csv_path = "teste.csv"
-
-process_dataset(train_dir, train_csv_path)
-process_dataset(test_dir, test_csv_path)
-
-print(f"Resultados do treino salvos em: {train_csv_path}")
-print(f"Resultados do teste salvos em: {test_csv_path}")
+        if not done:
+            csv_writer.writerow(header)  # Cabeçalho do CSV
+
+        if workers > 1:
+            executor = ProcessPoolExecutor(max_workers=workers)
+            results = executor.map(extract, paths, pending)
+        else:
+            executor = None
+            results = map(extract, paths, pending)
+
+        try:
+            for filename, slant_result in results:
+                author_id = filename[-10:-7]
+                for vector in slant_result:
+                    csv_writer.writerow([f"a{author_id}"] + list(vector))
+                csvfile.flush()
+
+                # Registra a imagem somente depois de as suas linhas estarem no CSV
+                manifest.write(f"{filename}\t{len(slant_result)}\n")
+                manifest.flush()
+        finally:
+            if executor is not None:
+                executor.shutdown(cancel_futures=True)
+
+    os.remove(manifest_path)
+    convert_csv(output_csv_path)
+
+    if cache is not None:
+        cache.evict()
+
+
+def parse_args():
+    """
+    Lê os parâmetros da linha de comando.
+
+    Returns:
+        argparse.Namespace: Parâmetros da extração.
+    """
+    parser = argparse.ArgumentParser(
+        description="Extrai a inclinação axial dos manuscritos de treino e de teste."
+    )
+    parser.add_argument("--train-dir", required=True, help="Diretório das imagens de treino")
+    parser.add_argument("--test-dir", required=True, help="Diretório das imagens de teste")
+    parser.add_argument("--train-csv", default="treino.csv", help="CSV de saída do treino")
+    parser.add_argument("--test-csv", default="teste.csv", help="CSV de saída do teste")
+    parser.add_argument("--train-limit", type=int, help="Máximo de imagens de treino")
+    parser.add_argument("--test-limit", type=int, help="Máximo de imagens de teste")
+    parser.add_argument("--output-dir", default="output_images",
+                        help="Diretório das imagens intermediárias")
+    parser.add_argument("--workers", type=int, default=os.cpu_count(),
+                        help="Número de processos de extração")
+    parser.add_argument("--artifacts", choices=ARTIFACT_MODES, default="sync",
+                        help="Gravação das imagens intermediárias e dos histogramas")
+    parser.add_argument("--artifacts-every", type=int, default=1,
+                        help="Grava os artefatos de apenas uma a cada N imagens")
+    parser.add_argument("--features", type=resolve_families, default=DEFAULT_FAMILIES,
+                        help="Famílias de características, separadas por vírgulas "
+                             "(slant, direction3, direction5, hinge, curvature)")
+    parser.add_argument("--fragments", type=int, default=0,
+                        help="Fragmentos sorteados por imagem, um vetor por fragmento "
+                             "(0 para um vetor da imagem inteira)")
+    parser.add_argument("--fragment-threads", type=int, default=1,
+                        help="Threads que processam os fragmentos de cada imagem")
+    parser.add_argument("--tile-rows", type=int, default=0,
+                        help="Pré-processa cada imagem em faixas com esse número de linhas, "
+                             "limitando a memória (0 para a imagem inteira)")
+    parser.add_argument("--report-memory", action="store_true",
+                        help="Exibe o pico de memória do processamento de cada imagem")
+    parser.add_argument("--cache-dir", default=".feature_cache",
+                        help="Diretório do cache de características")
+    parser.add_argument("--cache-size-mb", type=int, default=512,
+                        help="Tamanho máximo do cache de características em MB")
+    parser.add_argument("--no-cache", dest="cache", action="store_false",
+                        help="Desativa o cache de características")
+    parser.add_argument("--no-resume", dest="resume", action="store_false",
+                        help="Ignora o manifesto e recomeça a extração do zero")
+    return parser.parse_args()
+
+
+if __name__ == "__main__":
+    args = parse_args()
+
+    cache = None
+    if args.cache:
+        params = {**FEATURE_PARAMS, **fragment_params(args.fragments), **engine_params(args.features)}
+        cache = FeatureCache(args.cache_dir, params, args.cache_size_mb * 1024 * 1024)
+    artifacts = ArtifactSink(args.artifacts, args.artifacts_every)
+
+    process_dataset(args.train_dir, args.train_csv, args.output_dir,
+                    args.workers, args.train_limit, args.resume, cache, artifacts,
+                    args.fragments, args.fragment_threads, args.tile_rows, args.report_memory,
+                    args.features)
+    process_dataset(args.test_dir, args.test_csv, args.output_dir,
+                    args.workers, args.test_limit, args.resume, cache, artifacts,
+                    args.fragments, args.fragment_threads, args.tile_rows, args.report_memory,
+                    args.features)
+    artifacts.close()
+
+    print(f"Resultados do treino salvos em: {args.train_csv}")
+    print(f"Resultados do teste salvos em: {args.test_csv}")
@@ -0,0 +1,387 @@
+import os
+import json
+import hashlib
+import tempfile
+import threading
+
+import joblib
+import numpy as np
+from sklearn.preprocessing import StandardScaler
+
+from ..features.metrics import stage, timed
+from .identify import aggregate_fragments
+
+
+class AuthorIndex:
+    """
+    Índice de autores para busca dos escritores mais próximos de um vetor de
+    características, sem treinar um classificador.
+
+    Os vetores são padronizados com um `StandardScaler` e normalizados para
+    norma unitária; a semelhança entre um vetor e um autor é o maior cosseno
+    entre o vetor e as amostras do autor. A busca é exaustiva e vetorizada: os
+    produtos internos de um lote de consultas com todas as amostras são
+    calculados de uma vez, e o máximo de cada autor é obtido com
+    `np.maximum.reduceat` sobre as amostras agrupadas por autor. Os lotes são
+    limitados a `max_elements` semelhanças por vez.
+
+    Autores podem ser adicionados e removidos a qualquer momento. As amostras
+    são guardadas sem padronização: a cada adição, as estatísticas do
+    normalizador são atualizadas com `partial_fit` apenas com as novas
+    amostras, e a matriz padronizada é remontada na consulta seguinte. As
+    remoções não alteram as estatísticas. As alterações são guardadas à parte
+    (`_enrolled`), como diferenças sobre as amostras de treino: apenas as
+    amostras cadastradas de cada autor e se as amostras de treino do autor
+    foram descartadas por uma remoção.
+
+    Args:
+        scaler (StandardScaler): Normalizador das características. Se None, os
+            vetores não são padronizados.
+        max_elements (int): Número máximo de semelhanças calculadas por lote.
+    """
+
+    def __init__(self, scaler=None, max_elements=16 * 1024 * 1024):
+        self.scaler = scaler
+        self.max_elements = max_elements
+        self.directory = None
+
+        self._vectors = {}
+        self._enrolled = {}
+        self._layout_cache = None
+        self._lock = threading.Lock()
+
+    @classmethod
+    def build(cls, X, y, **kwargs):
+        """
+        Cria um índice com as amostras de um conjunto de autores, padronizado
+        com a média e o desvio padrão dessas amostras.
+
+        Args:
+            X (np.array): Características (uma linha por amostra).
+            y (np.array): Autor de cada amostra.
+            **kwargs: Demais parâmetros do `AuthorIndex`.
+
+        Returns:
+            AuthorIndex: Índice com todos os autores de `y`.
+        """
+        X = np.asarray(X, dtype=np.float32)
+        index = cls(StandardScaler().fit(X), **kwargs)
+
+        y = np.asarray(y)
+        order = np.argsort(y, kind="stable")
+        authors, starts = np.unique(y[order], return_index=True)
+        for author, vectors in zip(authors, np.split(X[order], starts[1:])):
+            index._vectors[str(author)] = vectors
+        return index
+
+    @classmethod
+    def from_store(cls, store, **kwargs):
+        """
+        Cria um índice com todos os autores de um repositório de características.
+
+        Args:
+            store (FeatureStore): Repositório com as características de treino.
+            **kwargs: Demais parâmetros do `AuthorIndex`.
+
+        Returns:
+            AuthorIndex: Índice com todos os autores do repositório.
+        """
+        return cls.build(store.matrix, store.labels(), **kwargs)
+
+    @staticmethod
+    def _transform(vectors, mean, scale):
+        vectors = np.atleast_2d(np.asarray(vectors, dtype=np.float64))
+        if mean is not None:
+            vectors = (vectors - mean) / scale
+        norms = np.linalg.norm(vectors, axis=1, keepdims=True)
+        # Vetores nulos ficam nulos (semelhança zero com todos os autores)
+        norms[norms == 0] = 1.0
+        return (vectors / norms).astype(np.float32)
+
+    def add(self, author, vectors):
+        """
+        Adiciona amostras de um autor ao índice e atualiza as estatísticas do
+        normalizador. Se o autor já existir, as amostras são somadas às que ele
+        já tem. Com um diretório de cadastros (ver `attach`), as amostras do
+        autor e o normalizador são gravados em disco.
+
+        Args:
+            author (str): Nome do autor.
+            vectors (np.array): Um vetor ou uma matriz de vetores de características.
+        """
+        vectors = np.atleast_2d(np.asarray(vectors, dtype=np.float32))
+        author = str(author)
+        with self._lock:
+            if self.scaler is not None:
+                self.scaler.partial_fit(vectors)
+            replace, enrolled = self._enrolled.get(author, (False, None))
+            self._enrolled[author] = (replace, _concatenate(enrolled, vectors))
+            self._vectors[author] = _concatenate(self._vectors.get(author), vectors)
+            self._layout_cache = None
+            self._save(author)
+
+    def remove(self, author):
+        """
+        Remove um autor do índice (e do diretório de cadastros, se houver).
+
+        Args:
+            author (str): Nome do autor.
+
+        Returns:
+            bool: True se o autor estava no índice.
+        """
+        author = str(author)
+        with self._lock:
+            if self._vectors.pop(author, None) is None:
+                return False
+            self._enrolled[author] = (True, None)
+            self._layout_cache = None
+            self._save(author)
+            return True
+
+    @property
+    def authors(self):
+        with self._lock:
+            return list(self._vectors)
+
+    def __len__(self):
+        return len(self._vectors)
+
+    def _author_path(self, author):
+        digest = hashlib.sha256(author.encode()).hexdigest()[:32]
+        return os.path.join(self.directory, "authors", f"{digest}.npz")
+
+    def _write(self, path, write):
+        # Grava em um arquivo temporário e renomeia, para que uma falha no meio
+        # da gravação nunca deixe um cadastro incompleto
+        fd, tmp_path = tempfile.mkstemp(dir=os.path.dirname(path), suffix=".tmp")
+        with os.fdopen(fd, "wb") as tmp_file:
+            write(tmp_file)
+        os.replace(tmp_path, path)
+
+    def _save(self, author):
+        # Grava as amostras cadastradas do autor, se as de treino foram
+        # descartadas, e o normalizador: o custo é proporcional às amostras
+        # cadastradas do autor, não ao índice
+        if self.directory is None:
+            return
+        replace, vectors = self._enrolled[author]
+        if vectors is None:
+            vectors = np.empty((0, 0), dtype=np.float32)
+        self._write(
+            self._author_path(author),
+            lambda f: np.savez(
+                f, author=np.array(author), vectors=vectors, replace=np.array(replace)
+            ),
+        )
+        if self.scaler is not None:
+            self._write(
+                os.path.join(self.directory, "scaler.joblib"),
+                lambda f: joblib.dump(self.scaler, f),
+            )
+
+    def attach(self, directory, params=None, fingerprint=None):
+        """
+        Liga o índice a um diretório de cadastros: aplica os cadastros e as
+        remoções gravados anteriormente e passa a gravar os seguintes. Cada
+        autor alterado tem suas amostras cadastradas gravadas em um arquivo
+        próprio, junto com o normalizador atualizado. As amostras cadastradas
+        são somadas às amostras de treino atuais do autor (exceto se ele foi
+        removido depois do último treino), e não às do treino da gravação.
+
+        O normalizador gravado só é usado se tiver sido calculado sobre o mesmo
+        repositório de treino (`fingerprint`). Se o treino mudou, o normalizador
+        é recalculado com as amostras atuais do índice (o treino novo com os
+        cadastros aplicados) e gravado no lugar do anterior.
+
+        Args:
+            directory (str): Diretório dos cadastros.
+            params (dict): Parâmetros de extração das características. Se os
+                cadastros foram gravados com outros parâmetros, eles não são usados.
+            fingerprint (str): Impressão digital do repositório de treino usado
+                para criar o índice (ver `store_fingerprint`).
+
+        Raises:
+            ValueError: Se os cadastros gravados usarem outros parâmetros de extração.
+        """
+        os.makedirs(os.path.join(directory, "authors"), exist_ok=True)
+        params_path = os.path.join(directory, "params.json")
+        stored, stored_fingerprint = None, None
+        if os.path.exists(params_path):
+            with open(params_path) as params_file:
+                stored = json.load(params_file)
+            stored_fingerprint = stored.pop("train_fingerprint", None)
+            if params is not None and stored != json.loads(json.dumps(params)):
+                raise ValueError(
+                    f"Os cadastros em {directory} foram extraídos com outros parâmetros."
+                )
+
+        with self._lock:
+            authors_dir = os.path.join(directory, "authors")
+            for name in sorted(os.listdir(authors_dir)):
+                if not name.endswith(".npz"):
+                    continue
+                with np.load(os.path.join(authors_dir, name)) as entry:
+                    author, vectors = str(entry["author"]), entry["vectors"]
+                    # Cadastros gravados antes das diferenças guardam todas as
+                    # amostras do autor, e substituem as de treino
+                    replace = bool(entry["replace"]) if "replace" in entry else True
+                vectors = vectors if len(vectors) else None
+                self._enrolled[author] = (replace, vectors)
+
+                base = None if replace else self._vectors.get(author)
+                vectors = _concatenate(base, vectors)
+                if vectors is None:
+                    self._vectors.pop(author, None)
+                else:
+                    self._vectors[author] = vectors
+
+            scaler_path = os.path.join(directory, "scaler.joblib")
+            if fingerprint is None or fingerprint == stored_fingerprint:
+                if os.path.exists(scaler_path):
+                    self.scaler = joblib.load(scaler_path)
+            elif self.scaler is not None:
+                if self._vectors:
+                    self.scaler = StandardScaler().fit(np.concatenate(list(self._vectors.values())))
+                self._write(scaler_path, lambda f: joblib.dump(self.scaler, f))
+            elif os.path.exists(scaler_path):
+                os.remove(scaler_path)
+            self._layout_cache = None
+            self.directory = directory
+
+        # Gravado depois do normalizador: se a gravação for interrompida, o
+        # normalizador é recalculado na próxima inicialização
+        if fingerprint is None:
+            fingerprint = stored_fingerprint
+        if params is not None and (stored is None or fingerprint != stored_fingerprint):
+            record = dict(params)
+            if fingerprint is not None:
+                record["train_fingerprint"] = fingerprint
+            self._write(params_path, lambda f: f.write(json.dumps(record, sort_keys=True).encode()))
+
+    def _layout(self):
+        # Agrupa as amostras padronizadas por autor em uma única matriz contígua,
+        # junto com as estatísticas usadas para padronizar as consultas
+        with self._lock:
+            if not self._vectors:
+                raise ValueError("O índice de autores está vazio.")
+            if self._layout_cache is None:
+                mean = scale = None
+                if self.scaler is not None:
+                    mean, scale = self.scaler.mean_.copy(), self.scaler.scale_.copy()
+                authors = list(self._vectors)
+                counts = np.array([len(self._vectors[author]) for author in authors], dtype=np.int64)
+                matrix = self._transform(
+                    np.concatenate([self._vectors[author] for author in authors]), mean, scale
+                )
+                self._layout_cache = (
+                    matrix, np.array(authors), np.cumsum(counts) - counts, mean, scale
+                )
+            return self._layout_cache
+
+    def _similarities(self, queries, matrix, starts):
+        # Gera, lote a lote, a maior semelhança entre cada consulta e as amostras de cada autor
+        batch_size = max(1, self.max_elements // len(matrix))
+        for start in range(0, len(queries), batch_size):
+            batch = slice(start, start + batch_size)
+            yield batch, np.maximum.reduceat(queries[batch] @ matrix.T, starts, axis=1)
+
+    @timed("author_index.query")
+    def query(self, vectors, top_k=5):
+        """
+        Busca os autores mais próximos de cada vetor.
+
+        Args:
+            vectors (np.array): Um vetor ou uma matriz de vetores de características.
+            top_k (int): Número de autores retornados por vetor.
+
+        Returns:
+            tuple: Autores (matriz de nomes, uma linha por vetor) e semelhanças
+            (cosseno, na mesma forma), do mais ao menos próximo.
+
+        Raises:
+            ValueError: Se o índice estiver vazio.
+        """
+        matrix, authors, starts, mean, scale = self._layout()
+        queries = self._transform(vectors, mean, scale)
+        top_k = min(top_k, len(authors))
+
+        indices = np.empty((len(queries), top_k), dtype=np.int64)
+        scores = np.empty((len(queries), top_k), dtype=np.float32)
+        for batch, similarity in self._similarities(queries, matrix, starts):
+            top = np.argpartition(-similarity, top_k - 1, axis=1)[:, :top_k]
+            top_scores = np.take_along_axis(similarity, top, axis=1)
+            order = np.argsort(-top_scores, axis=1, kind="stable")
+            indices[batch] = np.take_along_axis(top, order, axis=1)
+            scores[batch] = np.take_along_axis(top_scores, order, axis=1)
+
+        return authors[indices], scores
+
+    def rank_authors(self, vectors, top_k=5, aggregate=None):
+        """
+        Busca os autores mais próximos de cada vetor, no mesmo formato de
+        `identify.rank_authors`.
+
+        Args:
+            vectors (np.array): Um vetor ou uma matriz de vetores de características.
+            top_k (int): Número de autores retornados por vetor.
+            aggregate (str): Se informado ("mean" ou "vote"), os vetores são tratados
+                como fragmentos de uma mesma imagem e combinados em uma única ordenação.
+
+        Returns:
+            list: Para cada vetor (ou para a imagem, com `aggregate`), uma lista de
+            dicionários com "author" e "score" (semelhança), do mais ao menos próximo.
+        """
+        if aggregate is not None:
+            # Poucos fragmentos por imagem: as semelhanças cabem em um único lote
+            matrix, authors, starts, mean, scale = self._layout()
+            queries = self._transform(vectors, mean, scale)
+            similarity = np.concatenate([s for _, s in self._similarities(queries, matrix, starts)])
+            scores, order = aggregate_fragments(similarity, aggregate)
+            return [[
+                {"author": str(authors[j]), "score": float(scores[j])} for j in order[:top_k]
+            ]]
+
+        authors, scores = self.query(vectors, top_k)
+        return [
+            [{"author": str(author), "score": float(score)} for author, score in zip(row, row_scores)]
+            for row, row_scores in zip(authors, scores)
+        ]
+
+
+def _concatenate(vectors, more):
+    # Junta duas matrizes de amostras, qualquer uma delas podendo ser None
+    if vectors is None:
+        return more
+    if more is None:
+        return vectors
+    return np.concatenate([vectors, more])
+
+
+def train_and_test_author_index(X_train, y_train, X_test, y_test, top_k=5):
+    """
+    Avalia a busca dos autores mais próximos: cria um índice com os dados de
+    treino e mede a acurácia top-1 e top-k no conjunto de teste.
+
+    Args:
+        X_train (np.array): Conjunto de dados de treino contendo as características (features).
+        y_train (np.array): Conjunto de rótulos de treino (autores).
+        X_test (np.array): Conjunto de dados de teste contendo as características (features).
+        y_test (np.array): Conjunto de rótulos de teste (autores).
+        top_k (int): Número de autores considerados na acurácia top-k.
+
+    Returns:
+        tuple: Acurácia top-1 e acurácia top-k.
+    """
+    with stage("author_index.build"):
+        index = AuthorIndex.build(X_train, y_train)
+
+    authors, _ = index.query(X_test, top_k)
+    hits = authors == np.asarray(y_test).astype(str)[:, None]
+
+    accuracy_top1 = hits[:, 0].mean()
+    accuracy_top_k = hits.any(axis=1).mean()
+    print(f"Acurácia do índice de autores (top-1): {accuracy_top1 * 100:.2f}%")
+    print(f"Acurácia do índice de autores (top-{top_k}): {accuracy_top_k * 100:.2f}%")
+
+    return accuracy_top1, accuracy_top_k
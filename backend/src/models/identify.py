@@ -0,0 +1,144 @@
+import numpy as np
+from sklearn.ensemble import RandomForestClassifier
+from sklearn.pipeline import make_pipeline
+from sklearn.preprocessing import StandardScaler
+
+from .random_forest import RF_PARAMS
+
+
+def build_identifier(store):
+    """
+    Treina o modelo de identificação de autoria com todos os autores de um
+    repositório de características.
+
+    É usado o Random Forest: com centenas de autores, o SVC (um-contra-um)
+    precisa avaliar um classificador por par de autores a cada predição, o que
+    leva segundos por imagem, enquanto `predict_proba` do Random Forest leva
+    milissegundos e já fornece um score por autor.
+
+    Args:
+        store (FeatureStore): Repositório com as características de treino.
+
+    Returns:
+        sklearn.pipeline.Pipeline: Pipeline (normalização + Random Forest) treinado.
+    """
+    pipeline = make_pipeline(
+        StandardScaler(), RandomForestClassifier(**RF_PARAMS, n_jobs=-1)
+    )
+    pipeline.fit(np.asarray(store.matrix, dtype=np.float64), store.labels())
+
+    # Predições de uma imagem por vez são mais rápidas sem paralelismo
+    pipeline[-1].set_params(n_jobs=1)
+    return pipeline
+
+
+def load_identifier(store, artifacts=None):
+    """
+    Carrega o modelo de identificação gravado em disco ou, se não houver um
+    modelo válido para os dados de treino atuais, treina e grava um novo.
+
+    Args:
+        store (FeatureStore): Repositório com as características de treino.
+        artifacts (ModelArtifacts): Diretório dos modelos gravados. Se None, o
+            modelo é sempre treinado.
+
+    Returns:
+        tuple: Pipeline treinado e se ele foi carregado do disco.
+    """
+    if artifacts is not None:
+        pipeline = artifacts.load("identifier")
+        if pipeline is not None:
+            return pipeline, True
+
+    pipeline = build_identifier(store)
+    if artifacts is not None:
+        artifacts.save("identifier", pipeline)
+    return pipeline, False
+
+
+# Formas de combinar as predições dos fragmentos de uma imagem
+AGGREGATIONS = ("mean", "vote")
+
+
+def aggregate_fragments(probabilities, method="mean"):
+    """
+    Combina as probabilidades previstas para os fragmentos de uma imagem em um
+    único score por autor.
+
+    Args:
+        probabilities (np.array): Probabilidades de cada autor (uma linha por fragmento).
+        method (str): "mean" (média das probabilidades) ou "vote" (fração dos
+            fragmentos em que o autor é o mais provável).
+
+    Returns:
+        tuple: Score de cada autor e a ordem dos autores, do mais ao menos
+        provável. Na votação, empates são resolvidos pela média das probabilidades.
+    """
+    mean = probabilities.mean(axis=0)
+    if method == "mean":
+        return mean, np.argsort(-mean, kind="stable")
+    if method == "vote":
+        votes = np.bincount(probabilities.argmax(axis=1), minlength=probabilities.shape[1])
+        scores = votes / len(probabilities)
+        return scores, np.lexsort((-mean, -scores))
+    raise ValueError(f"Agregação desconhecida: {method}")
+
+
+def rank_authors(pipeline, vectors, top_k=5, aggregate=None):
+    """
+    Ordena os autores mais prováveis de cada vetor de características.
+
+    Args:
+        pipeline (sklearn.pipeline.Pipeline): Modelo de identificação treinado.
+        vectors (np.array): Um vetor ou uma matriz de vetores de características.
+        top_k (int): Número de autores retornados por vetor.
+        aggregate (str): Se informado ("mean" ou "vote"), os vetores são tratados
+            como fragmentos de uma mesma imagem e combinados em uma única ordenação.
+
+    Returns:
+        list: Para cada vetor (ou para a imagem, com `aggregate`), uma lista de
+        dicionários com "author" e "score", do mais ao menos provável.
+    """
+    probabilities = pipeline.predict_proba(np.atleast_2d(vectors))
+
+    if aggregate is not None:
+        scores, order = aggregate_fragments(probabilities, aggregate)
+        rankings = [(scores, order[:top_k])]
+    else:
+        top = np.argsort(-probabilities, axis=1, kind="stable")[:, :top_k]
+        rankings = zip(probabilities, top)
+
+    return [
+        [{"author": str(pipeline.classes_[j]), "score": float(row[j])} for j in indices]
+        for row, indices in rankings
+    ]
+
+
+def rank_batch(pipeline, groups, top_k=5, aggregate="mean"):
+    """
+    Ordena os autores mais prováveis de um lote de imagens com uma única
+    chamada vetorizada de `predict_proba` sobre os vetores de todas as imagens.
+
+    Args:
+        pipeline (sklearn.pipeline.Pipeline): Modelo de identificação treinado.
+        groups (list): Matriz de vetores de características de cada imagem (um
+            vetor por fragmento).
+        top_k (int): Número de autores retornados por imagem.
+        aggregate (str): Combinação das predições dos fragmentos de cada imagem
+            ("mean" ou "vote"; ver `aggregate_fragments`).
+
+    Returns:
+        list: Para cada imagem, uma lista de dicionários com "author" e "score",
+        do mais ao menos provável, como em `rank_authors`.
+    """
+    groups = [np.atleast_2d(vectors) for vectors in groups]
+    probabilities = pipeline.predict_proba(np.concatenate(groups))
+    bounds = np.cumsum([len(vectors) for vectors in groups])[:-1]
+
+    rankings = []
+    for rows in np.split(probabilities, bounds):
+        scores, order = aggregate_fragments(rows, aggregate)
+        rankings.append([
+            {"author": str(pipeline.classes_[j]), "score": float(scores[j])} for j in order[:top_k]
+        ])
+    return rankings
@@ -0,0 +1,188 @@
+import warnings
+import numpy as np
+from joblib import Parallel, delayed
+from sklearn import config_context
+from sklearn.base import BaseEstimator, ClassifierMixin
+from sklearn.model_selection import ParameterGrid
+from sklearn.svm import SVC
+
+from . import progress
+
+
+def gram_matrices(X_a, X_b):
+    """
+    Calcula os produtos internos e as distâncias quadráticas entre dois conjuntos
+    de vetores, a partir dos quais todos os kernels do grid são derivados.
+
+    Args:
+        X_a (np.array): Vetores das linhas.
+        X_b (np.array): Vetores das colunas.
+
+    Returns:
+        tuple: Matriz de produtos internos e matriz de distâncias quadráticas.
+    """
+    gram = X_a @ X_b.T
+    sq_a = np.einsum("ij,ij->i", X_a, X_a)
+    sq_b = np.einsum("ij,ij->i", X_b, X_b)
+    sq_dist = np.maximum(sq_a[:, None] + sq_b[None, :] - 2 * gram, 0)
+    return gram, sq_dist
+
+
+def resolve_gamma(gamma, X):
+    """
+    Converte o `gamma` do SVC em um número, com as mesmas regras do scikit-learn.
+
+    Args:
+        gamma (str ou float): "scale", "auto" ou um valor numérico.
+        X (np.array): Dados de treino do modelo.
+
+    Returns:
+        float: Valor de gamma.
+    """
+    if gamma == "scale":
+        X_var = X.var()
+        return 1.0 / (X.shape[1] * X_var) if X_var != 0 else 1.0
+    if gamma == "auto":
+        return 1.0 / X.shape[1]
+    return gamma
+
+
+def kernel_from_gram(gram, sq_dist, kernel, gamma, degree):
+    """
+    Deriva um kernel do SVC a partir das matrizes já calculadas.
+
+    Args:
+        gram (np.array): Produtos internos.
+        sq_dist (np.array): Distâncias quadráticas.
+        kernel (str): "linear", "poly" ou "rbf".
+        gamma (float): Valor numérico de gamma.
+        degree (int): Grau do kernel polinomial.
+
+    Returns:
+        np.array: Matriz do kernel.
+    """
+    if kernel == "linear":
+        return gram
+    if kernel == "poly":
+        return (gamma * gram) ** degree
+    if kernel == "rbf":
+        return np.exp(-gamma * sq_dist)
+    raise ValueError(f"Kernel não suportado: {kernel}")
+
+
+def _kernel_params(params):
+    # Parâmetros que definem a matriz do kernel (C só afeta o treino)
+    return params["kernel"], params.get("gamma", "scale"), params.get("degree", 3)
+
+
+def _score_fold(X, y, gram, sq_dist, train, test, candidates):
+    """
+    Avalia todas as combinações do grid em um fold, calculando cada matriz de
+    kernel uma única vez para todos os valores de C.
+    """
+    X_train = X[train]
+    y_train = y[train]
+    y_test = y[test]
+    gram_train = gram[np.ix_(train, train)]
+    gram_test = gram[np.ix_(test, train)]
+    sq_train = sq_dist[np.ix_(train, train)]
+    sq_test = sq_dist[np.ix_(test, train)]
+
+    kernels = {}
+    scores = np.empty(len(candidates))
+    for index, params in enumerate(candidates):
+        kernel, gamma, degree = _kernel_params(params)
+        key = (kernel, gamma, degree)
+        if key not in kernels:
+            gamma_value = resolve_gamma(gamma, X_train)
+            kernels[key] = (
+                kernel_from_gram(gram_train, sq_train, kernel, gamma_value, degree),
+                kernel_from_gram(gram_test, sq_test, kernel, gamma_value, degree),
+            )
+        K_train, K_test = kernels[key]
+
+        # As matrizes já foram validadas; dispensar as verificações do
+        # scikit-learn reduz o custo fixo de cada um dos muitos treinos
+        with config_context(assume_finite=True, skip_parameter_validation=True), \
+                warnings.catch_warnings():
+            # Rótulos inteiros com muitas classes disparam um aviso de "regressão"
+            warnings.simplefilter("ignore", UserWarning)
+            model = SVC(kernel="precomputed", C=params.get("C", 1.0))
+            model.fit(K_train, y_train)
+            scores[index] = np.mean(model.predict(K_test) == y_test)
+
+    return scores
+
+
+class KernelGridSearchSVC(ClassifierMixin, BaseEstimator):
+    """
+    Busca em grid de hiperparâmetros do SVC com kernels pré-calculados.
+
+    Os produtos internos e as distâncias quadráticas entre as amostras de treino
+    são calculados uma única vez; os kernels linear, polinomial e RBF de cada
+    combinação do grid são derivados dessas matrizes, e cada fold usa apenas uma
+    fatia delas. A seleção do melhor modelo segue as mesmas regras do
+    `GridSearchCV` (média simples dos folds, empate resolvido pela primeira
+    combinação do grid) e o modelo final é retreinado com todos os dados.
+
+    A cada fold avaliado é emitido um evento de progresso ("grid_progress") com
+    o número de combinações avaliadas, o total e o melhor score até o momento.
+
+    Args:
+        param_grid (list): Grid de parâmetros, no formato do `GridSearchCV`.
+        cv: Esquema de validação cruzada.
+        n_jobs (int): Número de processos usados na avaliação dos folds.
+    """
+
+    def __init__(self, param_grid, cv, n_jobs=1):
+        self.param_grid = param_grid
+        self.cv = cv
+        self.n_jobs = n_jobs
+
+    def fit(self, X, y):
+        X = np.asarray(X, dtype=np.float64)
+        # Rótulos inteiros (na mesma ordem das classes) tornam cada treino mais barato
+        classes, y_encoded = np.unique(np.asarray(y), return_inverse=True)
+
+        gram, sq_dist = gram_matrices(X, X)
+        candidates = list(ParameterGrid(self.param_grid))
+        splits = list(self.cv.split(X, y))
+
+        # Os folds chegam na ordem em que foram submetidos, à medida que terminam
+        fold_scores = []
+        for scores in Parallel(n_jobs=self.n_jobs, return_as="generator")(
+            delayed(_score_fold)(X, y_encoded, gram, sq_dist, train, test, candidates)
+            for train, test in splits
+        ):
+            fold_scores.append(scores)
+            partial_scores = np.mean(fold_scores, axis=0)
+            best = int(np.argmax(partial_scores))
+            progress.report(
+                "grid_progress",
+                completed=len(fold_scores) * len(candidates),
+                total=len(splits) * len(candidates),
+                best_score=float(partial_scores[best]),
+                best_params=candidates[best],
+            )
+        mean_scores = np.average(np.array(fold_scores).T, axis=1)
+
+        self.cv_results_ = {"params": candidates, "mean_test_score": mean_scores}
+        self.best_index_ = int(np.flatnonzero(mean_scores == mean_scores.max())[0])
+        self.best_params_ = candidates[self.best_index_]
+        self.best_score_ = mean_scores[self.best_index_]
+
+        # Retreina o melhor modelo com todos os dados de treino
+        kernel, gamma, degree = _kernel_params(self.best_params_)
+        self.kernel_ = (kernel, resolve_gamma(gamma, X), degree)
+        self.best_estimator_ = SVC(kernel="precomputed", C=self.best_params_.get("C", 1.0))
+        with warnings.catch_warnings():
+            warnings.simplefilter("ignore", UserWarning)
+            self.best_estimator_.fit(kernel_from_gram(gram, sq_dist, *self.kernel_), y_encoded)
+        self.X_fit_ = X
+        self.classes_ = classes
+        return self
+
+    def predict(self, X):
+        gram, sq_dist = gram_matrices(np.asarray(X, dtype=np.float64), self.X_fit_)
+        y_encoded = self.best_estimator_.predict(kernel_from_gram(gram, sq_dist, *self.kernel_))
+        return self.classes_[y_encoded]
@@ -1,26 +1,42 @@
-import pandas as pd
 import numpy as np
-from sklearn.preprocessing import StandardScaler
+from joblib import Parallel, delayed
+from scipy import stats
+
+from ..features.store import open_feature_store
+from ..features.artifacts import ArtifactSink
+from ..features.metrics import stage, timed
 
 from .svm import train_and_test_svm
 from .random_forest import train_and_test_random_forest
+from .author_index import train_and_test_author_index
+from . import progress
+
+# Número de autores considerados na acurácia top-k do índice de autores
+INDEX_TOP_K = 5
 
+# Nível de confiança dos intervalos da avaliação em vários subconjuntos
+CONFIDENCE = 0.95
 
-def select_random_authors(train_df, test_df, num_authors):
+
+@timed("init.select_authors")
+def select_random_authors(train_store, test_store, num_authors, rng=None):
     """
     Seleciona um número especificado de autores aleatórios e filtra os
     dados de treino e teste para incluir apenas esses autores.
 
+    As linhas de cada autor são obtidas pelo índice autor → intervalo de
+    linhas dos repositórios, sem percorrer as tabelas inteiras.
+
     Args:
-        train_df (pd.DataFrame): DataFrame contendo os dados de treino com
-        as inclinações e o autor.
-        test_df (pd.DataFrame): DataFrame contendo os dados de teste com
-        as inclinações e o autor.
+        train_store (FeatureStore): Repositório com as características de treino.
+        test_store (FeatureStore): Repositório com as características de teste.
         num_authors (int): Número de autores a serem selecionados aleatoriamente.
+        rng (np.random.Generator): Gerador usado no sorteio. Se None, é usado o
+            gerador global do numpy.
 
     Returns:
-        pd.DataFrame, pd.DataFrame: DataFrames de treino e teste filtrados com
-        os autores selecionados.
+        tuple: Características e rótulos de treino e de teste (X_train, y_train,
+        X_test, y_test) dos autores selecionados.
 
     Raises:
         ValueError: Se o número de autores solicitado for maior que o número
@@ -28,7 +44,7 @@ def select_random_authors(train_df, test_df, num_authors):
     """
 
     # Obter os autores únicos no conjunto de treino
-    unique_authors = train_df["autor"].unique()
+    unique_authors = train_store.authors
 
     # Verificar se o número de autores solicitados é menor ou igual ao número total de autores
     if num_authors > len(unique_authors):
@@ -37,61 +53,213 @@ def select_random_authors(train_df, test_df, num_authors):
         )
 
     # Sortear os autores aleatoriamente
-    selected_authors = np.random.choice(unique_authors, size=num_authors, replace=False)
+    choice = np.random.choice if rng is None else rng.choice
+    selected_authors = choice(unique_authors, size=num_authors, replace=False)
 
     # Filtrar os dados de treino e teste com base nos autores selecionados
-    selected_train = train_df[train_df["autor"].isin(selected_authors)]
-    selected_test = test_df[test_df["autor"].isin(selected_authors)]
+    X_train, y_train = train_store.subset(selected_authors)
+    X_test, y_test = test_store.subset(selected_authors)
 
-    return selected_train, selected_test
+    return X_train, y_train, X_test, y_test
 
 
-def init(num_authors, models):
+def evaluate(X_train, y_train, X_test, y_test, models, artifacts=None, registry=None,
+             search=None):
     """
-    Função principal para carregar dados, selecionar autores aleatórios,
-    normalizar as características e realizar testes com SVM e Random Forest.
+    Treina e avalia os modelos solicitados em um conjunto de autores.
 
     Args:
-        num_authors (int): Número de autores aleatórios a serem selecionados.
-        models (list): Lista de modelos a serem testados. Pode incluir "svm" e/ou "random_forest".
+        X_train (np.array): Características de treino.
+        y_train (np.array): Rótulos de treino (autores).
+        X_test (np.array): Características de teste.
+        y_test (np.array): Rótulos de teste (autores).
+        models (list): Lista de modelos a serem testados (ver `init`).
+        artifacts (ArtifactSink): Destino da matriz de confusão do SVM.
+        registry (ModelRegistry): Registro de modelos treinados (opcional).
+        search (dict): Configuração da busca de hiperparâmetros do SVM.
 
     Returns:
-        dict: Um dicionário contendo a acurácia dos modelos testados.
+        dict: Acurácias dos modelos testados (vazio se nenhum modelo for reconhecido).
     """
-    # Carregar os dados de treino e teste
-    train_df = pd.read_csv("treino.csv")
-    test_df = pd.read_csv("teste.csv")
-
-    # Selecionar autores aleatórios
-    train_df, test_df = select_random_authors(train_df, test_df, num_authors)
-
-    # Separar as características (inclinacoes) e a classe (autor)
-    X_train = train_df.iloc[:, 1:].values
-    y_train = train_df["autor"].values
-
-    X_test = test_df.iloc[:, 1:].values
-    y_test = test_df["autor"].values
-
-    # Normalização dos dados
-    scaler = StandardScaler()
-    X_train = scaler.fit_transform(X_train)
-    X_test = scaler.transform(X_test)
-
     results = {}
 
     # Testar modelos
     if "svm" in models:
-        accuracy_svm, accuracy_svm_grid_search, best_params_svm = train_and_test_svm(
-            X_train, y_train, X_test, y_test
+        accuracy_svm, accuracy_svm_grid_search, best_params_svm, search_info = train_and_test_svm(
+            X_train, y_train, X_test, y_test, artifacts, registry, search
         )
         results["accuracy_svm"] = accuracy_svm * 100
         results["accuracy_svm_grid_search"] = accuracy_svm_grid_search * 100
         results["best_params_svm"] = best_params_svm
+        results["search_svm"] = search_info
 
     if "random_forest" in models:
-        accuracy_rf = train_and_test_random_forest(X_train, y_train, X_test, y_test)
+        with progress.stage("random_forest"):
+            accuracy_rf = train_and_test_random_forest(X_train, y_train, X_test, y_test, registry)
         results["accuracy_rf"] = accuracy_rf * 100
 
+    if "author_index" in models:
+        with progress.stage("author_index"):
+            accuracy_top1, accuracy_top_k = train_and_test_author_index(
+                X_train, y_train, X_test, y_test, INDEX_TOP_K
+            )
+        results["accuracy_index"] = accuracy_top1 * 100
+        results["accuracy_index_top_k"] = accuracy_top_k * 100
+        results["index_top_k"] = INDEX_TOP_K
+
+    return results
+
+
+def summarize(runs, confidence=CONFIDENCE):
+    """
+    Resume as acurácias de várias avaliações: média, desvio padrão amostral,
+    mínimo, máximo e intervalo de confiança da média (distribuição t de Student).
+
+    Args:
+        runs (list): Resultados de `evaluate` de cada subconjunto.
+        confidence (float): Nível de confiança do intervalo.
+
+    Returns:
+        dict: Resumo de cada acurácia ("accuracy_*", em percentual). O intervalo
+        é limitado a [0, 100]; com uma única avaliação, o desvio padrão e o
+        intervalo são None.
+    """
+    summary = {}
+    for key in runs[0]:
+        if not key.startswith("accuracy_"):
+            continue
+        values = np.array([run[key] for run in runs], dtype=np.float64)
+        mean = values.mean()
+        std = ci = None
+        if len(values) > 1:
+            std = values.std(ddof=1)
+            half_width = stats.t.ppf((1 + confidence) / 2, len(values) - 1) * std / np.sqrt(len(values))
+            ci = [float(max(mean - half_width, 0.0)), float(min(mean + half_width, 100.0))]
+            std = float(std)
+        summary[key] = {
+            "mean": float(mean),
+            "std": std,
+            "ci": ci,
+            "min": float(values.min()),
+            "max": float(values.max()),
+        }
+    return summary
+
+
+@timed("init.subsets")
+def evaluate_subsets(train_store, test_store, num_authors, models, subsets, seed=None,
+                     search=None, n_jobs=1):
+    """
+    Avalia os modelos em vários subconjuntos aleatórios de autores e resume as
+    acurácias obtidas.
+
+    Os subconjuntos são sorteados a partir de `seed` com geradores
+    independentes (`SeedSequence.spawn`), de modo que o resultado não depende
+    da ordem de execução. As linhas de cada subconjunto são obtidas pelo índice
+    autor → intervalo de linhas dos repositórios já abertos, e os subconjuntos
+    são avaliados em paralelo por `n_jobs` threads. A matriz de confusão não é
+    gerada, e os modelos não passam pelo registro de modelos: cada subconjunto
+    é descartável, e seus pipelines só tirariam do cache os que são reaproveitados.
+
+    Args:
+        train_store (FeatureStore): Repositório com as características de treino.
+        test_store (FeatureStore): Repositório com as características de teste.
+        num_authors (int): Número de autores de cada subconjunto.
+        models (list): Lista de modelos a serem testados (ver `init`).
+        subsets (int): Número de subconjuntos.
+        seed (int): Semente do sorteio dos subconjuntos (opcional).
+        search (dict): Configuração da busca de hiperparâmetros do SVM.
+        n_jobs (int): Número de subconjuntos avaliados ao mesmo tempo.
+
+    Returns:
+        dict: Um dicionário contendo:
+            - "subsets", "seed" e "num_authors": Parâmetros da avaliação.
+            - "summary": Média, desvio padrão, mínimo, máximo e intervalo de
+              confiança de cada acurácia, com o nível em "confidence".
+            - "runs": Acurácias de cada subconjunto.
+    """
+    def run(rng):
+        X_train, y_train, X_test, y_test = select_random_authors(
+            train_store, test_store, num_authors, rng
+        )
+        return evaluate(
+            X_train, y_train, X_test, y_test, models, ArtifactSink("off"), None, search
+        )
+
+    rngs = [np.random.default_rng(s) for s in np.random.SeedSequence(seed).spawn(subsets)]
+    runs = []
+    for result in Parallel(n_jobs=n_jobs, prefer="threads", return_as="generator")(
+        delayed(run)(rng) for rng in rngs
+    ):
+        runs.append(result)
+        progress.report("subset_finished", completed=len(runs), total=subsets)
+    if not runs[0]:
+        return {}
+
+    return {
+        "subsets": subsets,
+        "seed": seed,
+        "num_authors": num_authors,
+        "confidence": CONFIDENCE,
+        "summary": summarize(runs),
+        "runs": [
+            {key: value for key, value in run.items() if key.startswith("accuracy_")}
+            for run in runs
+        ],
+    }
+
+
+@timed("init")
+def init(num_authors, models, artifacts=None, registry=None, search=None, subsets=1,
+         seed=None, n_jobs=1):
+    """
+    Função principal para carregar dados, selecionar autores aleatórios,
+    normalizar as características e realizar testes com SVM, Random Forest e
+    com o índice de autores mais próximos.
+
+    Com `subsets` maior que 1, os modelos são avaliados em vários subconjuntos
+    aleatórios de autores e as acurácias são resumidas (ver `evaluate_subsets`).
+
+    Args:
+        num_authors (int): Número de autores aleatórios a serem selecionados.
+        models (list): Lista de modelos a serem testados. Pode incluir "svm",
+            "random_forest" e/ou "author_index".
+        artifacts (ArtifactSink): Destino da matriz de confusão do SVM.
+        registry (ModelRegistry): Registro de modelos com os repositórios de
+            características já abertos e os pipelines treinados em cache. Se None,
+            os repositórios são abertos e os modelos treinados a cada chamada.
+        search (dict): Configuração da busca de hiperparâmetros do SVM
+            ("strategy", "cv", "folds" e "n_jobs").
+        subsets (int): Número de subconjuntos aleatórios de autores avaliados.
+        seed (int): Semente do sorteio dos autores (opcional).
+        n_jobs (int): Número de subconjuntos avaliados ao mesmo tempo.
+
+    Returns:
+        dict: Um dicionário contendo a acurácia dos modelos testados.
+    """
+    progress.report("started", num_authors=num_authors, models=list(models), subsets=subsets)
+
+    # Carregar os dados de treino e teste
+    if registry is not None:
+        train_store, test_store = registry.train_store, registry.test_store
+    else:
+        with stage("init.load"), progress.stage("load"):
+            train_store = open_feature_store("treino.csv")
+            test_store = open_feature_store("teste.csv")
+
+    if subsets > 1:
+        results = evaluate_subsets(
+            train_store, test_store, num_authors, models, subsets, seed, search, n_jobs
+        )
+    else:
+        # Selecionar autores aleatórios, separando as características (inclinacoes) e a classe (autor)
+        rng = None if seed is None else np.random.default_rng(seed)
+        with progress.stage("select_authors"):
+            X_train, y_train, X_test, y_test = select_random_authors(
+                train_store, test_store, num_authors, rng
+            )
+        results = evaluate(X_train, y_train, X_test, y_test, models, artifacts, registry, search)
+
     # Verificação caso nenhum modelo válido tenha sido selecionado
     if not results:
         return {"error": "Nenhum modelo reconhecido."}
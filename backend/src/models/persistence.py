@@ -0,0 +1,115 @@
+import os
+import json
+import hashlib
+import tempfile
+
+import joblib
+import sklearn
+
+# Versão do formato dos modelos gravados. Deve ser incrementada sempre que os
+# pipelines mudarem (novas etapas, novos hiperparâmetros padrão etc.).
+MODEL_VERSION = 1
+
+
+def store_fingerprint(*stores):
+    """
+    Calcula uma impressão digital dos repositórios de características usados no
+    treino, a partir dos metadados e do tamanho e data de modificação das
+    matrizes, sem ler as matrizes.
+
+    Args:
+        *stores (FeatureStore): Repositórios de características.
+
+    Returns:
+        str: Impressão digital hexadecimal.
+    """
+    digest = hashlib.sha256()
+    for store in stores:
+        for name in sorted(os.listdir(store.store_path)):
+            stat = os.stat(os.path.join(store.store_path, name))
+            digest.update(f"{name}:{stat.st_size}:{stat.st_mtime_ns};".encode())
+    return digest.hexdigest()
+
+
+class ModelArtifacts:
+    """
+    Diretório de pipelines treinados, gravados com o joblib e carregados por
+    memory-map.
+
+    Cada pipeline é gravado em `<nome>.joblib`, sem compressão (para que os
+    arrays possam ser mapeados em memória), e acompanhado de `<nome>.json` com a
+    versão do formato, a versão do scikit-learn, a impressão digital dos dados
+    de treino e os autores (rótulos) do modelo. Um pipeline só é carregado se
+    todos esses valores corresponderem aos atuais; caso contrário, ele deve ser
+    treinado de novo.
+
+    Args:
+        directory (str): Diretório dos pipelines.
+        fingerprint (str): Impressão digital dos dados de treino (ver `store_fingerprint`).
+    """
+
+    def __init__(self, directory, fingerprint):
+        self.directory = directory
+        self.fingerprint = fingerprint
+        os.makedirs(directory, exist_ok=True)
+
+    def _meta(self):
+        return {
+            "version": MODEL_VERSION,
+            "sklearn": sklearn.__version__,
+            "fingerprint": self.fingerprint,
+        }
+
+    def load(self, name):
+        """
+        Carrega um pipeline, com os arrays mapeados em memória.
+
+        Args:
+            name (str): Nome do pipeline.
+
+        Returns:
+            sklearn.pipeline.Pipeline: Pipeline treinado, ou None se não houver
+            um pipeline válido para os dados e versões atuais.
+        """
+        path = os.path.join(self.directory, name)
+        try:
+            with open(f"{path}.json") as meta_file:
+                meta = json.load(meta_file)
+        except (FileNotFoundError, ValueError):
+            return None
+
+        if {key: meta.get(key) for key in self._meta()} != self._meta():
+            return None
+
+        try:
+            pipeline = joblib.load(f"{path}.joblib", mmap_mode="r")
+        except (FileNotFoundError, EOFError, ValueError):
+            return None
+
+        if [str(c) for c in pipeline.classes_] != meta["classes"]:
+            return None
+        return pipeline
+
+    def save(self, name, pipeline):
+        """
+        Grava um pipeline treinado e seus metadados.
+
+        Args:
+            name (str): Nome do pipeline.
+            pipeline (sklearn.pipeline.Pipeline): Pipeline treinado.
+        """
+        path = os.path.join(self.directory, name)
+        meta = {**self._meta(), "classes": [str(c) for c in pipeline.classes_]}
+
+        # Grava em arquivos temporários e renomeia, para que processos
+        # concorrentes nunca carreguem um pipeline incompleto. Os metadados são
+        # renomeados por último: sem eles, o pipeline não é carregado.
+        fd, tmp_path = tempfile.mkstemp(dir=self.directory, suffix=".tmp")
+        with os.fdopen(fd, "wb") as tmp_file:
+            joblib.dump(pipeline, tmp_file)
+        os.replace(tmp_path, f"{path}.joblib")
+
+        fd, tmp_path = tempfile.mkstemp(dir=self.directory, suffix=".tmp")
+        with os.fdopen(fd, "w") as tmp_file:
+            json.dump(meta, tmp_file)
+        os.replace(tmp_path, f"{path}.json")
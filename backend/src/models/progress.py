@@ -0,0 +1,46 @@
+import time
+from contextlib import contextmanager
+
+# Função que recebe os eventos de progresso do job em execução no processo
+# (None quando não há ninguém acompanhando)
+_listener = None
+
+
+def set_listener(listener):
+    """
+    Define a função que recebe os eventos de progresso do processo.
+
+    Args:
+        listener (callable): Função que recebe cada evento (um dicionário), ou
+            None para descartar os eventos.
+    """
+    global _listener
+    _listener = listener
+
+
+def report(event, **data):
+    """
+    Emite um evento de progresso.
+
+    Args:
+        event (str): Tipo do evento (por exemplo, "stage_started").
+        **data: Dados do evento.
+    """
+    listener = _listener
+    if listener is not None:
+        listener({"event": event, "time": time.time(), **data})
+
+
+@contextmanager
+def stage(name):
+    """
+    Emite os eventos de início ("stage_started") e de fim ("stage_finished",
+    com a duração em segundos) de uma etapa.
+
+    Args:
+        name (str): Nome da etapa.
+    """
+    report("stage_started", stage=name)
+    start = time.perf_counter()
+    yield
+    report("stage_finished", stage=name, seconds=time.perf_counter() - start)
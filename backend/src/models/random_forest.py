@@ -1,8 +1,16 @@
 from sklearn.ensemble import RandomForestClassifier
 from sklearn.metrics import accuracy_score
+from sklearn.pipeline import make_pipeline
+from sklearn.preprocessing import StandardScaler
 
+from ..features.metrics import stage
+from .registry import fit_pipeline
 
-def train_and_test_random_forest(X_train, y_train, X_test, y_test):
+# Hiperparâmetros do Random Forest
+RF_PARAMS = {"n_estimators": 100, "random_state": 42}
+
+
+def train_and_test_random_forest(X_train, y_train, X_test, y_test, registry=None):
     """
     Treina um modelo Random Forest com os dados fornecidos, avalia o desempenho no conjunto de teste
     e retorna a acurácia do modelo.
@@ -12,24 +20,28 @@ def train_and_test_random_forest(X_train, y_train, X_test, y_test):
         y_train (np.array): Conjunto de rótulos de treino (autores).
         X_test (np.array): Conjunto de dados de teste contendo as características (features).
         y_test (np.array): Conjunto de rótulos de teste (autores).
+        registry (ModelRegistry): Registro de modelos treinados (opcional).
 
     Returns:
         float: Acurácia do modelo Random Forest no conjunto de teste.
 
     Detalhes:
         1. O modelo Random Forest é configurado com 100 estimadores (árvores de decisão) e uma semente aleatória fixa para reprodutibilidade.
-        2. O modelo é treinado com os dados de treino e em seguida faz previsões no conjunto de teste.
+        2. O modelo é treinado com os dados de treino (normalizados com `StandardScaler`) e em seguida faz previsões no conjunto de teste.
+           Se um registro de modelos for informado, um pipeline já treinado para o mesmo conjunto de autores é reaproveitado.
         3. A acurácia do modelo é calculada usando a métrica `accuracy_score` e é exibida no console.
     """
 
-    # Inicializar o modelo Random Forest com 100 árvores de decisão
-    rf_model = RandomForestClassifier(n_estimators=100, random_state=42)
-
-    # Treinar o modelo com os dados de treino
-    rf_model.fit(X_train, y_train)
+    # Inicializar e treinar o modelo Random Forest com 100 árvores de decisão
+    rf_model = fit_pipeline(
+        registry, "random_forest", RF_PARAMS,
+        lambda: make_pipeline(StandardScaler(), RandomForestClassifier(**RF_PARAMS)),
+        X_train, y_train,
+    )
 
     # Fazer previsões no conjunto de teste
-    y_pred = rf_model.predict(X_test)
+    with stage("random_forest.predict"):
+        y_pred = rf_model.predict(X_test)
 
     # Avaliar a acurácia do modelo
     accuracy = accuracy_score(y_test, y_pred)
@@ -0,0 +1,174 @@
+import json
+import pickle
+import threading
+from collections import OrderedDict
+
+import numpy as np
+
+from ..features.store import open_feature_store
+from ..features.metrics import stage
+
+
+class ModelRegistry:
+    """
+    Registro de modelos compartilhado pelo processo.
+
+    Abre os repositórios de características uma única vez e mantém em cache os
+    pipelines (normalização + modelo) já treinados, identificados pelo conjunto
+    de autores, pelo tipo de modelo e pelos hiperparâmetros. Quando o número de
+    entradas ou a memória ocupada passa do limite, os pipelines usados há mais
+    tempo são descartados.
+
+    Os pipelines ficam apenas em memória: cada um é treinado com um conjunto
+    sorteado de autores, que raramente se repete entre reinícios, e gravá-los em
+    disco faria o diretório crescer a cada requisição. Apenas o modelo de
+    identificação é gravado (ver `identify.load_identifier`).
+
+    Args:
+        train_path (str): Caminho para o CSV de treino (o repositório binário
+            correspondente é criado a partir dele, se necessário).
+        test_path (str): Caminho para o CSV de teste.
+        max_entries (int): Número máximo de pipelines em cache.
+        max_bytes (int): Memória máxima ocupada pelos pipelines em cache, em bytes.
+    """
+
+    def __init__(self, train_path="treino.csv", test_path="teste.csv",
+                 max_entries=32, max_bytes=256 * 1024 * 1024):
+        self.train_path = train_path
+        self.test_path = test_path
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        self.train_store = None
+        self.test_store = None
+
+        self._models = OrderedDict()
+        self._bytes = 0
+        self._hits = 0
+        self._misses = 0
+        self._lock = threading.Lock()
+
+    def load(self):
+        """
+        Abre os repositórios de características de treino e de teste.
+        """
+        with stage("registry.load"):
+            self.train_store = open_feature_store(self.train_path)
+            self.test_store = open_feature_store(self.test_path)
+
+    @staticmethod
+    def key(model_type, params, y_train):
+        """
+        Monta a chave de um pipeline.
+
+        Args:
+            model_type (str): Tipo do modelo (por exemplo, "svm").
+            params (dict): Hiperparâmetros do modelo.
+            y_train (np.array): Rótulos de treino, dos quais se extrai o conjunto de autores.
+
+        Returns:
+            tuple: Chave do pipeline no cache.
+        """
+        authors = tuple(sorted(np.unique(y_train).tolist()))
+        return authors, model_type, json.dumps(params, sort_keys=True, default=str)
+
+    def get_or_fit(self, model_type, params, build, X_train, y_train):
+        """
+        Retorna o pipeline em cache ou treina um novo.
+
+        Args:
+            model_type (str): Tipo do modelo (por exemplo, "svm").
+            params (dict): Hiperparâmetros do modelo.
+            build (callable): Função sem argumentos que cria o pipeline não treinado.
+            X_train (np.array): Características de treino.
+            y_train (np.array): Rótulos de treino.
+
+        Returns:
+            sklearn.pipeline.Pipeline: Pipeline treinado.
+        """
+        key = self.key(model_type, params, y_train)
+
+        with self._lock:
+            entry = self._models.get(key)
+            if entry is not None:
+                self._models.move_to_end(key)
+                self._hits += 1
+                return entry[0]
+            self._misses += 1
+
+        # O treino é feito fora da trava para não bloquear outras requisições
+        pipeline = fit_stages(build(), model_type, X_train, y_train)
+        size = len(pickle.dumps(pipeline, protocol=pickle.HIGHEST_PROTOCOL))
+
+        with self._lock:
+            if key not in self._models:
+                self._models[key] = (pipeline, size)
+                self._bytes += size
+            self._evict()
+
+        return pipeline
+
+    def _evict(self):
+        while self._models and (
+            len(self._models) > self.max_entries or self._bytes > self.max_bytes
+        ):
+            _, (_, size) = self._models.popitem(last=False)
+            self._bytes -= size
+
+    def stats(self):
+        """
+        Retorna as estatísticas do cache de pipelines.
+
+        Returns:
+            dict: Acertos, falhas, número de entradas e memória ocupada.
+        """
+        with self._lock:
+            return {
+                "hits": self._hits,
+                "misses": self._misses,
+                "entries": len(self._models),
+                "bytes": self._bytes,
+                "max_entries": self.max_entries,
+                "max_bytes": self.max_bytes,
+            }
+
+
+def fit_stages(pipeline, model_type, X_train, y_train):
+    """
+    Treina um pipeline etapa por etapa, medindo separadamente a normalização
+    (etapas "<modelo>.scale") e o treino do modelo final ("<modelo>.fit").
+    O resultado é o mesmo de `pipeline.fit`.
+
+    Args:
+        pipeline (sklearn.pipeline.Pipeline): Pipeline não treinado.
+        model_type (str): Tipo do modelo, usado no nome das etapas.
+        X_train (np.array): Características de treino.
+        y_train (np.array): Rótulos de treino.
+
+    Returns:
+        sklearn.pipeline.Pipeline: Pipeline treinado.
+    """
+    with stage(f"{model_type}.scale"):
+        X_scaled = pipeline[:-1].fit_transform(X_train, y_train)
+    with stage(f"{model_type}.fit"):
+        pipeline[-1].fit(X_scaled, y_train)
+    return pipeline
+
+
+def fit_pipeline(registry, model_type, params, build, X_train, y_train):
+    """
+    Treina um pipeline, reaproveitando o cache do registro quando houver um.
+
+    Args:
+        registry (ModelRegistry): Registro de modelos, ou None para sempre treinar.
+        model_type (str): Tipo do modelo (por exemplo, "svm").
+        params (dict): Hiperparâmetros do modelo.
+        build (callable): Função sem argumentos que cria o pipeline não treinado.
+        X_train (np.array): Características de treino.
+        y_train (np.array): Rótulos de treino.
+
+    Returns:
+        sklearn.pipeline.Pipeline: Pipeline treinado.
+    """
+    if registry is None:
+        return fit_stages(build(), model_type, X_train, y_train)
+    return registry.get_or_fit(model_type, params, build, X_train, y_train)
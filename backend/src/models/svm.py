@@ -1,26 +1,44 @@
+import time
+import warnings
+import numpy as np
 from sklearn.svm import SVC
+from sklearn.base import BaseEstimator, ClassifierMixin
 from sklearn.metrics import accuracy_score, confusion_matrix
-from sklearn.model_selection import GridSearchCV, LeaveOneOut
-import seaborn as sns
-import matplotlib
-import matplotlib.pyplot as plt
+from sklearn.exceptions import ConvergenceWarning
+from sklearn.experimental import enable_halving_search_cv  # noqa: F401
+from sklearn.model_selection import (
+    HalvingGridSearchCV,
+    LeaveOneOut,
+    StratifiedKFold,
+)
+from sklearn.pipeline import make_pipeline
+from sklearn.preprocessing import StandardScaler
 
-matplotlib.use("Agg")
+from ..features.artifacts import ArtifactSink
+from ..features.metrics import stage, timed
+from . import progress
+from .registry import fit_pipeline
+from .kernel_search import KernelGridSearchSVC
 
 
-def plot_confusion_matrix(y_true, y_pred, classes, save_path):
+def render_confusion_matrix(conf_matrix, classes):
     """
-    Plota e salva a matriz de confusão.
+    Gera o gráfico da matriz de confusão.
 
     Args:
-        y_true (array-like): Verdadeiros rótulos.
-        y_pred (array-like): Rótulos preditos pelo modelo.
+        conf_matrix (np.array): Matriz de confusão.
         classes (list): Nomes das classes.
-        save_path (str): Caminho onde a matriz de confusão será salva.
+
+    Returns:
+        matplotlib.figure.Figure: Figura com a matriz de confusão.
     """
-    conf_matrix = confusion_matrix(y_true, y_pred)
+    # Importados apenas quando a matriz de confusão é gerada: o seaborn (e o
+    # pandas, que ele importa) atrasaria a inicialização do servidor
+    import seaborn as sns
+    from matplotlib.figure import Figure
 
-    plt.figure(figsize=(12, 10))
+    figure = Figure(figsize=(12, 10))
+    ax = figure.subplots()
     sns.heatmap(
         conf_matrix,
         annot=True,
@@ -28,79 +46,238 @@ def plot_confusion_matrix(y_true, y_pred, classes, save_path):
         xticklabels=classes,
         yticklabels=classes,
         cbar=False,
+        ax=ax,
     )
 
-    plt.xlabel("Predição")
-    plt.ylabel("Real")
-    plt.title("Matriz de Confusão")
-    plt.tight_layout()
+    ax.set_xlabel("Predição")
+    ax.set_ylabel("Real")
+    ax.set_title("Matriz de Confusão")
+    figure.tight_layout()
+
+    return figure
+
+
+@timed("svm.confusion_matrix")
+def plot_confusion_matrix(y_true, y_pred, classes, save_path, artifacts=None):
+    """
+    Plota e salva a matriz de confusão.
+
+    Args:
+        y_true (array-like): Verdadeiros rótulos.
+        y_pred (array-like): Rótulos preditos pelo modelo.
+        classes (list): Nomes das classes.
+        save_path (str): Caminho onde a matriz de confusão será salva.
+        artifacts (ArtifactSink): Destino do gráfico. Se None, o gráfico é
+            gravado imediatamente.
+    """
+    if artifacts is None:
+        artifacts = ArtifactSink()
+    if not artifacts.accepts():
+        return
+
+    conf_matrix = confusion_matrix(y_true, y_pred)
+    artifacts.save_figure(save_path, render_confusion_matrix, conf_matrix, classes)
+
+
+# Grid de parâmetros para múltiplos kernels
+PARAM_GRID = [
+    {"kernel": ["linear"], "C": [0.1, 1, 10, 100]},
+    {
+        "kernel": ["poly"],
+        "C": [0.1, 1, 10],
+        "degree": [2, 3, 4],
+        "gamma": ["scale", "auto"],
+    },
+    {"kernel": ["rbf"], "C": [0.1, 1, 10], "gamma": ["scale", "auto"]},
+]
+
+
+# Estratégias de busca de hiperparâmetros e de validação cruzada
+SEARCH_STRATEGIES = ("grid", "halving")
+CV_STRATEGIES = ("stratified", "loo")
+
+# Configuração padrão da busca de hiperparâmetros
+DEFAULT_SEARCH = {"strategy": "grid", "cv": "stratified", "folds": 5, "n_jobs": 1}
+
+# Recurso da busca por halving: número máximo de iterações do SVC. Todas as
+# combinações começam com poucas iterações e só as melhores recebem mais.
+HALVING_PARAMS = {"resource": "max_iter", "min_resources": 50, "max_resources": 2000, "factor": 3}
+
+
+class HalvingSearchSVC(ClassifierMixin, BaseEstimator):
+    """
+    Busca de hiperparâmetros do SVC por successive halving sobre o número de
+    iterações (`HALVING_PARAMS`).
+
+    O limite de iterações é apenas o recurso da busca: o modelo final é
+    retreinado com todos os dados e os melhores parâmetros, sem limite de
+    iterações (`max_iter=-1`), e `best_params_` não inclui `max_iter`. Os
+    avisos de convergência das combinações avaliadas com poucas iterações são
+    esperados e ignorados; os do modelo final, não.
 
-    plt.savefig(save_path)
-    plt.close()
+    Args:
+        param_grid (list): Grid de parâmetros, no formato do `GridSearchCV`.
+        cv: Esquema de validação cruzada.
+        n_jobs (int): Número de processos usados na busca.
+    """
+
+    def __init__(self, param_grid, cv, n_jobs=1):
+        self.param_grid = param_grid
+        self.cv = cv
+        self.n_jobs = n_jobs
+
+    def fit(self, X, y):
+        search = HalvingGridSearchCV(
+            SVC(), self.param_grid, cv=self.cv, n_jobs=self.n_jobs, refit=False, **HALVING_PARAMS
+        )
+        with warnings.catch_warnings():
+            warnings.simplefilter("ignore", ConvergenceWarning)
+            search.fit(X, y)
+
+        self.cv_results_ = search.cv_results_
+        self.best_score_ = search.best_score_
+        self.best_params_ = {
+            key: value for key, value in search.best_params_.items() if key != "max_iter"
+        }
+        self.best_estimator_ = SVC(**self.best_params_).fit(X, y)
+        self.classes_ = self.best_estimator_.classes_
+        return self
+
+    def predict(self, X):
+        return self.best_estimator_.predict(X)
+
+
+def make_cv(cv, folds, y_train):
+    """
+    Cria o esquema de validação cruzada da busca de hiperparâmetros.
+
+    Args:
+        cv (str): "stratified" para k-fold estratificado ou "loo" para LeaveOneOut.
+        folds (int): Número de folds do k-fold estratificado.
+        y_train (np.array): Rótulos de treino.
+
+    Returns:
+        Objeto de validação cruzada do scikit-learn.
+    """
+    if cv == "loo":
+        return LeaveOneOut()
+    if cv == "stratified":
+        # Cada autor precisa ter ao menos uma amostra em cada fold
+        min_count = np.unique(y_train, return_counts=True)[1].min()
+        return StratifiedKFold(n_splits=max(2, min(folds, min_count)))
+    raise ValueError(f"Validação cruzada desconhecida: {cv}")
 
 
-def train_and_test_svm(X_train, y_train, X_test, y_test):
+def make_search(strategy, cv, n_jobs=1):
     """
-    Treina um modelo SVM com os dados fornecidos, realiza uma busca de hiperparâmetros
-    utilizando GridSearchCV e LeaveOneOut, avalia o desempenho no conjunto de teste
-    e salva uma matriz de confusão.
+    Cria a busca de hiperparâmetros do SVM.
+
+    A busca "grid" é exaustiva e usa kernels pré-calculados (`KernelGridSearchSVC`),
+    com o mesmo resultado do `GridSearchCV` e custo menor.
+
+    Args:
+        strategy (str): "grid" para busca exaustiva ou "halving" para successive
+            halving (`HalvingSearchSVC`).
+        cv: Esquema de validação cruzada.
+        n_jobs (int): Número de processos usados na busca.
+
+    Returns:
+        Busca de hiperparâmetros não treinada.
+    """
+    if strategy == "grid":
+        return KernelGridSearchSVC(PARAM_GRID, cv=cv, n_jobs=n_jobs)
+    if strategy == "halving":
+        return HalvingSearchSVC(PARAM_GRID, cv=cv, n_jobs=n_jobs)
+    raise ValueError(f"Estratégia de busca desconhecida: {strategy}")
+
+
+def train_and_test_svm(X_train, y_train, X_test, y_test, artifacts=None, registry=None,
+                       search=None):
+    """
+    Treina um modelo SVM com os dados fornecidos, realiza uma busca de hiperparâmetros,
+    avalia o desempenho no conjunto de teste e salva uma matriz de confusão.
+
+    A busca pode ser exaustiva ("grid") ou por successive halving ("halving"),
+    com validação cruzada k-fold estratificada ("stratified", padrão) ou
+    LeaveOneOut ("loo"), e executada em paralelo com `n_jobs`.
+
+    As características são normalizadas com `StandardScaler` dentro de cada
+    pipeline. Se um registro de modelos for informado, pipelines já treinados
+    para o mesmo conjunto de autores são reaproveitados.
 
     Args:
         X_train (np.array): Conjunto de dados de treino contendo as características (features).
         y_train (np.array): Conjunto de rótulos de treino (autores).
         X_test (np.array): Conjunto de dados de teste contendo as características (features).
         y_test (np.array): Conjunto de rótulos de teste (autores).
+        artifacts (ArtifactSink): Destino da matriz de confusão.
+        registry (ModelRegistry): Registro de modelos treinados (opcional).
+        search (dict): Configuração da busca ("strategy", "cv", "folds" e "n_jobs").
+            Valores ausentes são completados com `DEFAULT_SEARCH`.
 
     Returns:
-        tuple: Retorna uma tupla contendo duas acurácias:
+        tuple: Retorna uma tupla contendo:
             - accuracy_svm: Acurácia do modelo SVM treinado sem otimização de hiperparâmetros.
-            - accuracy_svm_grid_search: Acurácia do modelo SVM otimizado usando GridSearchCV.
+            - accuracy_svm_grid_search: Acurácia do modelo SVM otimizado.
+            - best_params_svm: Melhores parâmetros encontrados.
+            - search_info: Estratégia, validação cruzada, melhor score e tempo da busca (em segundos).
     """
+    search = {**DEFAULT_SEARCH, **(search or {})}
+
     # Treinar o modelo SVM sem otimização de hiperparâmetros
-    svm_model = SVC()
-    svm_model.fit(X_train, y_train)
+    with progress.stage("svm"):
+        svm_model = fit_pipeline(
+            registry, "svm", {},
+            lambda: make_pipeline(StandardScaler(), SVC()),
+            X_train, y_train,
+        )
 
-    # Fazer previsões e calcular a acurácia
-    y_pred = svm_model.predict(X_test)
+        # Fazer previsões e calcular a acurácia
+        with stage("svm.predict"):
+            y_pred = svm_model.predict(X_test)
     accuracy_svm = accuracy_score(y_test, y_pred)
     print(f"Acurácia do SVM: {accuracy_svm * 100:.2f}%")
 
-    # Definir LeaveOneOut para validação cruzada
-    cv = LeaveOneOut()
-
-    # Definir o grid de parâmetros para múltiplos kernels
-    param_grid = [
-        {"kernel": ["linear"], "C": [0.1, 1, 10, 100]},
-        {
-            "kernel": ["poly"],
-            "C": [0.1, 1, 10],
-            "degree": [2, 3, 4],
-            "gamma": ["scale", "auto"],
-        },
-        {"kernel": ["rbf"], "C": [0.1, 1, 10], "gamma": ["scale", "auto"]},
-    ]
-
-    # Realizar busca de hiperparâmetros usando GridSearchCV
-    svm_model = GridSearchCV(SVC(), param_grid, cv=cv)
-
-    # Treinar o modelo otimizado
-    svm_model.fit(X_train, y_train)
+    # Realizar a busca de hiperparâmetros
+    cv = make_cv(search["cv"], search["folds"], y_train)
+    start = time.perf_counter()
+    with progress.stage("svm_grid_search"):
+        svm_model = fit_pipeline(
+            registry, "svm_grid_search",
+            {"param_grid": PARAM_GRID, "strategy": search["strategy"], "cv": repr(cv)},
+            lambda: make_pipeline(
+                StandardScaler(), make_search(search["strategy"], cv, search["n_jobs"])
+            ),
+            X_train, y_train,
+        )
+    search_time = time.perf_counter() - start
 
     # Fazer previsões no conjunto de teste otimizado
-    y_pred = svm_model.predict(X_test)
+    with stage("svm_grid_search.predict"):
+        y_pred = svm_model.predict(X_test)
 
     # Avaliar a acurácia após a otimização dos hiperparâmetros
     accuracy_svm_grid_search = accuracy_score(y_test, y_pred)
     print(f"Acurácia do SVM Grid Search: {accuracy_svm_grid_search * 100:.2f}%")
 
     # Exibir os melhores parâmetros encontrados
-    best_params_svm = svm_model.best_params_
+    best_params_svm = svm_model[-1].best_params_
     print(f"Melhores parâmetros: {best_params_svm}")
+    print(f"Tempo da busca de hiperparâmetros: {search_time:.2f}s")
+
+    search_info = {
+        "strategy": search["strategy"],
+        "cv": repr(cv),
+        "best_score": float(svm_model[-1].best_score_),
+        "time": search_time,
+    }
 
     # Plotar e salvar a matriz de confusão
     save_path = "../confusion_matrix.png"
-    plot_confusion_matrix(
-        y_test, y_pred, classes=svm_model.classes_, save_path=save_path
-    )
+    with progress.stage("confusion_matrix"):
+        plot_confusion_matrix(
+            y_test, y_pred, classes=svm_model.classes_, save_path=save_path,
+            artifacts=artifacts,
+        )
 
-    return accuracy_svm, accuracy_svm_grid_search, best_params_svm
+    return accuracy_svm, accuracy_svm_grid_search, best_params_svm, search_info
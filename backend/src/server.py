@@ -1,18 +1,310 @@
-from fastapi import FastAPI
-from pydantic import BaseModel
-from typing import List
+import os
+import time
+
+# Início da importação do servidor, para o relatório de inicialização
+import_start = time.perf_counter()
+
+import json
+import asyncio
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import asynccontextmanager, contextmanager
+from fastapi import FastAPI, HTTPException, File, UploadFile
+from fastapi.responses import PlainTextResponse, StreamingResponse
+import numpy as np
+from pydantic import BaseModel, Field
+from typing import List, Literal, Optional
 from fastapi.middleware.cors import CORSMiddleware
 
-from .models.main import init
+from .jobs import JobManager, QueueFullError
+from .batch import identify_batch, iter_file_images
+from .features.artifacts import ArtifactSink
+from .features.store import open_feature_store
+from .features.cache import FeatureCache
+from .features.metrics import metrics, merge_snapshots, render_prometheus, current_rss_bytes, rss_growth
+from .features.preprocess import decode_image, FEATURE_PARAMS
+from .features.fragments import image_features, fragment_params
+from .features.engine import family_columns, engine_params, resolve_families
+from .models.identify import load_identifier, rank_authors, rank_batch
+from .models.persistence import ModelArtifacts, store_fingerprint
+from .models.author_index import AuthorIndex
+
+# Gravação dos artefatos (matriz de confusão, imagens intermediárias):
+# "off", "sync" ou "async", com amostragem opcional de uma a cada N imagens
+artifact_sink = ArtifactSink(
+    os.environ.get("MANUSCRITUS_ARTIFACTS", "sync"),
+    int(os.environ.get("MANUSCRITUS_ARTIFACTS_EVERY", "1")),
+)
 
 
 # Classe para validar o corpo da requisição
 class ModelRequest(BaseModel):
     num_authors: int
     models: List[str]
+    search_strategy: Literal["grid", "halving"] = "grid"
+    cv: Literal["stratified", "loo"] = "stratified"
+    cv_folds: int = 5
+    profile: bool = False
+    subsets: int = Field(1, ge=1)
+    seed: Optional[int] = None
+
+
+# Número de processos de cada busca de hiperparâmetros. Como os jobs já rodam
+# em paralelo no pool, o padrão é 1 para não disputar os mesmos núcleos.
+search_jobs = int(os.environ.get("MANUSCRITUS_SEARCH_JOBS", "1"))
+
+# Número de subconjuntos de autores avaliados ao mesmo tempo (em threads) por
+# cada job com `subsets` maior que 1 (0 para o número de CPUs). Ao contrário
+# da busca, o padrão é paralelo: um job de Monte Carlo ocupa um único processo
+# do pool, e o treino dos modelos (libsvm, árvores, numpy) libera o GIL.
+subset_jobs = int(os.environ.get("MANUSCRITUS_SUBSET_JOBS", "0")) or os.cpu_count()
+
+
+# Registro de modelos de cada processo do pool: repositórios de características
+# abertos uma única vez e pipelines treinados em cache (LRU limitado por entradas e memória)
+registry_kwargs = {
+    "max_entries": int(os.environ.get("MANUSCRITUS_REGISTRY_ENTRIES", "32")),
+    "max_bytes": int(os.environ.get("MANUSCRITUS_REGISTRY_MB", "256")) * 1024 * 1024,
+}
+
+# Diretório do modelo de identificação treinado, carregado por memory-map nas
+# próximas inicializações. Vazio para não gravar o modelo.
+model_dir = os.environ.get("MANUSCRITUS_MODEL_DIR", "trained_models")
+
+# Tempo de cada etapa da inicialização, em segundos (ver GET /startup)
+startup_report = {}
+
+# Pool de processos dos jobs de treino/avaliação, criado na inicialização
+job_manager = None
+
+# Modelo de identificação de autoria, treinado com todos os autores na inicialização
+identifier = None
+
+# Índice dos autores mais próximos, criado com todos os autores na inicialização
+author_index = None
+
+# Orçamento de latência padrão do /identify, em milissegundos
+identify_budget_ms = float(os.environ.get("MANUSCRITUS_IDENTIFY_BUDGET_MS", "2000"))
+
+# Fragmentos sorteados por imagem no /identify (0 para a imagem inteira). Deve
+# ser o mesmo valor usado na extração das características de treino.
+identify_fragments = int(os.environ.get("MANUSCRITUS_FRAGMENTS", "0"))
+
+# Famílias de características do /identify. Devem ser as mesmas usadas na
+# extração das características de treino.
+identify_families = resolve_families(os.environ.get("MANUSCRITUS_FEATURES", "slant"))
+
+# Pool de threads que extrai a inclinação dos fragmentos de cada imagem
+fragment_executor = ThreadPoolExecutor(
+    max_workers=int(os.environ.get("MANUSCRITUS_FRAGMENT_THREADS", "0")) or os.cpu_count()
+)
+
+# Threads que processam as imagens do /identify/batch e número máximo de
+# imagens em andamento em cada lote (0 para o padrão: número de CPUs e
+# `batch.MAX_PENDING`)
+batch_workers = int(os.environ.get("MANUSCRITUS_BATCH_WORKERS", "0")) or None
+batch_pending = int(os.environ.get("MANUSCRITUS_BATCH_PENDING", "0")) or None
+
+# Intervalo, em segundos, do comentário enviado nos fluxos de eventos (SSE) sem
+# eventos novos, para que proxies não encerrem a conexão por inatividade
+sse_ping_seconds = float(os.environ.get("MANUSCRITUS_SSE_PING", "15"))
+
+# Cache opcional de características das imagens enviadas ao /identify
+extraction_params = {
+    **FEATURE_PARAMS, **fragment_params(identify_fragments), **engine_params(identify_families),
+}
+feature_cache = None
+if os.environ.get("MANUSCRITUS_FEATURE_CACHE"):
+    feature_cache = FeatureCache(os.environ["MANUSCRITUS_FEATURE_CACHE"], extraction_params)
+
+# Diretório dos autores cadastrados pelo /authors, aplicados ao índice de
+# autores mais próximos a cada inicialização
+enrollment_dir = os.environ.get("MANUSCRITUS_ENROLLMENT_DIR", "enrollments")
+
+# Método padrão do /identify: "forest" (Random Forest) ou "index" (autores mais
+# próximos, o único que reconhece os autores cadastrados pelo /authors)
+identify_method = os.environ.get("MANUSCRITUS_IDENTIFY_METHOD", "forest")
+
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    global job_manager, identifier, author_index
+
+    import_seconds = time.perf_counter() - import_start
+    timer = StageTimer(float("inf"), prefix="startup")
+
+    # Converte os CSVs em repositórios binários antes de iniciar o pool, para
+    # que os processos apenas os abram por memory-map
+    with timer.stage("stores"):
+        train_store = open_feature_store("treino.csv")
+        test_store = open_feature_store("teste.csv")
+
+    if train_store.columns != family_columns(identify_families):
+        raise ValueError(
+            "As colunas de treino.csv não correspondem às famílias de MANUSCRITUS_FEATURES "
+            f"({', '.join(identify_families)})."
+        )
+
+    # Carrega (ou treina) o modelo de identificação antes de aceitar requisições
+    with timer.stage("identifier"):
+        artifacts = None
+        if model_dir:
+            artifacts = ModelArtifacts(model_dir, store_fingerprint(train_store, test_store))
+        identifier, identifier_loaded = await asyncio.to_thread(
+            load_identifier, train_store, artifacts
+        )
+
+    with timer.stage("author_index"):
+        author_index = await asyncio.to_thread(AuthorIndex.from_store, train_store)
+        await asyncio.to_thread(
+            author_index.attach, enrollment_dir, extraction_params, store_fingerprint(train_store)
+        )
+
+    # Inicia os processos do pool antes de aceitar requisições, para que o
+    # primeiro job não espere pela inicialização dos processos
+    with timer.stage("pool"):
+        job_manager = JobManager(
+            max_workers=int(os.environ.get("MANUSCRITUS_WORKERS", "0")) or None,
+            max_queue=int(os.environ.get("MANUSCRITUS_MAX_QUEUE", "8")),
+            registry_kwargs=registry_kwargs,
+            artifacts=artifact_sink,
+            profile_dir=os.environ.get("MANUSCRITUS_PROFILE_DIR", "profiles"),
+        )
+        await asyncio.to_thread(job_manager.warm_up)
+
+    startup_report.update({
+        "imports": import_seconds,
+        **{name: ms / 1000 for name, ms in timer.timings.items()},
+        "total": import_seconds + timer.elapsed_ms() / 1000,
+        "identifier_loaded": identifier_loaded,
+    })
+    print("Inicialização: " + ", ".join(
+        f"{name} {seconds:.2f}s" for name, seconds in startup_report.items()
+        if name != "identifier_loaded"
+    ) + (" (modelo carregado do disco)" if identifier_loaded else " (modelo treinado)"))
+
+    yield
+    job_manager.shutdown()
+    fragment_executor.shutdown()
+    # Grava os artefatos pendentes antes de encerrar o servidor
+    artifact_sink.close()
+
+
+def submit_job(request):
+    try:
+        search = {
+            "strategy": request.search_strategy,
+            "cv": request.cv,
+            "folds": request.cv_folds,
+            "n_jobs": search_jobs,
+        }
+        evaluation = {"subsets": request.subsets, "seed": request.seed, "n_jobs": subset_jobs}
+        return job_manager.submit(
+            request.num_authors, request.models, search, request.profile, evaluation
+        )
+    except QueueFullError as e:
+        raise HTTPException(status_code=429, detail=str(e))
+
+
+class StageTimer:
+    """
+    Mede o tempo de cada etapa de uma requisição e interrompe a requisição
+    (status 504) quando o orçamento de latência é ultrapassado. As durações
+    também são registradas nas métricas do processo, como etapas "<prefixo>.<etapa>".
+
+    Args:
+        budget_ms (float): Orçamento de latência, em milissegundos.
+        prefix (str): Prefixo das etapas nas métricas.
+    """
+
+    def __init__(self, budget_ms, prefix="identify"):
+        self.budget_ms = budget_ms
+        self.prefix = prefix
+        self.timings = {}
+        self._start = time.perf_counter()
+
+    def elapsed_ms(self):
+        return (time.perf_counter() - self._start) * 1000
+
+    @contextmanager
+    def stage(self, name):
+        start_rss = current_rss_bytes()
+        start = time.perf_counter()
+        try:
+            yield
+        except BaseException:
+            metrics.observe(
+                f"{self.prefix}.{name}", time.perf_counter() - start, True, rss_growth(start_rss)
+            )
+            raise
+        seconds = time.perf_counter() - start
+        metrics.observe(f"{self.prefix}.{name}", seconds, False, rss_growth(start_rss))
+        self.timings[name] = seconds * 1000
 
+        if self.elapsed_ms() > self.budget_ms:
+            raise HTTPException(status_code=504, detail={
+                "error": f"Orçamento de latência de {self.budget_ms:.0f} ms excedido na etapa {name}.",
+                "timings_ms": self.timings,
+            })
 
-app = FastAPI()
+
+def get_job(job_id):
+    job = job_manager.get(job_id)
+    if job is None:
+        raise HTTPException(status_code=404, detail="Job não encontrado.")
+    return job
+
+
+# Eventos que encerram o fluxo de progresso de um job
+FINAL_EVENTS = {"result", "error", "cancelled"}
+
+
+def event_stream(job, ping_seconds=None):
+    """
+    Cria a resposta Server-Sent Events com os eventos de progresso de um job:
+    os já ocorridos e os seguintes, até o último ("result", "error" ou "cancelled").
+    Sem eventos novos por `ping_seconds`, envia um comentário (": ping"), que os
+    clientes ignoram, para manter a conexão ativa.
+
+    Args:
+        job (Job): Job acompanhado.
+        ping_seconds (float): Intervalo máximo sem mensagens (padrão:
+            `MANUSCRITUS_SSE_PING`).
+
+    Returns:
+        StreamingResponse: Resposta "text/event-stream", um evento por mensagem,
+        com o tipo em "event" e o evento completo, em JSON, em "data".
+    """
+    ping_seconds = ping_seconds or sse_ping_seconds
+    loop = asyncio.get_running_loop()
+    events = asyncio.Queue()
+
+    def deliver(event):
+        # Chamado na thread que publica o evento
+        loop.call_soon_threadsafe(events.put_nowait, event)
+
+    async def stream():
+        job.subscribe(deliver)
+        try:
+            while True:
+                try:
+                    event = await asyncio.wait_for(events.get(), ping_seconds)
+                except asyncio.TimeoutError:
+                    yield ": ping\n\n"
+                    continue
+                yield f"event: {event['event']}\ndata: {json.dumps(event, default=str)}\n\n"
+                if event["event"] in FINAL_EVENTS:
+                    return
+        finally:
+            job.unsubscribe(deliver)
+
+    return StreamingResponse(
+        stream(),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+    )
+
+
+app = FastAPI(lifespan=lifespan)
 
 # Configuração do CORS
 app.add_middleware(
@@ -30,27 +322,403 @@ async def get_results(request: ModelRequest):
     Realiza a carga dos dados, seleção de autores aleatórios, normalização das características e
     testes de modelos de aprendizado de máquina (SVM e Random Forest).
 
+    O treino é executado no pool de processos, sem bloquear o servidor. Se a
+    fila de jobs estiver cheia, a requisição é recusada com status 429.
+
     Args:
         request (ModelRequest): Um objeto contendo os parâmetros da requisição.
             - num_authors (int): Número de autores aleatórios a serem selecionados para o teste.
             - models (List[str]): Lista de modelos a serem testados. Os modelos podem incluir:
                 - "svm": para executar o modelo SVM.
                 - "random_forest": para executar o modelo Random Forest.
+                - "author_index": para avaliar o índice de autores mais próximos.
+            - search_strategy (str): Busca de hiperparâmetros do SVM: "grid" (padrão) ou "halving".
+            - cv (str): Validação cruzada da busca: "stratified" (k-fold, padrão) ou "loo" (LeaveOneOut).
+            - cv_folds (int): Número de folds do k-fold estratificado.
+            - profile (bool): Se True, o job é executado sob o cProfile e o perfil é
+              gravado em `MANUSCRITUS_PROFILE_DIR` (padrão "profiles").
+            - subsets (int): Número de subconjuntos aleatórios de autores avaliados
+              (padrão 1). Com mais de um, é retornado um resumo das acurácias.
+            - seed (int): Semente do sorteio dos autores, para resultados reproduzíveis.
 
     Returns:
         dict: Um dicionário com as acurácias dos modelos testados. O dicionário pode conter:
             - "accuracy_svm": Acurácia do modelo SVM (em percentual).
             - "accuracy_svm_grid_search": Acurácia do modelo SVM com Grid Search (em percentual).
             - "best_params_svm": Melhores parâmetros encontrados para o modelo SVM.
+            - "search_svm": Estratégia, validação cruzada, melhor score e tempo da busca (em segundos).
             - "accuracy_rf": Acurácia do modelo Random Forest (em percentual).
+            - "accuracy_index" e "accuracy_index_top_k": Acurácias top-1 e top-k do
+              índice de autores (em percentual), com k em "index_top_k".
+            - "profile": Caminho do perfil do job, se `profile` for True.
+
+        Com `subsets` maior que 1, o dicionário contém:
+            - "subsets", "seed", "num_authors" e "confidence": Parâmetros da avaliação.
+            - "summary": Para cada acurácia, média ("mean"), desvio padrão ("std"),
+              mínimo ("min"), máximo ("max") e intervalo de confiança da média ("ci").
+            - "runs": Acurácias de cada subconjunto.
 
         Caso nenhum modelo reconhecido seja solicitado, o retorno será:
             - "error": Mensagem indicando que nenhum modelo foi reconhecido.
     """
-    num_authors = request.num_authors
-    models = request.models
-
     # Inicializa o teste com os autores e modelos fornecidos
-    results = init(num_authors, models)
+    job = submit_job(request)
+    results = (await asyncio.wrap_future(job.future))[0]
 
     return results
+
+
+@app.post("/jobs", status_code=202)
+async def create_job(request: ModelRequest):
+    """
+    Submete um job de treino/avaliação, com os mesmos parâmetros de `/results`,
+    e retorna imediatamente.
+
+    Returns:
+        dict: Identificador, estado e parâmetros do job.
+    """
+    return submit_job(request).to_dict()
+
+
+@app.get("/jobs")
+async def get_jobs_stats():
+    """
+    Retorna o estado do pool de processos e da fila de jobs.
+
+    Returns:
+        dict: Número de processos, tamanho máximo da fila e contagem de jobs por estado.
+    """
+    return job_manager.stats()
+
+
+@app.get("/jobs/{job_id}")
+async def get_job_status(job_id: str):
+    """
+    Retorna o estado de um job ("pending", "running", "finished", "failed" ou "cancelled").
+
+    Returns:
+        dict: Identificador, estado e parâmetros do job.
+    """
+    return get_job(job_id).to_dict()
+
+
+@app.get("/jobs/{job_id}/result")
+async def get_job_result(job_id: str):
+    """
+    Retorna o resultado de um job concluído, no mesmo formato de `/results`.
+    Responde com status 409 se o job ainda não terminou ou foi cancelado.
+
+    Returns:
+        dict: Resultado do job, ou a mensagem de erro se ele falhou.
+    """
+    job = get_job(job_id)
+    status = job.status
+    if status == "failed":
+        return {"error": str(job.future.exception())}
+    if status != "finished":
+        raise HTTPException(status_code=409, detail=f"O job está no estado {status}.")
+
+    return job.future.result()[0]
+
+
+@app.get("/jobs/{job_id}/events")
+async def get_job_events(job_id: str):
+    """
+    Acompanha o progresso de um job por Server-Sent Events. Os eventos são:
+        - "queued": O job entrou na fila.
+        - "started": O job começou a ser executado ("num_authors", "models", "subsets").
+        - "stage_started" e "stage_finished": Início e fim de uma etapa ("stage"),
+          com a duração em segundos ("seconds") no fim.
+        - "grid_progress": Pontos da busca de hiperparâmetros do SVM já avaliados
+          ("completed" de "total"), com o melhor score parcial ("best_score") e
+          seus parâmetros ("best_params").
+        - "subset_finished": Subconjuntos de autores já avaliados ("completed" de "total").
+        - "result", "error" ou "cancelled": Último evento, com o resultado do job
+          ("result", no formato de `/results`) ou a mensagem de erro ("error").
+
+    Os eventos já ocorridos são enviados ao conectar, de modo que o fluxo pode
+    ser aberto a qualquer momento após a submissão do job.
+
+    Returns:
+        StreamingResponse: Fluxo "text/event-stream".
+    """
+    return event_stream(get_job(job_id))
+
+
+@app.post("/results/stream")
+async def stream_results(request: ModelRequest):
+    """
+    Submete um job com os mesmos parâmetros de `/results` e acompanha o seu
+    progresso por Server-Sent Events, no formato de `/jobs/{job_id}/events`. O
+    resultado chega no último evento ("result").
+
+    Returns:
+        StreamingResponse: Fluxo "text/event-stream".
+    """
+    return event_stream(submit_job(request))
+
+
+@app.delete("/jobs/{job_id}")
+async def cancel_job(job_id: str):
+    """
+    Cancela um job que ainda está na fila. Jobs em execução não podem ser
+    cancelados.
+
+    Returns:
+        dict: Identificador, estado e parâmetros do job.
+    """
+    job = get_job(job_id)
+    if not job_manager.cancel(job_id):
+        raise HTTPException(status_code=409, detail=f"O job está no estado {job.status}.")
+    return job.to_dict()
+
+
+@app.get("/registry")
+async def get_registry_stats():
+    """
+    Retorna as estatísticas do cache de modelos treinados, somadas entre os
+    processos do pool.
+
+    Returns:
+        dict: Acertos e falhas do cache, número de pipelines em cache e memória ocupada.
+    """
+    return job_manager.stats()["registry"]
+
+
+@app.get("/metrics", response_class=PlainTextResponse)
+async def get_metrics():
+    """
+    Retorna as métricas das etapas (histogramas de duração, erros e aumento da
+    memória residente) do servidor e dos processos do pool, no formato de texto
+    do Prometheus, junto com o pico de memória dos processos, o estado da fila
+    de jobs e o cache de modelos.
+
+    Returns:
+        str: Métricas no formato de texto do Prometheus.
+    """
+    stats = job_manager.stats()
+    snapshot = merge_snapshots([metrics.snapshot(), job_manager.metrics()])
+    gauges = {
+        "manuscritus_jobs": ("Jobs por estado.", [
+            ({"status": status}, count) for status, count in sorted(stats["jobs"].items())
+        ]),
+        "manuscritus_queue_depth": ("Jobs aguardando um processo livre.", [
+            ({}, stats["queue_depth"]),
+        ]),
+        "manuscritus_registry": ("Estatísticas do cache de modelos dos processos do pool.", [
+            ({"stat": key}, value) for key, value in sorted(stats["registry"].items())
+        ]),
+    }
+    return render_prometheus(snapshot, gauges)
+
+
+def image_vectors(data, timer):
+    """
+    Extrai em memória os vetores de características de uma imagem enviada: um
+    vetor da imagem inteira ou, com `MANUSCRITUS_FRAGMENTS` maior que zero, um
+    vetor por fragmento sorteado.
+
+    Args:
+        data (bytes): Conteúdo do arquivo de imagem.
+        timer (StageTimer): Medidor das etapas da requisição.
+
+    Returns:
+        tuple: Matriz com um vetor de características por linha e se os vetores
+        vieram do cache.
+    """
+    vectors = None
+    if feature_cache is not None:
+        with timer.stage("cache"):
+            key = feature_cache.key(data=data)
+            vectors = feature_cache.get(key)
+    cached = vectors is not None
+
+    if not cached:
+        with timer.stage("decode"):
+            img = decode_image(data)
+        if img is None:
+            raise HTTPException(status_code=400, detail="Não foi possível decodificar a imagem.")
+
+        vectors = image_features(
+            img, identify_fragments, fragment_executor, identify_families, timer.stage
+        )
+        if vectors is None:
+            raise HTTPException(status_code=422, detail="A imagem não tem escrita suficiente.")
+
+        if feature_cache is not None:
+            feature_cache.put(key, vectors)
+    elif np.isnan(vectors).any():
+        # Vetores gravados no cache antes de as páginas sem escrita serem recusadas
+        raise HTTPException(status_code=422, detail="A imagem não tem escrita suficiente.")
+
+    return np.atleast_2d(vectors), cached
+
+
+@app.get("/startup")
+async def get_startup_report():
+    """
+    Retorna o tempo de cada etapa da inicialização do servidor: importação dos
+    módulos, abertura dos repositórios de características, carga (ou treino) do
+    modelo de identificação, criação do índice de autores e início dos
+    processos do pool.
+
+    Returns:
+        dict: Tempo de cada etapa e o tempo total, em segundos, e se o modelo
+        de identificação foi carregado do disco ("identifier_loaded").
+    """
+    return startup_report
+
+
+@app.post("/identify")
+def identify_author(file: UploadFile = File(...), top_k: int = 5, budget_ms: float = None,
+                    aggregate: Literal["mean", "vote"] = "mean",
+                    method: Literal["forest", "index"] = None):
+    """
+    Identifica os autores mais prováveis de um manuscrito enviado.
+
+    A imagem é decodificada, pré-processada e tem a inclinação axial extraída em
+    memória, sem gravar arquivos, e é então avaliada pelo modelo de
+    identificação já treinado ou pelo índice de autores mais próximos. Com
+    `MANUSCRITUS_FRAGMENTS` maior que zero, a inclinação é extraída de cada
+    fragmento sorteado e as predições dos fragmentos são combinadas.
+
+    Args:
+        file (UploadFile): Imagem do manuscrito.
+        top_k (int): Número de autores retornados.
+        budget_ms (float): Orçamento de latência em milissegundos. Se ultrapassado,
+            a requisição é interrompida com status 504.
+        aggregate (str): Combinação das predições dos fragmentos: "mean" (média
+            das probabilidades, padrão) ou "vote" (votação).
+        method (str): "forest" (Random Forest; o score é a probabilidade) ou
+            "index" (autores mais próximos, incluindo os cadastrados pelo
+            /authors; o score é a semelhança do cosseno). O padrão é
+            `MANUSCRITUS_IDENTIFY_METHOD` ("forest").
+
+    Returns:
+        dict: Um dicionário contendo:
+            - "authors": Lista com os `top_k` autores mais prováveis e seus scores.
+            - "timings_ms": Tempo de cada etapa e o tempo total, em milissegundos.
+            - "budget_ms": Orçamento de latência aplicado.
+            - "fragments": Número de fragmentos avaliados.
+            - "cached": Se o vetor de características veio do cache.
+    """
+    timer = StageTimer(budget_ms or identify_budget_ms)
+
+    with timer.stage("read"):
+        data = file.file.read()
+
+    vectors, cached = image_vectors(data, timer)
+
+    with timer.stage("score"):
+        if (method or identify_method) == "index":
+            try:
+                authors = author_index.rank_authors(vectors, top_k, aggregate)[0]
+            except ValueError as e:
+                raise HTTPException(status_code=409, detail=str(e))
+        else:
+            authors = rank_authors(identifier, vectors, top_k, aggregate)[0]
+
+    timer.timings["total"] = timer.elapsed_ms()
+    return {
+        "authors": authors,
+        "timings_ms": timer.timings,
+        "budget_ms": timer.budget_ms,
+        "fragments": len(vectors),
+        "cached": cached,
+    }
+
+
+@app.post("/identify/batch")
+def identify_authors_batch(files: List[UploadFile] = File(...), top_k: int = 5,
+                           aggregate: Literal["mean", "vote"] = "mean"):
+    """
+    Identifica os autores mais prováveis de um lote de manuscritos, com o
+    modelo de identificação (Random Forest).
+
+    Cada arquivo enviado pode ser uma imagem ou um zip de imagens. As imagens
+    são decodificadas e têm as características extraídas em um pool de threads
+    (`MANUSCRITUS_BATCH_WORKERS`), com no máximo `MANUSCRITUS_BATCH_PENDING`
+    imagens em andamento; as imagens prontas são avaliadas juntas, com uma
+    única chamada de `predict_proba` (ver `batch.identify_batch`).
+
+    Args:
+        files (List[UploadFile]): Imagens ou arquivos zip de imagens.
+        top_k (int): Número de autores retornados por imagem.
+        aggregate (str): Combinação das predições dos fragmentos de cada imagem:
+            "mean" (média das probabilidades, padrão) ou "vote" (votação).
+
+    Returns:
+        StreamingResponse: Resultados em NDJSON ("application/x-ndjson"), uma
+        linha por imagem, na ordem em que ficam prontos: "index" (posição no
+        lote), "name", "authors" (os `top_k` autores mais prováveis e seus
+        scores), "fragments" e "extract_ms", ou "error" se a imagem não pôde ser
+        processada. A última linha é o resumo do lote ("images", "errors",
+        "batches" e "total_ms").
+    """
+    def vectorize(data):
+        try:
+            return image_vectors(data, StageTimer(float("inf"), prefix="batch"))[0]
+        except HTTPException as e:
+            raise ValueError(e.detail)
+
+    def score(groups):
+        return rank_batch(identifier, groups, top_k, aggregate)
+
+    images = (image for file in files for image in iter_file_images(file.filename, file.file))
+    results = identify_batch(images, vectorize, score, batch_workers, batch_pending)
+    return StreamingResponse(
+        (json.dumps(result) + "\n" for result in results), media_type="application/x-ndjson"
+    )
+
+
+@app.post("/authors/{author}")
+def add_author(author: str, files: List[UploadFile] = File(...)):
+    """
+    Cadastra um autor sem retreinar os modelos: as características são
+    extraídas apenas das imagens enviadas, as estatísticas do normalizador são
+    atualizadas com essas amostras e o autor é adicionado ao índice de autores
+    mais próximos. O cadastro é gravado em `MANUSCRITUS_ENROLLMENT_DIR` e
+    reaplicado na próxima inicialização; o custo depende apenas das imagens do
+    autor, não do tamanho do corpus. Se o autor já existir, as amostras são
+    somadas às que ele já tem. O Random Forest do /identify não é alterado.
+
+    Args:
+        author (str): Nome do autor.
+        files (List[UploadFile]): Imagens de manuscritos do autor.
+
+    Returns:
+        dict: Nome do autor, número de amostras adicionadas, número de autores
+        no índice e tempo de cada etapa, em milissegundos.
+    """
+    timer = StageTimer(float("inf"), prefix="enroll")
+    vectors = []
+    for file in files:
+        with timer.stage("read"):
+            data = file.file.read()
+        vectors.append(image_vectors(data, timer)[0])
+    vectors = np.concatenate(vectors)
+
+    with timer.stage("index"):
+        author_index.add(author, vectors)
+
+    timer.timings["total"] = timer.elapsed_ms()
+    return {
+        "author": author,
+        "samples": len(vectors),
+        "authors": len(author_index),
+        "timings_ms": timer.timings,
+    }
+
+
+@app.delete("/authors/{author}")
+def remove_author(author: str):
+    """
+    Remove um autor do índice de autores mais próximos. A remoção também é
+    gravada em `MANUSCRITUS_ENROLLMENT_DIR`.
+
+    Returns:
+        dict: Nome do autor e número de autores no índice.
+    """
+    if not author_index.remove(author):
+        raise HTTPException(status_code=404, detail="Autor não encontrado.")
+    return {"author": author, "authors": len(author_index)}
@@ -0,0 +1,66 @@
+import numpy as np
+
+from src.models.author_index import AuthorIndex
+
+from test_kernel_search import author_features
+
+PARAMS = {"fragments": 0}
+
+
+def test_enrollment_scaler_follows_training_data(tmp_path):
+    X, y = author_features(0)
+    index = AuthorIndex.build(X, y)
+    index.attach(str(tmp_path), PARAMS, "treino-1")
+    index.add("novo", X[:3] + 5)
+
+    # Mesmo treino: o normalizador gravado, com o cadastro, é reaproveitado
+    same = AuthorIndex.build(X, y)
+    same.attach(str(tmp_path), PARAMS, "treino-1")
+    np.testing.assert_allclose(same.scaler.mean_, index.scaler.mean_)
+
+    # Treino alterado: o normalizador é recalculado com o novo treino e o cadastro
+    X_changed = X * 2
+    changed = AuthorIndex.build(X_changed, y)
+    changed.attach(str(tmp_path), PARAMS, "treino-2")
+    expected = np.concatenate([X_changed, X[:3] + 5]).mean(axis=0)
+    np.testing.assert_allclose(changed.scaler.mean_, expected, rtol=1e-5)
+    assert "novo" in changed.authors
+
+    reloaded = AuthorIndex.build(X_changed, y)
+    reloaded.attach(str(tmp_path), PARAMS, "treino-2")
+    np.testing.assert_allclose(reloaded.scaler.mean_, changed.scaler.mean_)
+
+
+def test_enrollments_are_applied_over_the_current_training_data(tmp_path):
+    X, y = author_features(0)
+    authors = np.unique(y)
+    existing, removed = str(authors[0]), str(authors[1])
+
+    index = AuthorIndex.build(X, y)
+    index.attach(str(tmp_path), PARAMS, "treino-1")
+    extra = X[:2] + 5
+    index.add(existing, extra)
+    index.remove(removed)
+
+    # O treino muda: as amostras cadastradas são somadas às novas amostras de
+    # treino do autor, e não às antigas
+    X_changed = X * 2
+    changed = AuthorIndex.build(X_changed, y)
+    changed.attach(str(tmp_path), PARAMS, "treino-2")
+
+    np.testing.assert_allclose(
+        changed._vectors[existing], np.concatenate([X_changed[y == existing], extra]), rtol=1e-6
+    )
+    assert removed not in changed.authors
+    kept = np.isin(y, [removed], invert=True)
+    expected = np.concatenate([X_changed[kept], extra]).mean(axis=0)
+    np.testing.assert_allclose(changed.scaler.mean_, expected, rtol=1e-5)
+
+    # Um autor removido e cadastrado de novo tem apenas as amostras cadastradas
+    changed.add(removed, extra)
+    again = AuthorIndex.build(X_changed, y)
+    again.attach(str(tmp_path), PARAMS, "treino-2")
+    np.testing.assert_allclose(again._vectors[removed], extra)
+    np.testing.assert_allclose(
+        again._vectors[existing], np.concatenate([X_changed[y == existing], extra]), rtol=1e-6
+    )
@@ -0,0 +1,91 @@
+import io
+import time
+import zipfile
+
+import numpy as np
+import pytest
+
+from src.batch import identify_batch, iter_file_images
+
+
+def images(n):
+    return [(f"pagina{i}.bmp", bytes([i])) for i in range(n)]
+
+
+def vectorize(data):
+    # Tempos diferentes por imagem, para que terminem fora de ordem
+    time.sleep(0.001 * (5 - data[0] % 5))
+    return np.full((1, 2), data[0], dtype=float)
+
+
+def score(groups):
+    return [[{"author": f"autor{int(vectors[0, 0])}", "score": 1.0}] for vectors in groups]
+
+
+@pytest.mark.parametrize("workers", [1, 4])
+def test_identify_batch_reports_every_image_with_its_index(workers):
+    results = list(identify_batch(images(12), vectorize, score, workers, max_pending=4))
+    summary, records = results[-1], results[:-1]
+
+    assert sorted(record["index"] for record in records) == list(range(12))
+    for record in records:
+        assert record["name"] == f"pagina{record['index']}.bmp"
+        assert record["authors"][0]["author"] == f"autor{record['index']}"
+    assert summary["images"] == 12
+    assert summary["errors"] == 0
+    assert 1 <= summary["batches"] <= 12
+
+
+@pytest.mark.parametrize("max_pending", [1, 3])
+def test_identify_batch_limits_images_in_progress(max_pending):
+    state = {"read": 0, "finished": 0}
+
+    def source():
+        for item in images(10):
+            state["read"] += 1
+            assert state["read"] - state["finished"] <= max_pending
+            yield item
+
+    for result in identify_batch(source(), vectorize, score, workers=2, max_pending=max_pending):
+        if "index" in result:
+            state["finished"] += 1
+    assert state["read"] == 10
+
+
+def test_identify_batch_reports_image_errors_and_continues():
+    def failing(data):
+        if data[0] == 1:
+            raise ValueError("A imagem não tem escrita suficiente.")
+        if data[0] == 2:
+            raise RuntimeError("imagem corrompida")
+        return vectorize(data)
+
+    results = list(identify_batch(images(4), failing, score, workers=2))
+    records = {record["index"]: record for record in results[:-1]}
+
+    assert records[1]["error"] == "A imagem não tem escrita suficiente."
+    assert records[2]["error"] == "RuntimeError: imagem corrompida"
+    assert "authors" in records[0] and "authors" in records[3]
+    assert results[-1]["images"] == 4
+    assert results[-1]["errors"] == 2
+
+
+def test_identify_batch_reports_read_errors_and_ends_with_summary():
+    archive = io.BytesIO()
+    with zipfile.ZipFile(archive, "w", zipfile.ZIP_STORED) as zf:
+        zf.writestr("a.bmp", b"\x00" * 64)
+        zf.writestr("b.bmp", b"\x01" * 64)
+    data = bytearray(archive.getvalue())
+    # Corrompe o conteúdo de b.bmp: a leitura falha na verificação do CRC
+    offset = data.index(b"\x01" * 64)
+    data[offset] = 0x02
+
+    results = list(identify_batch(
+        iter_file_images("lote.zip", io.BytesIO(bytes(data))), vectorize, score, workers=1
+    ))
+    records = {record["index"]: record for record in results[:-1]}
+
+    assert records[0]["name"] == "a.bmp" and "authors" in records[0]
+    assert records[1]["name"] is None
+    assert records[1]["error"].startswith("BadZipFile")
+    assert results[-1] == {**results[-1], "images": 2, "errors": 1}
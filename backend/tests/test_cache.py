@@ -0,0 +1,42 @@
+import os
+import time
+
+import numpy as np
+
+from src.features.cache import FeatureCache
+
+PARAMS = {"slant_version": 1, "threshold": "otsu"}
+
+
+def test_changed_params_invalidate_entries(tmp_path):
+    cache = FeatureCache(str(tmp_path), PARAMS)
+    key = cache.key(data=b"imagem")
+    cache.put(key, np.arange(4.0))
+    np.testing.assert_array_equal(FeatureCache(str(tmp_path), PARAMS).get(key), np.arange(4.0))
+
+    changed = FeatureCache(str(tmp_path), {**PARAMS, "slant_version": 2})
+    assert changed.key(data=b"imagem") != key
+    assert changed.get(key) is None
+    assert list(changed._entries()) == []
+
+
+def test_eviction_removes_least_recently_used_entries_first(tmp_path):
+    cache = FeatureCache(str(tmp_path), PARAMS)
+    keys = [cache.key(data=bytes([i])) for i in range(3)]
+    for i, key in enumerate(keys):
+        cache.put(key, np.full(16, i, dtype=np.float64))
+        # Horários de uso distintos, do mais antigo ao mais recente
+        past = time.time() - 100 + i
+        os.utime(cache._entry_path(key), (past, past))
+
+    # Usar a entrada mais antiga a torna a mais recente
+    assert cache.get(keys[0]) is not None
+
+    entry_size = os.path.getsize(cache._entry_path(keys[0]))
+    cache.max_bytes = 2 * entry_size
+    cache.evict()
+
+    assert cache.get(keys[1]) is None
+    assert cache.get(keys[0]) is not None
+    assert cache.get(keys[2]) is not None
+
@@ -0,0 +1,48 @@
+import numpy as np
+import pytest
+
+from src.features.engine import FEATURE_FAMILIES, NeighbourhoodMasks, extract_families
+from src.features.slant import axial_slant_histogram, normalize_histogram
+
+from test_slant import random_edges
+
+
+def brute_force_legs(edges, family):
+    # Para cada pixel central preto da região da família, as pernas presentes
+    height, width = edges.shape
+    margin = family.margin
+    present = []
+    for i in range(margin, height - margin):
+        for j in range(margin, width - margin):
+            if edges[i, j] != 0:
+                present.append([False] * len(family.legs))
+                continue
+            present.append([
+                all(edges[i + di, j + dj] == 0 for di, dj in leg) for leg in family.legs
+            ])
+    return np.array(present, dtype=bool).reshape(-1, len(family.legs))
+
+
+@pytest.mark.parametrize("seed", range(3))
+def test_slant_family_matches_axial_slant_histogram(seed):
+    edges = random_edges(seed, ink=0.7)
+    np.testing.assert_allclose(
+        extract_families(edges, ["slant"]),
+        normalize_histogram(axial_slant_histogram(edges)),
+    )
+
+
+@pytest.mark.parametrize("seed", range(3))
+def test_hinge_cooccurrence_matches_brute_force(seed):
+    edges = random_edges(seed, shape=(20, 24), ink=0.7)
+    family = FEATURE_FAMILIES["hinge"]
+    masks = NeighbourhoodMasks(edges, margin=family.margin, reach=family.reach)
+
+    matrix = family.cooccurrence(masks)
+    present = brute_force_legs(edges, family).astype(np.int64)
+
+    # Todas as 16 pernas aparecem, inclusive as dos bits 8 a 15
+    assert len(family.legs) == 16
+    assert present[:, 8:].any()
+    np.testing.assert_array_equal(np.diag(matrix), present.sum(axis=0))
+    np.testing.assert_array_equal(matrix, present.T @ present)
@@ -0,0 +1,53 @@
+import json
+import asyncio
+from concurrent.futures import Future
+
+from src.jobs import Job
+from src.server import event_stream
+
+
+def read_stream(job, ping_seconds, on_ping=None):
+    async def collect():
+        response = event_stream(job, ping_seconds)
+        chunks = []
+        async for chunk in response.body_iterator:
+            chunks.append(chunk)
+            if chunk.startswith(":") and on_ping is not None:
+                on_ping()
+        return chunks
+
+    return asyncio.run(collect())
+
+
+def parse(chunk):
+    event_line, data_line = chunk.strip().split("\n")
+    return event_line.removeprefix("event: "), json.loads(data_line.removeprefix("data: "))
+
+
+def test_late_subscriber_receives_past_events_in_order():
+    job = Job("job", Future(), {})
+    names = ["queued", "started", "stage_start", "stage_end", "result"]
+    for i, name in enumerate(names):
+        job.publish({"event": name, "time": i}, final=name == "result")
+
+    chunks = read_stream(job, ping_seconds=5)
+
+    events = [parse(chunk) for chunk in chunks]
+    assert [name for name, _ in events] == names
+    assert [data["time"] for _, data in events] == list(range(len(names)))
+
+
+def test_idle_stream_sends_ping_comments_until_the_final_event():
+    job = Job("job", Future(), {})
+    job.publish({"event": "queued", "time": 0})
+    pings = []
+
+    def on_ping():
+        pings.append(True)
+        if len(pings) == 2:
+            job.publish({"event": "result", "time": 1, "result": {}}, final=True)
+
+    chunks = read_stream(job, ping_seconds=0.01, on_ping=on_ping)
+
+    assert chunks[1:3] == [": ping\n\n", ": ping\n\n"]
+    assert [parse(chunk)[0] for chunk in chunks if not chunk.startswith(":")] == ["queued", "result"]
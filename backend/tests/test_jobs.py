@@ -0,0 +1,91 @@
+import os
+import time
+import signal
+
+import pytest
+
+from src import jobs
+from src.jobs import JobManager, QueueFullError
+from src.features.metrics import metrics
+
+
+def stub_experiment(num_authors, models, search=None, evaluation=None, profile_path=None,
+                    job_id=None):
+    # Substitui `run_experiment`: com `num_authors` negativo, encerra o processo;
+    # senão, espera o arquivo `models[0]` existir (se houver) e termina
+    if num_authors < 0:
+        os.kill(os.getpid(), signal.SIGKILL)
+    while models and not os.path.exists(models[0]):
+        time.sleep(0.01)
+    jobs._events.put((job_id, None))
+    return {"num_authors": num_authors}, os.getpid(), jobs._registry.stats(), metrics.snapshot()
+
+
+@pytest.fixture
+def manager(tmp_path, monkeypatch):
+    monkeypatch.setattr(jobs, "run_experiment", stub_experiment)
+    for name in ("treino.csv", "teste.csv"):
+        (tmp_path / name).write_text("autor,inclinacao_0\na,0.5\nb,0.25\n")
+
+    manager = JobManager(
+        max_workers=1, max_queue=1,
+        registry_kwargs={
+            "train_path": str(tmp_path / "treino.csv"), "test_path": str(tmp_path / "teste.csv"),
+        },
+    )
+    yield manager
+    manager.shutdown()
+
+
+def wait_for(condition, timeout=10):
+    deadline = time.monotonic() + timeout
+    while not condition():
+        assert time.monotonic() < deadline
+        time.sleep(0.01)
+
+
+def test_rejects_jobs_when_the_queue_is_full(manager, tmp_path):
+    gate = str(tmp_path / "gate")
+    running = manager.submit(1, [gate])
+    wait_for(lambda: running.status == "running")
+    queued = manager.submit(2, [gate])
+
+    with pytest.raises(QueueFullError):
+        manager.submit(3, [gate])
+    assert manager.stats()["queue_depth"] == 1
+
+    open(gate, "w").close()
+    assert running.future.result(timeout=10)[0] == {"num_authors": 1}
+    assert queued.future.result(timeout=10)[0] == {"num_authors": 2}
+
+
+def test_cancels_queued_jobs_but_not_running_ones(manager, tmp_path):
+    gate = str(tmp_path / "gate")
+    running = manager.submit(1, [gate])
+    wait_for(lambda: running.status == "running")
+    queued = manager.submit(2, [gate])
+
+    assert manager.cancel(running.job_id) is False
+    assert manager.cancel(queued.job_id) is True
+    assert queued.status == "cancelled"
+    assert queued.events[-1]["event"] == "cancelled"
+
+    open(gate, "w").close()
+    running.future.result(timeout=10)
+    wait_for(lambda: running.events[-1]["event"] == "result")
+    assert running.status == "finished"
+
+
+def test_recovers_after_a_worker_is_killed(manager):
+    before = manager.submit(1, [])
+    first_pid = before.future.result(timeout=10)[1]
+
+    killed = manager.submit(-1, [])
+    wait_for(lambda: killed.future.done())
+    assert killed.status == "failed"
+    assert killed.events[-1]["event"] == "error"
+
+    after = manager.submit(2, [])
+    result, pid, _, _ = after.future.result(timeout=10)
+    assert result == {"num_authors": 2}
+    assert pid != first_pid
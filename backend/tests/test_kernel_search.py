@@ -0,0 +1,36 @@
+import numpy as np
+import pytest
+from sklearn.datasets import make_classification
+from sklearn.model_selection import GridSearchCV, StratifiedKFold
+from sklearn.preprocessing import StandardScaler
+from sklearn.svm import SVC
+
+from src.models.kernel_search import KernelGridSearchSVC
+from src.models.svm import PARAM_GRID
+
+
+def author_features(seed, n_authors=6, samples=12, n_features=17):
+    # Vetores sintéticos de vários autores, padronizados como no pipeline
+    X, y = make_classification(
+        n_samples=n_authors * samples, n_features=n_features, n_informative=8,
+        n_classes=n_authors, n_clusters_per_class=1, class_sep=1.5, random_state=seed,
+    )
+    authors = np.array([f"a{label:03d}" for label in y])
+    return StandardScaler().fit_transform(X), authors
+
+
+@pytest.mark.parametrize("seed", range(3))
+def test_kernel_grid_search_matches_grid_search_cv(seed):
+    X, y = author_features(seed)
+    X_train, y_train, X_test = X[::2], y[::2], X[1::2]
+    cv = StratifiedKFold(n_splits=3)
+
+    expected = GridSearchCV(SVC(), PARAM_GRID, cv=cv).fit(X_train, y_train)
+    search = KernelGridSearchSVC(PARAM_GRID, cv=cv).fit(X_train, y_train)
+
+    np.testing.assert_allclose(
+        search.cv_results_["mean_test_score"], expected.cv_results_["mean_test_score"]
+    )
+    assert search.best_params_ == expected.best_params_
+    assert search.best_score_ == pytest.approx(expected.best_score_)
+    np.testing.assert_array_equal(search.predict(X_test), expected.predict(X_test))
@@ -0,0 +1,64 @@
+import os
+
+import cv2
+import pytest
+
+import main
+from main import process_dataset
+from src.benchmark import synthetic_page
+from features.artifacts import ArtifactSink
+
+
+@pytest.fixture
+def dataset(tmp_path):
+    # Nomes no formato do conjunto de dados: o autor nos caracteres [-10:-7]
+    dataset_dir = tmp_path / "imagens"
+    dataset_dir.mkdir()
+    for k in range(6):
+        page = synthetic_page(240, 320, seed=k)
+        cv2.imwrite(str(dataset_dir / f"m{k:02d}{k % 3:03d}_01.bmp"), page)
+    return str(dataset_dir)
+
+
+def run(dataset_dir, csv_path, **kwargs):
+    process_dataset(
+        dataset_dir, csv_path, output_dir=os.path.dirname(csv_path),
+        artifacts=ArtifactSink("off"), **kwargs,
+    )
+    with open(csv_path) as csvfile:
+        return csvfile.read()
+
+
+def test_interrupted_extraction_resumes_without_duplicating_rows(dataset, tmp_path, monkeypatch):
+    expected = run(dataset, str(tmp_path / "completo.csv"))
+
+    csv_path = str(tmp_path / "retomado.csv")
+    extract_features = main.extract_features
+    calls = []
+
+    def interrupted(*args, **kwargs):
+        if len(calls) == 3:
+            raise KeyboardInterrupt
+        calls.append(args)
+        return extract_features(*args, **kwargs)
+
+    monkeypatch.setattr(main, "extract_features", interrupted)
+    with pytest.raises(KeyboardInterrupt):
+        run(dataset, csv_path)
+    monkeypatch.undo()
+
+    # Uma linha incompleta, gravada depois do último registro do manifesto
+    with open(csv_path, "a") as csvfile:
+        csvfile.write("a001,0.5")
+    with open(f"{csv_path}.manifest") as manifest:
+        assert len(manifest.readlines()) == 3
+
+    resumed = []
+    monkeypatch.setattr(
+        main, "extract_features",
+        lambda *args, **kwargs: resumed.append(args[1]) or extract_features(*args, **kwargs),
+    )
+    assert run(dataset, csv_path) == expected
+    assert resumed == sorted(os.listdir(dataset))[3:]
+    assert not os.path.exists(f"{csv_path}.manifest")
+    assert len(expected.splitlines()) == 7
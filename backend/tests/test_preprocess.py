@@ -0,0 +1,53 @@
+import cv2
+import numpy as np
+import pytest
+
+from src.features.preprocess import extract_edges, extract_edges_tiled, iter_edge_strips, otsu_threshold
+from src.features.slant import axial_slant_histogram, axial_slant_histogram_strips
+
+
+def synthetic_page(seed, shape=(120, 90)):
+    # Página em escala de cinza com texto escuro, ruído e um gradiente de fundo
+    rng = np.random.default_rng(seed)
+    height, width = shape
+    page = np.linspace(170, 250, width)[None, :].repeat(height, axis=0)
+    page = page + rng.normal(0, 12, shape)
+    page = np.clip(page, 0, 255).astype(np.uint8)
+    for line in range(15, height, 25):
+        cv2.putText(page, "Manuscrito", (2, line), cv2.FONT_HERSHEY_SIMPLEX, 0.5, 20, 1)
+    return page
+
+
+@pytest.mark.parametrize("seed", range(3))
+def test_otsu_threshold_matches_opencv(seed):
+    rng = np.random.default_rng(seed)
+    images = [
+        synthetic_page(seed),
+        rng.integers(0, 256, (50, 70), dtype=np.uint8),
+        np.concatenate([rng.normal(60, 10, 500), rng.normal(190, 25, 900)])
+          .clip(0, 255).astype(np.uint8).reshape(28, 50),
+    ]
+    for img in images:
+        expected, _ = cv2.threshold(img, 0, 255, cv2.THRESH_BINARY + cv2.THRESH_OTSU)
+        assert otsu_threshold(img) == expected
+
+
+def test_otsu_threshold_constant_image():
+    img = np.full((10, 10), 128, dtype=np.uint8)
+    expected, _ = cv2.threshold(img, 0, 255, cv2.THRESH_BINARY + cv2.THRESH_OTSU)
+    assert otsu_threshold(img) == expected
+
+
+@pytest.mark.parametrize("strip_rows", [1, 2, 3, 5, 17, 64, 119, 120, 500])
+def test_extract_edges_tiled_matches_whole_image(strip_rows):
+    img = synthetic_page(0)
+    np.testing.assert_array_equal(extract_edges_tiled(img, strip_rows), extract_edges(img))
+
+
+@pytest.mark.parametrize("strip_rows", [1, 4, 9, 50, 500])
+def test_tiled_slant_matches_whole_image(strip_rows):
+    img = synthetic_page(1)
+    np.testing.assert_array_equal(
+        axial_slant_histogram_strips(iter_edge_strips(img, strip_rows), img.shape[0]),
+        axial_slant_histogram(extract_edges(img)),
+    )
@@ -0,0 +1,85 @@
+import numpy as np
+import pytest
+
+from src.features.slant import axial_slant_histogram, axial_slant_histogram_strips
+
+
+def original_axial_slant_histogram(fragment):
+    # Laço original de `slant`, com as 17 condições escritas à mão, antes da
+    # vetorização (sem a normalização e o gráfico)
+    height, width = fragment.shape
+    axial_slant = np.zeros(17, dtype=int)
+
+    for i in range(4, height - 4):
+        for j in range(4, width - 4):
+            central_pixel = fragment[i, j]
+            if central_pixel == 0:
+                if (fragment[i, j + 1] == 0) and (fragment[i, j + 2] == 0) and (fragment[i, j + 3] == 0) and (fragment[i, j + 4] == 0):
+                    axial_slant[16] += 1
+                if (fragment[i-1, j + 1] == 0) and (fragment[i-2, j + 2] == 0) and (fragment[i-3, j + 3] == 0) and (fragment[i-4, j + 4] == 0):
+                    axial_slant[15] += 1
+                if (fragment[i-1, j + 1] == 0) and (fragment[i-1, j + 2] == 0) and (fragment[i-2, j + 3] == 0) and (fragment[i-2, j + 4] == 0):
+                    axial_slant[14] += 1
+                if (fragment[i-1, j + 1] == 0) and (fragment[i-2, j + 2] == 0) and (fragment[i-2, j + 3] == 0) and (fragment[i-3, j + 4] == 0):
+                    axial_slant[13] += 1
+                if (fragment[i-1, j + 1] == 0) and (fragment[i-2, j + 2] == 0) and (fragment[i-3, j + 3] == 0) and (fragment[i-4, j + 4] == 0):
+                    axial_slant[12] += 1
+                if (fragment[i-1, j + 1] == 0) and (fragment[i-2, j + 2] == 0) and (fragment[i-3, j + 2] == 0) and (fragment[i-4, j + 3] == 0):
+                    axial_slant[11] += 1
+                if (fragment[i-1, j + 1] == 0) and (fragment[i-2, j + 1] == 0) and (fragment[i-3, j + 2] == 0) and (fragment[i-4, j + 2] == 0):
+                    axial_slant[10] += 1
+                if (fragment[i-1, j] == 0) and (fragment[i-2, j + 1] == 0) and (fragment[i-3, j + 1] == 0) and (fragment[i-4, j + 1] == 0):
+                    axial_slant[9] += 1
+                if (fragment[i-1, j] == 0) and (fragment[i-2, j] == 0) and (fragment[i-3, j] == 0) and (fragment[i-4, j] == 0):
+                    axial_slant[8] += 1
+                if (fragment[i-1, j] == 0) and (fragment[i-2, j - 1] == 0) and (fragment[i-3, j - 1] == 0) and (fragment[i-4, j - 1] == 0):
+                    axial_slant[7] += 1
+                if (fragment[i-1, j - 1] == 0) and (fragment[i-2, j - 1] == 0) and (fragment[i-3, j - 2] == 0) and (fragment[i-4, j - 2] == 0):
+                    axial_slant[6] += 1
+                if (fragment[i-1, j - 1] == 0) and (fragment[i-2, j - 2] == 0) and (fragment[i-3, j - 3] == 0) and (fragment[i-4, j - 3] == 0):
+                    axial_slant[5] += 1
+                if (fragment[i-1, j - 1] == 0) and (fragment[i-2, j - 2] == 0) and (fragment[i-3, j - 3] == 0) and (fragment[i-4, j - 4] == 0):
+                    axial_slant[4] += 1
+                if (fragment[i-1, j - 1] == 0) and (fragment[i-2, j - 2] == 0) and (fragment[i-3, j - 2] == 0) and (fragment[i-4, j - 3] == 0):
+                    axial_slant[3] += 1
+                if (fragment[i-1, j - 1] == 0) and (fragment[i-2, j - 1] == 0) and (fragment[i-3, j - 2] == 0) and (fragment[i-4, j - 2] == 0):
+                    axial_slant[2] += 1
+                if (fragment[i-1, j] == 0) and (fragment[i-2, j - 1] == 0) and (fragment[i-3, j - 1] == 0) and (fragment[i-4, j - 1] == 0):
+                    axial_slant[1] += 1
+                if (fragment[i, j - 1] == 0) and (fragment[i, j - 2] == 0) and (fragment[i, j - 3] == 0) and (fragment[i, j - 4] == 0):
+                    axial_slant[0] += 1
+
+    return axial_slant
+
+
+def random_edges(seed, shape=(48, 64), ink=0.6):
+    # Imagem de bordas aleatória: 0 para os pixels pretos e 255 para os brancos
+    rng = np.random.default_rng(seed)
+    return np.where(rng.random(shape) < ink, 0, 255).astype(np.uint8)
+
+
+@pytest.mark.parametrize("seed", range(5))
+@pytest.mark.parametrize("ink", [0.3, 0.6, 0.9])
+def test_axial_slant_histogram_matches_original(seed, ink):
+    edges = random_edges(seed, ink=ink)
+    np.testing.assert_array_equal(
+        axial_slant_histogram(edges), original_axial_slant_histogram(edges)
+    )
+
+
+@pytest.mark.parametrize("shape", [(8, 8), (9, 9), (9, 40), (40, 9), (3, 3)])
+def test_axial_slant_histogram_small_images(shape):
+    edges = random_edges(0, shape, ink=0.8)
+    np.testing.assert_array_equal(
+        axial_slant_histogram(edges), original_axial_slant_histogram(edges)
+    )
+
+
+@pytest.mark.parametrize("strip_rows", [1, 3, 4, 5, 7, 16, 47, 48, 100])
+def test_axial_slant_histogram_strips_matches_whole_image(strip_rows):
+    edges = random_edges(1, ink=0.7)
+    height = edges.shape[0]
+    strips = ((start, edges[start:start + strip_rows]) for start in range(0, height, strip_rows))
+    np.testing.assert_array_equal(
+        axial_slant_histogram_strips(strips, height), original_axial_slant_histogram(edges)
+    )
@@ -0,0 +1,70 @@
+import os
+
+import numpy as np
+
+from src.features.store import open_feature_store
+
+
+def write_csv(path, labels, matrix):
+    with open(path, "w") as csvfile:
+        csvfile.write("autor,c0,c1\n")
+        for label, row in zip(labels, matrix):
+            csvfile.write(",".join([label] + [repr(float(v)) for v in row]) + "\n")
+
+
+def sample_rows(seed, n_rows=40):
+    rng = np.random.default_rng(seed)
+    # Autores intercalados, com números diferentes de amostras (um deles com uma só)
+    labels = [str(label) for label in rng.choice(["c", "a", "d", "b"], size=n_rows - 1)] + ["e"]
+    matrix = rng.random((n_rows, 2)).astype(np.float32)
+    return labels, matrix
+
+
+def expected_subset(labels, matrix, authors):
+    # Linhas do CSV dos autores, agrupadas por autor em ordem alfabética e na
+    # ordem original dentro de cada autor
+    rows = [i for author in sorted(authors) for i, label in enumerate(labels) if label == author]
+    return matrix[rows], np.array(labels)[rows]
+
+
+def test_subset_returns_the_csv_rows_of_each_author(tmp_path):
+    csv_path = str(tmp_path / "treino.csv")
+    labels, matrix = sample_rows(0)
+    write_csv(csv_path, labels, matrix)
+    store = open_feature_store(csv_path)
+
+    assert len(store) == len(labels)
+    assert store.columns == ["c0", "c1"]
+    for authors in (["a"], ["e"], ["d", "b"], ["a", "b", "c", "d", "e"], ["c", "ausente"]):
+        X, y = store.subset(authors)
+        expected_X, expected_y = expected_subset(labels, matrix, [a for a in authors if a != "ausente"])
+        np.testing.assert_array_equal(X, expected_X)
+        np.testing.assert_array_equal(y, expected_y)
+
+    order = np.argsort(labels, kind="stable")
+    np.testing.assert_array_equal(store.labels(), np.array(labels)[order])
+    np.testing.assert_array_equal(store.matrix, matrix[order])
+
+
+def test_store_is_reconverted_when_the_csv_is_newer(tmp_path):
+    csv_path = str(tmp_path / "treino.csv")
+    labels, matrix = sample_rows(0)
+    write_csv(csv_path, labels, matrix)
+    meta_path = os.path.join(open_feature_store(csv_path).store_path, "meta.json")
+    converted_at = os.path.getmtime(meta_path)
+
+    # Sem alteração do CSV, o repositório existente é reaproveitado
+    open_feature_store(csv_path)
+    assert os.path.getmtime(meta_path) == converted_at
+
+    new_labels, new_matrix = sample_rows(1, n_rows=25)
+    write_csv(csv_path, new_labels, new_matrix)
+    os.utime(csv_path, (converted_at + 10, converted_at + 10))
+
+    store = open_feature_store(csv_path)
+    assert len(store) == 25
+    X, y = store.subset(["a"])
+    assert len(y) > 0
+    expected_X, expected_y = expected_subset(new_labels, new_matrix, ["a"])
+    np.testing.assert_array_equal(X, expected_X)
+    np.testing.assert_array_equal(y, expected_y)
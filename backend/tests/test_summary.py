@@ -0,0 +1,44 @@
+import numpy as np
+import pytest
+from scipy import stats
+
+from src.models.main import summarize
+
+
+def runs(values):
+    return [{"accuracy_svm": value, "num_authors": 10} for value in values]
+
+
+def test_interval_matches_student_t():
+    values = [72.0, 80.0, 76.5, 69.0, 81.5]
+    summary = summarize(runs(values), confidence=0.95)["accuracy_svm"]
+
+    expected = stats.t.interval(
+        0.95, len(values) - 1, loc=np.mean(values), scale=stats.sem(values)
+    )
+    assert summary["ci"] == pytest.approx(list(expected))
+    assert summary["mean"] == pytest.approx(np.mean(values))
+    assert summary["std"] == pytest.approx(np.std(values, ddof=1))
+    assert (summary["min"], summary["max"]) == (69.0, 81.5)
+    assert "num_authors" not in summarize(runs(values))
+
+
+def test_interval_is_clipped_to_percentages():
+    high = summarize(runs([100.0, 100.0, 90.0]))["accuracy_svm"]
+    assert high["ci"][1] == 100.0
+    assert high["ci"][0] < high["mean"]
+
+    low = summarize(runs([0.0, 0.0, 10.0]))["accuracy_svm"]
+    assert low["ci"][0] == 0.0
+    assert low["ci"][1] > low["mean"]
+
+
+def test_single_run_has_no_interval():
+    summary = summarize(runs([75.0]))["accuracy_svm"]
+    assert summary == {"mean": 75.0, "std": None, "ci": None, "min": 75.0, "max": 75.0}
+
+
+def test_zero_variance_gives_an_empty_width_interval():
+    summary = summarize(runs([80.0, 80.0, 80.0]))["accuracy_svm"]
+    assert summary["std"] == 0.0
+    assert summary["ci"] == [80.0, 80.0]
@@ -0,0 +1,15 @@
+from sklearn.model_selection import StratifiedKFold
+
+from src.models.svm import PARAM_GRID, HalvingSearchSVC
+
+from test_kernel_search import author_features
+
+
+def test_halving_search_refits_without_iteration_limit():
+    X, y = author_features(0)
+    search = HalvingSearchSVC(PARAM_GRID, cv=StratifiedKFold(n_splits=3)).fit(X, y)
+
+    assert "max_iter" not in search.best_params_
+    assert search.best_estimator_.max_iter == -1
+    assert search.best_estimator_.get_params()["kernel"] == search.best_params_["kernel"]
+    assert set(search.predict(X)) <= set(y)